@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+"""
+Lizzy Alpha - Batch Jobs
+========================
+Offline batch submission for overnight runs (brainstorm.py --batch,
+write.py --batch), where latency does not matter and cost does.
+
+Every request of a run pass is serialized into one JSONL job file in
+the provider batch format (custom_id / method / url / body), submitted,
+polled until it finishes, and its output JSONL is parsed back into
+per-request results for ingestion. Jobs are recorded in the project
+database (batch_jobs), so an interrupted run picks up its submitted job
+on --resume instead of paying for it twice.
+
+Backends (LLM_BATCH_BACKEND):
+- openai: the provider Batch API (files + batches endpoints)
+- local:  a stand-in that reads the job JSONL, answers each request
+          through the shared client (LLM_BASE_URL, e.g. a local stub)
+          and writes the output JSONL next to it. An output file that
+          already exists is ingested as-is.
+
+Author: Lizzy AI Writing Framework
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+from llm_client import (TRANSIENT_STATUS_CODES, GenerationError, call_with_retries, estimate_request_tokens,
+                        get_client, usage_stats)
+
+BATCH_ENDPOINT = "/v1/chat/completions"
+COMPLETION_WINDOW = "24h"
+DEFAULT_POLL_SECONDS = 60
+TERMINAL_STATUSES = ("completed", "failed", "expired", "cancelled")
+
+BatchResult = Union[str, GenerationError]
+
+
+def ensure_batch_table(conn: sqlite3.Connection):
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS batch_jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            run_table TEXT NOT NULL,
+            kind TEXT NOT NULL,
+            backend TEXT NOT NULL,
+            batch_id TEXT NOT NULL,
+            request_hash TEXT NOT NULL,
+            request_count INTEGER,
+            input_path TEXT NOT NULL,
+            output_path TEXT,
+            status TEXT NOT NULL DEFAULT 'submitted',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            completed_at TIMESTAMP
+        )
+        """
+    )
+    conn.commit()
+
+
+def build_request(custom_id: str, messages: List[Dict[str, str]], model: str,
+                  temperature: Optional[float] = 0.7, max_tokens: int = 2000) -> Dict:
+    """One line of a batch job file."""
+    body = {"model": model, "messages": messages, "max_tokens": max_tokens}
+    if temperature is not None:
+        body["temperature"] = temperature
+    return {"custom_id": custom_id, "method": "POST", "url": BATCH_ENDPOINT, "body": body}
+
+
+def requests_hash(requests: List[Dict]) -> str:
+    h = hashlib.sha256()
+    for request in requests:
+        h.update(json.dumps(request, sort_keys=True).encode("utf-8") + b"\n")
+    return h.hexdigest()
+
+
+def write_job_file(path: Path, requests: List[Dict]):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        for request in requests:
+            f.write(json.dumps(request, ensure_ascii=False) + "\n")
+
+
+def parse_results(text: str) -> Tuple[Dict[str, BatchResult], Dict[str, int]]:
+    """
+    Parse batch output JSONL into custom_id -> completion text or GenerationError.
+
+    Also returns token totals reported in the responses.
+    """
+    results: Dict[str, BatchResult] = {}
+    tokens = {"prompt_tokens": 0, "completion_tokens": 0}
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        custom_id = record.get("custom_id")
+        response = record.get("response") or {}
+        error = record.get("error")
+        body = response.get("body") or {}
+        status = response.get("status_code")
+        if error or (status is not None and status != 200):
+            detail = error or body.get("error") or {}
+            message = detail.get("message") if isinstance(detail, dict) else str(detail)
+            results[custom_id] = GenerationError(
+                f"Batch request failed ({status or 'no response'}): {message or 'unknown error'}",
+                transient=status in TRANSIENT_STATUS_CODES,
+            )
+            continue
+        usage = body.get("usage") or {}
+        tokens["prompt_tokens"] += usage.get("prompt_tokens", 0) or 0
+        tokens["completion_tokens"] += usage.get("completion_tokens", 0) or 0
+        choices = body.get("choices") or [{}]
+        content = ((choices[0].get("message") or {}).get("content") or "").strip()
+        results[custom_id] = content if content else GenerationError("Empty completion")
+    return results, tokens
+
+
+class OpenAIBatchBackend:
+    """The provider Batch API: upload the JSONL, create a batch, fetch its output file."""
+
+    name = "openai"
+
+    def submit(self, input_path: Path) -> str:
+        client = get_client()
+        uploaded = call_with_retries(
+            client.files.create, file=(input_path.name, input_path.read_bytes()), purpose="batch",
+            label="batch upload",
+        )
+        batch = call_with_retries(
+            client.batches.create, input_file_id=uploaded.id, endpoint=BATCH_ENDPOINT,
+            completion_window=COMPLETION_WINDOW, label="batch create",
+        )
+        return batch.id
+
+    def poll(self, batch_id: str, input_path: Path) -> Tuple[str, Optional[str]]:
+        """(status, output JSONL) — output only once the batch is terminal."""
+        client = get_client()
+        batch = call_with_retries(client.batches.retrieve, batch_id, label="batch poll")
+        if batch.status not in TERMINAL_STATUSES:
+            return batch.status, None
+        parts = []
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if file_id:
+                parts.append(call_with_retries(client.files.content, file_id, label="batch download").text)
+        return batch.status, "\n".join(parts)
+
+
+class LocalBatchBackend:
+    """Stand-in backend: answers the job file through the shared client and writes the output JSONL."""
+
+    name = "local"
+
+    @staticmethod
+    def output_path(input_path: Path) -> Path:
+        return input_path.with_name(f"{input_path.stem}.output.jsonl")
+
+    def submit(self, input_path: Path) -> str:
+        return f"local_{hashlib.sha256(str(input_path).encode('utf-8')).hexdigest()[:16]}"
+
+    def poll(self, batch_id: str, input_path: Path) -> Tuple[str, Optional[str]]:
+        output_path = self.output_path(input_path)
+        if not output_path.exists():
+            self.process(input_path, output_path)
+        return "completed", output_path.read_text(encoding="utf-8")
+
+    def process(self, input_path: Path, output_path: Path):
+        lines = []
+        for line in input_path.read_text(encoding="utf-8").splitlines():
+            if not line.strip():
+                continue
+            request = json.loads(line)
+            body = request["body"]
+            record = {"id": f"batch_req_{request['custom_id']}", "custom_id": request["custom_id"]}
+            try:
+                response = call_with_retries(
+                    get_client().chat.completions.create,
+                    tokens=estimate_request_tokens(body["messages"], body.get("max_tokens", 2000)),
+                    label=f"batch {request['custom_id']}",
+                    **body,
+                )
+                usage_stats.record(response)
+                record["response"] = {"status_code": 200, "body": response.model_dump()}
+                record["error"] = None
+            except GenerationError as e:
+                record["response"] = None
+                record["error"] = {"code": "request_failed", "message": str(e)}
+            lines.append(json.dumps(record, ensure_ascii=False))
+        tmp = output_path.with_suffix(".tmp")
+        tmp.write_text("\n".join(lines) + "\n", encoding="utf-8")
+        tmp.replace(output_path)
+
+
+def get_batch_backend(name: Optional[str] = None):
+    name = (name or os.getenv("LLM_BATCH_BACKEND", "openai")).lower()
+    if name == "local":
+        return LocalBatchBackend()
+    if name == "openai":
+        return OpenAIBatchBackend()
+    raise ValueError(f"Unknown batch backend '{name}' (expected 'openai' or 'local')")
+
+
+class BatchRunner:
+    """Submit one pass of a run as a batch job, wait for it, and return per-request results."""
+
+    def __init__(self, conn: sqlite3.Connection, job_dir: Path, backend=None,
+                 poll_seconds: Optional[float] = None):
+        self.conn = conn
+        self.job_dir = Path(job_dir)
+        self.backend = backend or get_batch_backend()
+        self.poll_seconds = poll_seconds if poll_seconds is not None else float(
+            os.getenv("LLM_BATCH_POLL_SECONDS", DEFAULT_POLL_SECONDS)
+        )
+        ensure_batch_table(conn)
+
+    def find_job(self, run_table: str, kind: str, request_hash: str) -> Optional[sqlite3.Row]:
+        """A job already submitted for exactly these requests (not failed/expired)."""
+        cursor = self.conn.cursor()
+        cursor.row_factory = sqlite3.Row
+        cursor.execute(
+            """
+            SELECT id, batch_id, input_path, output_path, status FROM batch_jobs
+            WHERE run_table=? AND kind=? AND request_hash=? AND backend=?
+              AND status NOT IN ('failed', 'expired', 'cancelled')
+            ORDER BY id DESC LIMIT 1
+            """,
+            (run_table, kind, request_hash, self.backend.name),
+        )
+        return cursor.fetchone()
+
+    def submit(self, run_table: str, kind: str, requests: List[Dict], request_hash: str) -> Tuple[int, str, Path]:
+        stamp = time.strftime("%Y%m%d_%H%M%S")
+        input_path = self.job_dir / f"{run_table}_{kind}_{stamp}.jsonl"
+        write_job_file(input_path, requests)
+        batch_id = self.backend.submit(input_path)
+        cursor = self.conn.cursor()
+        cursor.execute(
+            """
+            INSERT INTO batch_jobs (run_table, kind, backend, batch_id, request_hash, request_count, input_path)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            """,
+            (run_table, kind, self.backend.name, batch_id, request_hash, len(requests), str(input_path)),
+        )
+        self.conn.commit()
+        print(f"📦 Submitted {kind} batch {batch_id}: {len(requests)} requests ({input_path})")
+        return cursor.lastrowid, batch_id, input_path
+
+    def wait(self, job_id: int, batch_id: str, input_path: Path) -> str:
+        """Poll until the batch is terminal; store and return its output JSONL."""
+        started = time.monotonic()
+        try:
+            while True:
+                status, output = self.backend.poll(batch_id, input_path)
+                if output is not None:
+                    break
+                print(f"  ⏳ Batch {batch_id}: {status} ({time.monotonic() - started:.0f}s)")
+                time.sleep(self.poll_seconds)
+        except KeyboardInterrupt:
+            print(f"\n⏸️  Batch {batch_id} keeps running on the provider; collect it with --resume")
+            raise
+        output_path = input_path.with_name(f"{input_path.stem}.output.jsonl")
+        if not output_path.exists():
+            output_path.write_text(output, encoding="utf-8")
+        self.conn.execute(
+            "UPDATE batch_jobs SET status=?, output_path=?, completed_at=CURRENT_TIMESTAMP WHERE id=?",
+            (status, str(output_path), job_id),
+        )
+        self.conn.commit()
+        return output
+
+    def run(self, run_table: str, kind: str, requests: List[Dict]) -> Dict[str, BatchResult]:
+        """Results for every request, keyed by custom_id; missing results are transient failures."""
+        if not requests:
+            return {}
+        request_hash = requests_hash(requests)
+        job = self.find_job(run_table, kind, request_hash)
+        if job and job["status"] == "completed" and job["output_path"] and Path(job["output_path"]).exists():
+            print(f"♻️  Reusing completed {kind} batch {job['batch_id']}")
+            output = Path(job["output_path"]).read_text(encoding="utf-8")
+        else:
+            if job:
+                print(f"⏯️  Waiting on submitted {kind} batch {job['batch_id']}")
+                job_id, batch_id, input_path = job["id"], job["batch_id"], Path(job["input_path"])
+            else:
+                job_id, batch_id, input_path = self.submit(run_table, kind, requests, request_hash)
+            output = self.wait(job_id, batch_id, input_path)
+
+        results, tokens = parse_results(output)
+        for request in requests:
+            results.setdefault(
+                request["custom_id"], GenerationError("No result in batch output", transient=True)
+            )
+        failed = sum(isinstance(r, GenerationError) for r in results.values())
+        print(f"📦 {kind.capitalize()} batch: {len(results) - failed} succeeded, {failed} failed "
+              f"({tokens['prompt_tokens']} prompt + {tokens['completion_tokens']} completion tokens)")
+        return results
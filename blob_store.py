@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+Lizzy Alpha - Blob Store
+========================
+Content-addressed, compressed text storage inside the project database.
+
+Run tables (write_outputs, brainstorm_responses) keep a short reference
+("blob:<sha256>") in place of large text columns. The text itself is
+stored once in the blobs table, keyed by its hash and compressed with
+zstd when `zstandard` is installed, zlib otherwise. Identical texts
+(a scene description repeated per bucket, responses carried forward by
+incremental brainstorming, the static prompt prefix shared by every
+scene) are stored only once, so databases stop growing with every run.
+
+A reference can name several chunks ("blob:<h1>+<h2>"): write prompts
+are split after their compiled static prefix so that prefix is shared.
+Values that are not references are returned unchanged, so rows written
+before the blob store read the same way.
+
+Usage:
+    python blob_store.py    # compact an existing project and show savings
+
+Author: Lizzy AI Writing Framework
+"""
+
+import hashlib
+import os
+import re
+import sqlite3
+import zlib
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from catalog import choose_project, update_catalog
+from db import connect
+from run_tables import BRAINSTORM_TABLE, WRITE_TABLE, ensure_run_tables
+
+ZSTD_AVAILABLE = True
+try:
+    import zstandard
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+REF_PREFIX = "blob:"
+MIN_COMPRESS_BYTES = 128       # smaller payloads are stored raw
+ZSTD_LEVEL = 10
+ZLIB_LEVEL = 9
+READ_CACHE_ENTRIES = 256
+
+# Run tables and the text columns that hold references
+RUN_TABLE_COLUMNS = {
+    WRITE_TABLE: ("prompt", "output"),
+    BRAINSTORM_TABLE: ("scene_description", "response"),
+}
+
+# Columns whose values share a long common head (split off as its own chunk)
+PREFIX_COLUMNS = ("prompt",)
+
+_REF_PATTERN = re.compile(r"^blob:[0-9a-f]{64}(\+[0-9a-f]{64})*$")
+
+
+def ensure_blob_table(conn: sqlite3.Connection):
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS blobs (
+            hash TEXT PRIMARY KEY,
+            codec TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            stored_size INTEGER NOT NULL,
+            data BLOB NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """
+    )
+    conn.commit()
+
+
+def is_ref(value) -> bool:
+    return isinstance(value, str) and value.startswith(REF_PREFIX) and bool(_REF_PATTERN.match(value))
+
+
+def compress(raw: bytes) -> Tuple[str, bytes]:
+    if len(raw) < MIN_COMPRESS_BYTES:
+        return "raw", raw
+    if ZSTD_AVAILABLE:
+        codec, packed = "zstd", zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(raw)
+    else:
+        codec, packed = "zlib", zlib.compress(raw, ZLIB_LEVEL)
+    return (codec, packed) if len(packed) < len(raw) else ("raw", raw)
+
+
+def decompress(codec: str, data: bytes) -> bytes:
+    if codec == "raw":
+        return bytes(data)
+    if codec == "zlib":
+        return zlib.decompress(data)
+    if codec == "zstd":
+        if not ZSTD_AVAILABLE:
+            raise RuntimeError("This database holds zstd-compressed text; install it with: pip install zstandard")
+        return zstandard.ZstdDecompressor().decompress(data)
+    raise ValueError(f"Unknown blob codec '{codec}'")
+
+
+class BlobStore:
+    """Deduplicated, compressed text blobs referenced from run tables."""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+        self._cache: "OrderedDict[str, str]" = OrderedDict()
+        ensure_blob_table(conn)
+
+    @staticmethod
+    def _chunks(text: str, prefixes: Iterable[str]) -> List[str]:
+        head = max((p for p in prefixes if p and text.startswith(p) and len(p) < len(text)), key=len, default="")
+        return [head, text[len(head):]] if head else [text]
+
+    def _put_chunk(self, text: str, conn: sqlite3.Connection) -> str:
+        raw = text.encode("utf-8")
+        digest = hashlib.sha256(raw).hexdigest()
+        codec, packed = compress(raw)
+        conn.execute(
+            "INSERT OR IGNORE INTO blobs (hash, codec, size, stored_size, data) VALUES (?, ?, ?, ?, ?)",
+            (digest, codec, len(raw), len(packed), packed),
+        )
+        return digest
+
+    def put(self, text: str, prefixes: Iterable[str] = (), commit: bool = False,
+            conn: Optional[sqlite3.Connection] = None) -> str:
+        """
+        Store text and return its reference.
+
+        When text starts with one of `prefixes`, the longest such prefix is
+        stored as its own chunk so it is shared by every text that uses it.
+        Left uncommitted by default: callers commit with the row holding the reference.
+        Pass `conn` to store through another connection (a write queue's).
+        """
+        chunks = self._chunks(text or "", prefixes)
+        ref = REF_PREFIX + "+".join(self._put_chunk(c, conn or self.conn) for c in chunks)
+        if commit:
+            self.conn.commit()
+        return ref
+
+    def ref(self, text: str, prefixes: Iterable[str] = ()) -> str:
+        """The reference put() would return, without storing anything."""
+        chunks = self._chunks(text or "", prefixes)
+        return REF_PREFIX + "+".join(hashlib.sha256(c.encode("utf-8")).hexdigest() for c in chunks)
+
+    def _get_chunk(self, digest: str) -> str:
+        if digest in self._cache:
+            self._cache.move_to_end(digest)
+            return self._cache[digest]
+        row = self.conn.execute("SELECT codec, data FROM blobs WHERE hash=?", (digest,)).fetchone()
+        if row is None:
+            raise KeyError(f"Missing blob {digest[:12]}")
+        text = decompress(row[0], row[1]).decode("utf-8")
+        self._cache[digest] = text
+        if len(self._cache) > READ_CACHE_ENTRIES:
+            self._cache.popitem(last=False)
+        return text
+
+    def resolve(self, value: Optional[str]) -> Optional[str]:
+        """Text for a reference; any other value (inline legacy text, None) is returned as-is."""
+        if not is_ref(value):
+            return value
+        return "".join(self._get_chunk(d) for d in value[len(REF_PREFIX):].split("+"))
+
+    def stats(self) -> Dict[str, int]:
+        count, size, stored = self.conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(stored_size), 0) FROM blobs"
+        ).fetchone()
+        return {"blobs": count, "size": size, "stored_size": stored}
+
+    def report(self) -> str:
+        s = self.stats()
+        if not s["blobs"]:
+            return "🗜️  Blob store: empty"
+        return (f"🗜️  Blob store: {s['blobs']} unique texts, {s['size'] / 1024:.0f} KB → "
+                f"{s['stored_size'] / 1024:.0f} KB stored ({'zstd' if ZSTD_AVAILABLE else 'zlib'})")
+
+
+def run_tables(conn: sqlite3.Connection) -> List[Tuple[str, Tuple[str, ...]]]:
+    """Every run table with the text columns the blob store references (legacy _vN tables folded in first)."""
+    ensure_run_tables(conn)
+    return list(RUN_TABLE_COLUMNS.items())
+
+
+def shared_head(texts: List[str]) -> str:
+    """Longest common prefix of texts, cut back to a paragraph boundary ("" if under two texts)."""
+    if len(texts) < 2:
+        return ""
+    head = os.path.commonprefix(texts)
+    cut = head.rfind("\n\n")
+    return head[:cut + 2] if cut > 0 else ""
+
+
+def compact(conn: sqlite3.Connection) -> int:
+    """Move inline text of existing run tables into the blob store; return the number of values moved."""
+    store = BlobStore(conn)
+    moved = 0
+    for table, columns in run_tables(conn):
+        cols = ", ".join(columns)
+        has_status = "status" in [r[1] for r in conn.execute(f"PRAGMA table_info({table})")]
+        rows = conn.execute(f"SELECT id, run_id, {cols}{', status' if has_status else ''} FROM {table}").fetchall()
+        # Legacy prompts predate the compiled prefix: share whatever head each run's prompts have in common
+        heads = {}
+        for run_id in {r[1] for r in rows}:
+            run_rows = [r for r in rows if r[1] == run_id]
+            for i, col in enumerate(columns):
+                if col in PREFIX_COLUMNS:
+                    heads[(run_id, col)] = shared_head([r[2 + i] for r in run_rows if r[2 + i] and not is_ref(r[2 + i])])
+        for row in rows:
+            if has_status and row[-1] == "partial":
+                continue  # still being checkpointed; converted when the scene completes
+            updates = {col: store.put(val, [heads.get((row[1], col), "")])
+                       for col, val in zip(columns, row[2:2 + len(columns)]) if val and not is_ref(val)}
+            if updates:
+                assignments = ", ".join(f"{c} = ?" for c in updates)
+                conn.execute(f"UPDATE {table} SET {assignments} WHERE id = ?", (*updates.values(), row[0]))
+                moved += len(updates)
+        conn.commit()
+    return moved
+
+
+def main():
+    print("🗜️  Lizzy Alpha - Blob Store")
+    print("=" * 40)
+    base_dir = Path("projects")
+    name = choose_project(base_dir, "Enter project name to compact: ")
+    if not name:
+        print("❌ No projects found. Run 'python3 start.py' first to create a project.")
+        return
+    db_path = base_dir / name / f"{name}.sqlite"
+
+    before = db_path.stat().st_size
+    conn = connect(db_path)
+    try:
+        moved = compact(conn)
+        conn.execute("VACUUM")
+        update_catalog(conn)
+        print(f"✅ Moved {moved} inline texts into the blob store")
+        print(BlobStore(conn).report())
+        print(f"💾 Database: {before / 1024:.0f} KB → {db_path.stat().st_size / 1024:.0f} KB")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -8,19 +8,40 @@ Queries multiple knowledge buckets to provide diverse perspectives.
 Author: Lizzy AI Writing Framework
 """
 
+import argparse
+import asyncio
+import hashlib
 import os
 import sqlite3
 from pathlib import Path
 from datetime import datetime
 
+from batch import BatchRunner, build_request
+from blob_store import BlobStore
+from buckets import LazyBuckets, index_fingerprint
+from catalog import choose_project
+from db import connect, get_write_queue
+from llm_client import DEFAULT_MODEL, GenerationError, acall_with_retries, build_messages, usage_stats
+from prompt_compiler import PromptCompiler
+from rate_limit import get_rate_limiter
+from response_cache import get_response_cache
+from run_state import RunState
+from run_tables import BRAINSTORM_TABLE, ensure_run_tables, latest_run_id, run_config, run_id_for_table, run_label
+
 # Import LightRAG and its query parameters
 try:
-    from lightrag import LightRAG, QueryParam
+    from lightrag import QueryParam
 except ImportError:
     print("⚠️  LightRAG not installed. Install with: pip install lightrag")
     print("   This module requires LightRAG for AI-powered brainstorming.")
     exit(1)
 
+try:
+    from dotenv import load_dotenv
+    load_dotenv()
+except ImportError:
+    pass
+
 
 # Define the golden era romcom tone for all brainstorming
 GOLDEN_ERA_ROMCOM_TONE = """You are brainstorming a romantic comedy that will revive the golden era of the genre—think When Harry Met Sally, You've Got Mail, Pretty Woman, Sleepless in Seattle, and Notting Hill. 
@@ -39,6 +60,24 @@ Avoid modern romcom pitfalls: manufactured misunderstandings that could be solve
 
 Instead, create something audiences will rewatch for decades—where every scene either deepens character, advances the relationship, or ideally both. Make us laugh, make us cry, make us believe in love again."""
 
+# Concurrency defaults for the async fan-out (overridable via environment)
+DEFAULT_MAX_CONCURRENCY = 6
+DEFAULT_BUCKET_LIMIT = 3
+
+
+def parse_bucket_limits(spec):
+    """Parse a 'books=2,scripts=3' style spec into a dict of per-bucket limits."""
+    limits = {}
+    for part in (spec or "").split(","):
+        if "=" not in part:
+            continue
+        name, value = part.split("=", 1)
+        try:
+            limits[name.strip()] = max(1, int(value))
+        except ValueError:
+            continue
+    return limits
+
 
 class BrainstormingAgent:
     """
@@ -46,13 +85,16 @@ class BrainstormingAgent:
     by querying different LightRAG knowledge buckets.
     """
     
-    def __init__(self, lightrag_instances=None, base_dir="projects"):
+    def __init__(self, lightrag_instances=None, base_dir="projects",
+                 max_concurrency=None, bucket_limits=None):
         """
         Initialize the BrainstormingAgent.
         
         Args:
             lightrag_instances: Dictionary mapping bucket names to LightRAG instances
             base_dir: Directory containing project folders
+            max_concurrency: Maximum number of bucket queries in flight at once
+            bucket_limits: Dictionary mapping bucket names to their own in-flight limit
         """
         self.lightrag = lightrag_instances or {}
         self.base_dir = Path(base_dir)
@@ -60,42 +102,55 @@ class BrainstormingAgent:
         self.db_path = None
         self.conn = None
         self.easter_egg = ""
-        self.table_name = None
+        self.run_id = None  # this run's row in run_state; keys its rows in brainstorm_responses
+        
+        # Incremental mode: reuse unchanged rows from the previous log version
+        self.incremental = False
+        self.previous_run = None
+        
+        # Shared on-disk response cache (None when disabled), keyed per bucket index state
+        self.cache = get_response_cache()
+        self.bucket_fingerprints = {}
+        
+        # Deduplicated, compressed storage for descriptions and responses
+        self.blobs = None
+        
+        # Background single writer for response rows (db.py)
+        self.writes = None
+        
+        # Checkpoint record for this run (see run_state.py)
+        self.run_state = None
+        
+        # Per-bucket static prompt prefixes, compiled once per run
+        self.prompt_compiler = PromptCompiler("bucket")
+        
+        # Batch mode: answer bucket queries through an offline batch job (see batch.py)
+        self.batch = False
+        
+        # Async fan-out limits
+        self.max_concurrency = max_concurrency or int(
+            os.getenv("BRAINSTORM_MAX_CONCURRENCY", DEFAULT_MAX_CONCURRENCY)
+        )
+        self.bucket_limits = parse_bucket_limits(os.getenv("BRAINSTORM_BUCKET_LIMITS"))
+        self.bucket_limits.update(bucket_limits or {})
         
     def setup_project(self):
         """Select and connect to a project database."""
-        print("📂 Available Projects:")
-        projects = [d.name for d in self.base_dir.iterdir() if d.is_dir()]
-        
-        if not projects:
+        project = choose_project(self.base_dir)
+        if not project:
             print("❌ No projects found. Run 'python3 start.py' first to create a project.")
             return False
-            
-        for project in projects:
-            print(f"  - {project}")
         
-        print()
-        while True:
-            project = input("Enter project name: ").strip()
-            
-            if project in projects:
-                self.project_name = project
-                self.db_path = self.base_dir / project / f"{project}.sqlite"
-                
-                if not self.db_path.exists():
-                    print(f"❌ Database not found for project '{project}'.")
-                    continue
-                    
-                try:
-                    self.conn = sqlite3.connect(self.db_path)
-                    self.conn.row_factory = sqlite3.Row
-                    print(f"✅ Connected to project: {project}")
-                    return True
-                except sqlite3.Error as e:
-                    print(f"❌ Database connection error: {e}")
-                    return False
-            else:
-                print("❌ Project not found. Please enter a valid project name.")
+        self.project_name = project
+        self.db_path = self.base_dir / project / f"{project}.sqlite"
+        try:
+            self.conn = connect(self.db_path)
+            self.conn.row_factory = sqlite3.Row
+            print(f"✅ Connected to project: {project}")
+            return True
+        except sqlite3.Error as e:
+            print(f"❌ Database connection error: {e}")
+            return False
     
     
     def input_easter_egg(self):
@@ -111,62 +166,75 @@ class BrainstormingAgent:
         if idea:
             print(f"✅ Easter egg added: {idea}")
     
-    def get_next_table_name(self):
-        """Find the next available version number for brainstorming log table."""
-        cursor = self.conn.cursor()
+    def get_latest_run_id(self):
+        """Return the most recent brainstorming run, if any."""
+        return latest_run_id(self.conn, "brainstorm")
+    
+    def choose_mode(self):
+        """Offer incremental mode when a previous brainstorming run exists."""
+        ensure_run_tables(self.conn)
+        self.previous_run = self.get_latest_run_id()
+        if not self.previous_run:
+            self.incremental = False
+            return
         
-        # Look for existing versioned tables
-        cursor.execute("""
-            SELECT name FROM sqlite_master 
-            WHERE type='table' AND name LIKE 'brainstorming_log_v%'
-        """)
-        tables = cursor.fetchall()
-        
-        # Extract version numbers
-        versions = []
-        for table in tables:
-            name = table['name']
-            if '_v' in name:
-                try:
-                    version = int(name.split('_v')[-1])
-                    versions.append(version)
-                except ValueError:
-                    continue
-        
-        # Determine next version
-        next_version = max(versions) + 1 if versions else 1
-        return f"brainstorming_log_v{next_version}"
+        if self.incremental:
+            print(f"♻️  Incremental mode: reusing unchanged rows from {run_label('brainstorm', self.previous_run)}")
+            return
+        
+        print(f"\n♻️  Previous brainstorm found: {run_label('brainstorm', self.previous_run)}")
+        print("  Incremental mode only re-queries scenes whose outline (or easter egg) changed")
+        choice = input("  Use incremental mode? (Y/n): ").strip().lower()
+        self.incremental = choice not in ['n', 'no']
     
     def setup_table(self):
-        """Create a new versioned table for this brainstorming session."""
-        self.table_name = self.get_next_table_name()
-        
-        cursor = self.conn.cursor()
-        cursor.execute(f"""
-            CREATE TABLE IF NOT EXISTS {self.table_name} (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                act INTEGER NOT NULL,
-                scene INTEGER NOT NULL,
-                scene_description TEXT NOT NULL,
-                bucket_name TEXT NOT NULL,
-                response TEXT NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
+        """Start a new brainstorming run; its rows go to brainstorm_responses under its run_id."""
+        ensure_run_tables(self.conn)
+        self.run_state = RunState.start(self.conn, "brainstorm", BRAINSTORM_TABLE, {
+            "easter_egg": self.easter_egg,
+            "incremental": self.incremental,
+            "previous_run": self.previous_run,
+            "batch": self.batch,
+        })
+        self.run_id = self.run_state.run_id
         
         # Also record this session in the main brainstorming_sessions table
+        cursor = self.conn.cursor()
         cursor.execute("""
             INSERT INTO brainstorming_sessions 
             (session_name, prompt, tone_preset, created_at)
             VALUES (?, ?, ?, CURRENT_TIMESTAMP)
         """, (
-            f"Session {self.table_name}",
+            f"Session {run_label('brainstorm', self.run_id)}",
             self.easter_egg or "No easter egg",
             "golden-era-romcom"
         ))
         
         self.conn.commit()
-        print(f"📝 Created brainstorming table: {self.table_name}")
+        print(f"📝 Started brainstorming run: {run_label('brainstorm', self.run_id)}")
+    
+    def resume_latest(self):
+        """Continue the most recent incomplete brainstorming run under its run_id."""
+        ensure_run_tables(self.conn)
+        state = RunState.latest_incomplete(self.conn, "brainstorm")
+        if not state:
+            print("ℹ️  No incomplete brainstorming run to resume; starting a new one.")
+            return False
+        
+        self.run_state = state
+        self.run_id = state.run_id
+        self.easter_egg = state.config.get("easter_egg", "")
+        self.incremental = state.config.get("incremental", False)
+        self.previous_run = state.config.get("previous_run")
+        if self.previous_run is None and state.config.get("previous_table"):
+            # Run started before the unified tables: its previous table was migrated under a run_id
+            self.previous_run = run_id_for_table(self.conn, "brainstorm", state.config["previous_table"])
+        self.batch = state.config.get("batch", self.batch)
+        
+        print(f"⏯️  Resuming brainstorming run: {run_label('brainstorm', self.run_id)}")
+        if self.easter_egg:
+            print(f"   Easter egg: {self.easter_egg}")
+        return True
     
     def fetch_all_scenes(self):
         """Fetch all scenes from story_outline table and synthesize descriptions."""
@@ -220,8 +288,71 @@ class BrainstormingAgent:
         
         return scenes
     
+    def compute_input_hash(self, scene_description, bucket_name, easter_egg=None):
+        """Hash everything that shapes a bucket query: description, bucket and easter egg."""
+        if easter_egg is None:
+            easter_egg = self.easter_egg
+        payload = "\x1f".join([scene_description, bucket_name, easter_egg or ""])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+    
+    def load_reusable_responses(self, run_id):
+        """
+        Map input hash -> response for every reusable row of a previous run.
+        
+        Rows migrated from older logs have no input_hash, so the hash is
+        recomputed from the stored description and the easter egg recorded
+        for that run. Error placeholders are never carried forward.
+        """
+        cursor = self.conn.cursor()
+        config = run_config(self.conn, run_id)
+        if "easter_egg" in config:
+            run_egg = config["easter_egg"] or ""
+        else:
+            # Runs older than run_state recorded their egg in brainstorming_sessions under the table name
+            cursor.execute("SELECT table_name FROM run_state WHERE id = ?", (run_id,))
+            row = cursor.fetchone()
+            cursor.execute(
+                "SELECT prompt FROM brainstorming_sessions WHERE session_name = ? ORDER BY id DESC LIMIT 1",
+                (f"Session {row['table_name'] if row else ''}",)
+            )
+            row = cursor.fetchone()
+            run_egg = row['prompt'] if row and row['prompt'] != "No easter egg" else ""
+        
+        cursor.execute(
+            f"SELECT scene_description, bucket_name, response, input_hash FROM {BRAINSTORM_TABLE} "
+            "WHERE run_id = ? ORDER BY id",
+            (run_id,)
+        )
+        
+        reusable = {}
+        blobs = self.blob_store()
+        for r in cursor.fetchall():
+            response = blobs.resolve(r['response'])
+            if not response or response.startswith(("Error querying", "Bucket '")):
+                continue
+            key = r['input_hash'] or self.compute_input_hash(
+                blobs.resolve(r['scene_description']), r['bucket_name'], run_egg
+            )
+            reusable[key] = response
+        return reusable
+    
     def create_prompt(self, bucket_name, scene_description):
         """Generate a tailored prompt for each bucket and scene."""
+        # Tone, twist and bucket expertise are fixed for the run: compile them once
+        # per bucket and put the scene description after them
+        return self.prompt_compiler.assemble(
+            bucket_name,
+            lambda: self.build_static_prefix(bucket_name),
+            f"""
+### Scene Description:
+{scene_description}
+
+Please provide specific, actionable suggestions for this scene.
+""",
+        )
+
+    def build_static_prefix(self, bucket_name):
+        """Session-invariant head of a bucket prompt."""
         # Start with the golden era romcom tone
         intro = GOLDEN_ERA_ROMCOM_TONE
         
@@ -256,46 +387,230 @@ Suggest how elevated language could intensify emotional moments."""
         # Get the expertise for this bucket
         expertise = bucket_guidance.get(bucket_name, "Provide creative insights for this scene.")
         
-        # Construct the full prompt
         return f"""
 {intro}
 
-### Scene Description:
-{scene_description}
-
 ### Task:
 {expertise.strip()}
-
-Please provide specific, actionable suggestions for this scene.
 """
     
-    def query_bucket(self, bucket_name, prompt):
-        """Query a specific LightRAG bucket with the prompt."""
+    def bucket_working_dir(self, bucket_name):
+        """A bucket's working directory, without loading a lazily built bucket."""
+        configs = getattr(self.lightrag, "configs", None)
+        if configs and bucket_name in configs:
+            return configs[bucket_name]
+        return getattr(self.lightrag.get(bucket_name), "working_dir", None)
+    
+    def cache_model(self, bucket_name):
+        """
+        Response-cache namespace for a bucket: its name plus its index fingerprint,
+        so documents added to the bucket invalidate its cached answers.
+        Computed once per run.
+        """
+        if bucket_name not in self.bucket_fingerprints:
+            self.bucket_fingerprints[bucket_name] = index_fingerprint(self.bucket_working_dir(bucket_name))
+        return f"lightrag:{bucket_name}:{self.bucket_fingerprints[bucket_name]}"
+    
+    def cached_response(self, bucket_name, prompt):
+        return self.cache.get(self.cache_model(bucket_name), "mix", prompt) if self.cache else None
+    
+    def cache_response(self, bucket_name, prompt, response):
+        if self.cache:
+            self.cache.put(self.cache_model(bucket_name), "mix", prompt, None, response)
+    
+    async def query_bucket_async(self, bucket_name, prompt):
+        """Query a bucket through LightRAG's async path (falls back to a worker thread)."""
         if bucket_name not in self.lightrag:
-            return f"Bucket '{bucket_name}' not configured."
+            raise GenerationError(f"Bucket '{bucket_name}' not configured.")
+        
+        # The cache is a sqlite file: keep its reads and writes off the event loop
+        cached = await asyncio.to_thread(self.cached_response, bucket_name, prompt)
+        if cached is not None:
+            return cached
+        
+        try:
+            rag = self.lightrag[bucket_name]
+        except KeyError:
+            raise GenerationError(f"Bucket '{bucket_name}' failed to load.")
+        # LLM calls inside LightRAG are already retried by llm_client; this
+        # only retries transient failures raised by LightRAG itself
+        if hasattr(rag, "aquery"):
+            response = await acall_with_retries(
+                rag.aquery, prompt, param=QueryParam(mode="mix"), label=f"{bucket_name} query"
+            )
+        else:
+            response = await acall_with_retries(
+                asyncio.to_thread, rag.query, prompt, param=QueryParam(mode="mix"), label=f"{bucket_name} query"
+            )
+        if not response:
+            raise GenerationError(f"Empty response from {bucket_name}")
+        await asyncio.to_thread(self.cache_response, bucket_name, prompt, response)
+        return response
+    
+    async def fan_out(self, units, on_result, known=None, on_failure=None):
+        """
+        Query every (act, scene, description, bucket) unit concurrently.
+        
+        A global semaphore caps total in-flight requests and a per-bucket
+        semaphore caps each knowledge bucket. Results are handed to
+        on_result strictly in the order of `units`, as soon as every
+        earlier unit has finished, so storage order stays deterministic.
+        Units whose index is in `known` are not queried; the given
+        response is stored in its place. Units that fail are handed to
+        on_failure with their GenerationError instead of being stored.
+        """
+        known = known or {}
+        global_limit = asyncio.Semaphore(self.max_concurrency)
+        bucket_sems = {
+            bucket: asyncio.Semaphore(self.bucket_limits.get(bucket, DEFAULT_BUCKET_LIMIT))
+            for bucket in {u[3] for u in units}
+        }
+        
+        async def run_unit(index, unit):
+            act, scene_num, description, bucket_name = unit
+            prompt = self.create_prompt(bucket_name, description)
+            async with bucket_sems[bucket_name]:
+                async with global_limit:
+                    print(f"  🔍 Querying {bucket_name} for Act {act}, Scene {scene_num}...")
+                    try:
+                        response = await self.query_bucket_async(bucket_name, prompt)
+                    except GenerationError as e:
+                        response = e
+            return index, response
+        
+        results = [known.get(i) for i in range(len(units))]
+        next_to_flush = 0
+        
+        def flush():
+            nonlocal next_to_flush
+            while next_to_flush < len(units) and results[next_to_flush] is not None:
+                result = results[next_to_flush]
+                if isinstance(result, GenerationError):
+                    if on_failure:
+                        on_failure(units[next_to_flush], result)
+                else:
+                    on_result(units[next_to_flush], result)
+                next_to_flush += 1
         
+        tasks = [
+            asyncio.create_task(run_unit(i, u))
+            for i, u in enumerate(units) if i not in known
+        ]
         try:
-            print(f"  🔍 Querying {bucket_name} bucket...")
-            response = self.lightrag[bucket_name].query(
-                prompt, 
-                param=QueryParam(mode="mix")
+            flush()
+            for finished in asyncio.as_completed(tasks):
+                index, response = await finished
+                results[index] = response if response is not None else ""
+                flush()
+        finally:
+            for task in tasks:
+                task.cancel()
+    
+    async def retrieval_prompt(self, bucket_name, prompt):
+        """LightRAG's retrieval-augmented system prompt for a query, without answering it."""
+        try:
+            rag = self.lightrag[bucket_name]
+        except KeyError:
+            raise GenerationError(f"Bucket '{bucket_name}' failed to load.")
+        param = QueryParam(mode="mix", only_need_prompt=True)
+        if hasattr(rag, "aquery"):
+            context = await acall_with_retries(rag.aquery, prompt, param=param, label=f"{bucket_name} retrieval")
+        else:
+            context = await acall_with_retries(
+                asyncio.to_thread, rag.query, prompt, param=param, label=f"{bucket_name} retrieval"
             )
-            return response
-        except Exception as e:
-            print(f"  ❌ Error querying {bucket_name}: {e}")
-            return f"Error querying {bucket_name}: {str(e)}"
+        if not context:
+            raise GenerationError(f"Empty retrieval context from {bucket_name}")
+        return context
+    
+    def run_batch_queries(self, units, on_result, known=None, on_failure=None):
+        """
+        Batch counterpart of fan_out.
+        
+        Retrieval still runs live (QueryParam only_need_prompt returns
+        LightRAG's context-filled prompt without calling the LLM); only the
+        answering calls go into one batch job. Results are handed to
+        on_result / on_failure in the order of `units`.
+        """
+        results = dict(known or {})
+        prompts = {}
+        for index, (act, scene_num, description, bucket_name) in enumerate(units):
+            if index in results:
+                continue
+            prompt = self.create_prompt(bucket_name, description)
+            cached = self.cached_response(bucket_name, prompt)
+            if cached is not None:
+                results[index] = cached
+            else:
+                prompts[index] = prompt
+        
+        async def gather_contexts():
+            limit = asyncio.Semaphore(self.max_concurrency)
+            
+            async def one(index):
+                async with limit:
+                    try:
+                        return index, await self.retrieval_prompt(units[index][3], prompts[index])
+                    except GenerationError as e:
+                        return index, e
+            
+            return dict(await asyncio.gather(*(one(i) for i in prompts)))
+        
+        print(f"📎 Building retrieval prompts for {len(prompts)} queries...")
+        contexts = asyncio.run(gather_contexts())
+        model = os.getenv("QUERY_LLM_MODEL_NAME", DEFAULT_MODEL)
+        ids, requests = {}, []
+        for index, context in contexts.items():
+            if isinstance(context, GenerationError):
+                results[index] = context
+                continue
+            act, scene_num, _, bucket_name = units[index]
+            ids[index] = f"act{act}-scene{scene_num}-{bucket_name}"
+            requests.append(build_request(ids[index], build_messages(prompts[index], system=context),
+                                          model, temperature=None))
+        
+        runner = BatchRunner(self.conn, self.base_dir / self.project_name / "batches")
+        answers = runner.run(run_label("brainstorm", self.run_id), "brainstorm", requests)
+        for index, custom_id in ids.items():
+            results[index] = answers[custom_id]
+            if isinstance(answers[custom_id], str):
+                self.cache_response(units[index][3], prompts[index], answers[custom_id])
+        
+        for index, unit in enumerate(units):
+            if isinstance(results[index], GenerationError):
+                if on_failure:
+                    on_failure(unit, results[index])
+            else:
+                on_result(unit, results[index])
+    
+    def blob_store(self):
+        if self.blobs is None:
+            self.blobs = BlobStore(self.conn)
+        return self.blobs
+    
+    def write_queue(self):
+        if self.writes is None:
+            self.writes = get_write_queue(self.conn)
+        return self.writes
     
     def save_response(self, act, scene, description, bucket_name, response):
-        """Save the brainstorming response to the database."""
-        cursor = self.conn.cursor()
+        """Queue the brainstorming response for the database writer (text columns hold blob references)."""
+        blobs = self.blob_store()
+        input_hash = self.compute_input_hash(description, bucket_name)
         
-        cursor.execute(f"""
-            INSERT INTO {self.table_name}
-            (act, scene, scene_description, bucket_name, response)
-            VALUES (?, ?, ?, ?, ?)
-        """, (act, scene, description, bucket_name, response))
+        def write(conn):
+            conn.execute(f"""
+                INSERT INTO {BRAINSTORM_TABLE}
+                (run_id, act, scene, scene_description, bucket_name, response, input_hash)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, (self.run_id, act, scene, blobs.put(description, conn=conn), bucket_name,
+                  blobs.put(response, conn=conn), input_hash))
+            
+            # Checkpoint in the same transaction as the row itself
+            if self.run_state:
+                self.run_state.mark_done(act, scene, bucket_name, commit=False, conn=conn)
         
-        self.conn.commit()
+        self.write_queue().submit(write)
     
     def run(self):
         """Main workflow: process each scene through all buckets."""
@@ -306,78 +621,129 @@ Please provide specific, actionable suggestions for this scene.
             print("   Run 'python3 intake.py' first to add scenes.")
             return
         
+        self.prompt_compiler = PromptCompiler("bucket")
+        
+        # Warm up every bucket this run queries, concurrently
+        if isinstance(self.lightrag, LazyBuckets):
+            self.lightrag.preload()
+            print(self.lightrag.timing_report())
+            if not self.lightrag:
+                print("❌ No LightRAG buckets could be initialized.")
+                return
+        
         print(f"\n📚 Found {len(scenes)} scenes to brainstorm")
         print(f"🎯 Will query {len(self.lightrag)} knowledge buckets per scene")
+        print(f"⚡ Concurrency: {self.max_concurrency} in flight "
+              f"(per bucket: {DEFAULT_BUCKET_LIMIT} unless overridden)")
         print("=" * 60)
         
-        # Process each scene
-        for act, scene_num, description in scenes:
-            print(f"\n🎬 Act {act}, Scene {scene_num}")
-            print("-" * 40)
+        # One unit per (act, scene, bucket), in the order rows will be stored
+        units = [
+            (act, scene_num, description, bucket_name)
+            for act, scene_num, description in scenes
+            for bucket_name in self.lightrag.keys()
+        ]
+        
+        # Resume: skip units this run already stored
+        if self.run_state:
+            self.run_state.set_total(len(units))
+            done = self.run_state.done_units()
+            if done:
+                units = [u for u in units if (u[0], u[1], u[3]) not in done]
+                print(f"⏯️  {len(done)} responses already saved; {len(units)} remaining")
+        
+        # Incremental mode: carry forward rows whose inputs are unchanged
+        known = {}
+        if self.incremental and self.previous_run:
+            reusable = self.load_reusable_responses(self.previous_run)
+            for index, (act, scene_num, description, bucket_name) in enumerate(units):
+                key = self.compute_input_hash(description, bucket_name)
+                if key in reusable:
+                    known[index] = reusable[key]
+            print(f"♻️  Reusing {len(known)} of {len(units)} responses from {run_label('brainstorm', self.previous_run)}; "
+                  f"querying {len(units) - len(known)}")
+        reused = {units[i] for i in known}
+        
+        def store(unit, response):
+            act, scene_num, description, bucket_name = unit
+            self.save_response(act, scene_num, description, bucket_name, response)
+            if unit in reused:
+                return
             
-            # Query each bucket for this scene
-            for bucket_name in self.lightrag.keys():
-                # Create tailored prompt
-                prompt = self.create_prompt(bucket_name, description)
-                
-                # Query the bucket
-                response = self.query_bucket(bucket_name, prompt)
-                
-                # Save to database
-                self.save_response(act, scene_num, description, bucket_name, response)
-                
-                # Display the result
-                print(f"\n🧠 Brainstorm ({bucket_name.capitalize()}):")
-                print(response[:500] + "..." if len(response) > 500 else response)
-                print()
+            # Display the result
+            print(f"\n🧠 Brainstorm ({bucket_name.capitalize()}) — Act {act}, Scene {scene_num}:")
+            print(response[:500] + "..." if len(response) > 500 else response)
+            print()
+        
+        failed = []
+        
+        def fail(unit, error):
+            act, scene_num, _, bucket_name = unit
+            failed.append(unit)
+            kind = "transient, retries exhausted" if error.transient else "permanent"
+            print(f"  ❌ {bucket_name} failed for Act {act}, Scene {scene_num} ({kind}): {error}")
+            if self.run_state:
+                # Queued like the responses, so the event loop never waits on the database
+                self.write_queue().submit(lambda conn: self.run_state.mark_failed(
+                    act, scene_num, bucket_name, str(error), commit=False, conn=conn))
+        
+        if self.batch:
+            self.run_batch_queries(units, store, known=known, on_failure=fail)
+        else:
+            asyncio.run(self.fan_out(units, store, known=known, on_failure=fail))
+        if self.writes:
+            self.writes.flush()
+        if self.run_state and not failed:
+            self.run_state.complete()
         
         print("\n" + "=" * 60)
-        print(f"✅ Brainstorming complete!")
-        print(f"📊 Generated {len(scenes) * len(self.lightrag)} creative responses")
-        print(f"💾 Saved to table: {self.table_name}")
+        print(f"✅ Brainstorming complete!" if not failed else
+              f"⚠️  Brainstorming finished with {len(failed)} failed queries (nothing stored for them)")
+        print(f"📊 Generated {len(units) - len(known) - len(failed)} creative responses"
+              + (f" ({len(known)} reused unchanged)" if known else ""))
+        if failed:
+            print("   Retry the failed queries with: python3 brainstorm.py --resume")
+        print(f"💾 Saved to {BRAINSTORM_TABLE} as {run_label('brainstorm', self.run_id)}")
+        if self.cache:
+            print(self.cache.report())
+        print(self.prompt_compiler.report())
+        print(usage_stats.report())
+        if get_rate_limiter():
+            print(get_rate_limiter().report())
+        print(self.blob_store().report())
+        if self.writes:
+            print(self.writes.report())
     
     def close(self):
-        """Close database connection."""
+        """Flush queued writes and close the database connection."""
+        if self.writes:
+            self.writes.flush()
         if self.conn:
             self.conn.close()
 
 
 def initialize_lightrag_buckets():
-    """Initialize LightRAG instances for each knowledge bucket."""
-    buckets = {}
-    
-    # Define bucket configurations
-    bucket_configs = {
-        "books": "./lightrag_working_dir/books",
-        "scripts": "./lightrag_working_dir/scripts", 
-        "plays": "./lightrag_working_dir/plays"
-    }
-    
-    print("🔧 Initializing LightRAG buckets...")
-    
-    for bucket_name, working_dir in bucket_configs.items():
-        try:
-            # Create directory if it doesn't exist
-            Path(working_dir).mkdir(parents=True, exist_ok=True)
-            
-            # Initialize LightRAG instance
-            buckets[bucket_name] = LightRAG(working_dir=working_dir)
-            print(f"  ✅ {bucket_name}: {working_dir}")
-            
-        except Exception as e:
-            print(f"  ⚠️  {bucket_name}: Failed to initialize - {e}")
-            print(f"      The {bucket_name} bucket will be skipped during brainstorming.")
-    
-    if not buckets:
-        print("\n❌ No LightRAG buckets could be initialized.")
-        print("   Please check your LightRAG installation and configuration.")
-        return None
+    """
+    Register the LightRAG knowledge buckets.
     
+    Instances are built lazily: nothing is loaded here, and run() warms
+    up the buckets it needs concurrently. Buckets that fail to load are
+    skipped during brainstorming.
+    """
+    buckets = LazyBuckets()
+    print(f"🔧 Registered LightRAG buckets (loaded on first use): {', '.join(buckets.configs)}")
     return buckets
 
 
 def main():
     """Entry point for the brainstorming module."""
+    parser = argparse.ArgumentParser(description="Lizzy Alpha - Brainstorm Module")
+    parser.add_argument("--resume", action="store_true",
+                        help="continue the latest incomplete brainstorming run")
+    parser.add_argument("--batch", action="store_true",
+                        help="answer bucket queries through an offline batch job (slower, cheaper)")
+    args = parser.parse_args()
+    
     print("🧠 Lizzy Alpha - Brainstorm Module")
     print("=" * 40)
     print("AI-powered creative brainstorming for your scenes")
@@ -394,14 +760,17 @@ def main():
     
     # Create brainstorming agent
     agent = BrainstormingAgent(lightrag_instances)
+    agent.batch = args.batch
     
     try:
         # Setup workflow
         if not agent.setup_project():
             return
         
-        agent.input_easter_egg()
-        agent.setup_table()
+        if not (args.resume and agent.resume_latest()):
+            agent.input_easter_egg()
+            agent.choose_mode()
+            agent.setup_table()
         
         # Run brainstorming
         print("\n🚀 Starting brainstorming process...")
@@ -409,6 +778,7 @@ def main():
         
     except KeyboardInterrupt:
         print("\n\n⏸️  Brainstorming cancelled.")
+        print("   Completed responses are saved. Continue with: python3 brainstorm.py --resume")
     except Exception as e:
         print(f"\n❌ Error: {e}")
     finally:
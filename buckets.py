@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Lizzy Alpha - Knowledge Buckets
+===============================
+Lazy registry of LightRAG knowledge buckets (books, scripts, plays).
+A bucket's LightRAG instance is only built the first time it is queried,
+and several buckets can be warmed up concurrently in a thread pool.
+Load timings are kept for a startup report.
+
+index_fingerprint() summarizes a bucket's index state so cached answers
+are keyed to the documents the bucket held when they were produced.
+
+Author: Lizzy AI Writing Framework
+"""
+
+import hashlib
+import os
+import threading
+import time
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Optional
+
+BUCKET_CONFIGS = {
+    "books": "./lightrag_working_dir/books",
+    "scripts": "./lightrag_working_dir/scripts",
+    "plays": "./lightrag_working_dir/plays",
+}
+
+# LightRAG's own query cache changes on every query, not with the index
+QUERY_CACHE_FILES = {"kv_store_llm_response_cache.json"}
+
+
+def index_fingerprint(working_dir: Optional[str]) -> str:
+    """Short hash of a working directory's files (name, size, mtime), query cache excluded; "" if missing."""
+    if not working_dir or not os.path.isdir(working_dir):
+        return ""
+    digest = hashlib.sha256()
+    with os.scandir(working_dir) as entries:
+        for entry in sorted(entries, key=lambda e: e.name):
+            if entry.name in QUERY_CACHE_FILES or not entry.is_file():
+                continue
+            stat = entry.stat()
+            digest.update(f"{entry.name}\0{stat.st_size}\0{stat.st_mtime_ns}\0".encode())
+    return digest.hexdigest()[:12]
+
+
+def _build_lightrag(working_dir: str):
+    from lightrag import LightRAG
+
+    from llm_client import lightrag_llm_func
+
+    Path(working_dir).mkdir(parents=True, exist_ok=True)
+    # Route bucket LLM calls through the shared pooled client
+    return LightRAG(working_dir=working_dir, llm_model_func=lightrag_llm_func)
+
+
+class LazyBuckets(Mapping):
+    """
+    Read-only mapping of bucket name -> LightRAG instance.
+
+    Keys are known up front; values are constructed on first access.
+    Buckets that fail to load are dropped from the mapping and reported.
+    """
+
+    def __init__(self, configs: Optional[Dict[str, str]] = None,
+                 factory: Optional[Callable[[str], object]] = None):
+        self.configs = dict(configs or BUCKET_CONFIGS)
+        self.factory = factory or _build_lightrag
+
+        self._instances: Dict[str, object] = {}
+        self._errors: Dict[str, str] = {}
+        self._timings: Dict[str, float] = {}
+        self._locks = {name: threading.Lock() for name in self.configs}
+        self.preload_seconds = 0.0
+
+    # Mapping interface
+    def __getitem__(self, name: str):
+        if name not in self.configs or name in self._errors:
+            raise KeyError(name)
+        instance = self.load(name)
+        if instance is None:
+            raise KeyError(name)
+        return instance
+
+    def __contains__(self, name) -> bool:
+        # Membership must not trigger a load
+        return name in self.configs and name not in self._errors
+
+    def __iter__(self):
+        return (name for name in self.configs if name not in self._errors)
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    # Loading
+    def load(self, name: str):
+        """Build (once) and return the LightRAG instance for a bucket, or None on failure."""
+        if name in self._instances:
+            return self._instances[name]
+        with self._locks[name]:
+            if name in self._instances:
+                return self._instances[name]
+            if name in self._errors:
+                return None
+            start = time.perf_counter()
+            try:
+                instance = self.factory(self.configs[name])
+            except Exception as e:
+                self._errors[name] = str(e)
+                self._timings[name] = time.perf_counter() - start
+                print(f"  ⚠️  {name}: Failed to initialize - {e}")
+                return None
+            self._timings[name] = time.perf_counter() - start
+            self._instances[name] = instance
+            print(f"  ✅ {name}: {self.configs[name]} ({self._timings[name]:.2f}s)")
+            return instance
+
+    def preload(self, names: Optional[Iterable[str]] = None, max_workers: Optional[int] = None) -> float:
+        """Load the given buckets (default: all) concurrently; return wall-clock seconds."""
+        pending = [n for n in (names or list(self.configs))
+                   if n in self.configs and n not in self._instances and n not in self._errors]
+        if not pending:
+            return 0.0
+        print(f"🔧 Loading LightRAG buckets: {', '.join(pending)}")
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=max_workers or len(pending)) as pool:
+            list(pool.map(self.load, pending))
+        elapsed = time.perf_counter() - start
+        self.preload_seconds += elapsed
+        return elapsed
+
+    @property
+    def loaded(self):
+        return list(self._instances)
+
+    @property
+    def errors(self) -> Dict[str, str]:
+        return dict(self._errors)
+
+    def timing_report(self) -> str:
+        lines = ["⏱️  Bucket startup timing:"]
+        for name in self.configs:
+            if name in self._instances:
+                lines.append(f"  {name:<8} loaded in {self._timings[name]:.2f}s")
+            elif name in self._errors:
+                lines.append(f"  {name:<8} failed after {self._timings[name]:.2f}s")
+            else:
+                lines.append(f"  {name:<8} not loaded (never queried)")
+        lines.append(f"  total load time {sum(self._timings.values()):.2f}s "
+                     f"({self.preload_seconds:.2f}s wall-clock when loaded in parallel)")
+        return "\n".join(lines)
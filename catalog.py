@@ -0,0 +1,394 @@
+#!/usr/bin/env python3
+"""
+Lizzy Alpha - Project Catalog
+=============================
+One small database at the projects root (projects/catalog.sqlite) with
+a row per project: title, genre, tone, scenes written, run counts, the
+last run and the database size. Listing, filtering and paging projects
+and the stats overview read only this file; project databases are not
+opened or even listed.
+
+Rows are kept current by the code that changes them: project creation
+writes the first row, and every brainstorm/write run refreshes its
+project's row when it starts and when it completes. A catalog is built
+by scanning the projects directory once, the first time it is opened
+(and again with --rebuild, e.g. after copying projects in by hand).
+
+Usage:
+    python catalog.py                       # first page of projects
+    python catalog.py --search beach --page 2
+    python catalog.py --genre Romance --status running
+    python catalog.py --stats
+
+Author: Lizzy AI Writing Framework
+"""
+
+import argparse
+import sqlite3
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+from db import connect, database_path
+
+CATALOG_FILE = "catalog.sqlite"
+PAGE_SIZE = 20
+
+# Catalog columns filled from a project database (besides name)
+ENTRY_COLUMNS = (
+    "title", "genre", "tone", "scenes_total", "scenes_written", "brainstorm_runs", "write_runs",
+    "last_run_kind", "last_run_id", "last_run_status", "last_run_at", "size_bytes", "created_at",
+)
+
+ORDERINGS = {
+    "updated": "updated_at DESC, name",
+    "name": "name",
+    "created": "created_at DESC, name",
+    "progress": "scenes_written DESC, name",
+    "size": "size_bytes DESC, name",
+}
+
+
+def catalog_path(base_dir: Union[str, Path] = "projects") -> Path:
+    return Path(base_dir) / CATALOG_FILE
+
+
+def ensure_catalog_table(conn: sqlite3.Connection) -> bool:
+    """Create the catalog table; return True if it did not exist yet."""
+    existed = conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='projects'").fetchone()
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS projects (
+            name TEXT PRIMARY KEY,
+            title TEXT,
+            genre TEXT,
+            tone TEXT,
+            scenes_total INTEGER NOT NULL DEFAULT 0,
+            scenes_written INTEGER NOT NULL DEFAULT 0,
+            brainstorm_runs INTEGER NOT NULL DEFAULT 0,
+            write_runs INTEGER NOT NULL DEFAULT 0,
+            last_run_kind TEXT,
+            last_run_id INTEGER,
+            last_run_status TEXT,
+            last_run_at TIMESTAMP,
+            size_bytes INTEGER NOT NULL DEFAULT 0,
+            created_at TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_projects_updated ON projects(updated_at)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_projects_genre ON projects(genre, updated_at)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_projects_status ON projects(last_run_status, updated_at)")
+    conn.commit()
+    return not existed
+
+
+def open_catalog(base_dir: Union[str, Path] = "projects") -> sqlite3.Connection:
+    """Connect to the catalog, building it from the projects directory when it is new."""
+    base = Path(base_dir)
+    base.mkdir(parents=True, exist_ok=True)
+    conn = connect(catalog_path(base))
+    conn.row_factory = sqlite3.Row
+    if ensure_catalog_table(conn):
+        rebuild_catalog(base, conn)
+    return conn
+
+
+def project_location(db_path: Union[str, Path]) -> Optional[Tuple[Path, str]]:
+    """(projects root, project name) for a database at <root>/<name>/<name>.sqlite, else None."""
+    path = Path(db_path)
+    if path.suffix != ".sqlite" or path.stem != path.parent.name:
+        return None
+    return path.parent.parent, path.stem
+
+
+def project_entry(conn: sqlite3.Connection) -> Dict:
+    """Catalog values for an open project database (a handful of small queries)."""
+    tables = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+    entry: Dict = {col: None for col in ENTRY_COLUMNS}
+    if "project_metadata" in tables:
+        meta = dict(conn.execute(
+            "SELECT key, value FROM project_metadata WHERE key IN ('title', 'genre', 'tone', 'created_date')"
+        ).fetchall())
+        entry.update(title=meta.get("title"), genre=meta.get("genre"), tone=meta.get("tone"),
+                     created_at=meta.get("created_date"))
+    if "story_outline" in tables:
+        entry["scenes_total"] = conn.execute("SELECT COUNT(*) FROM story_outline").fetchone()[0]
+    if "finalized_scenes" in tables:
+        entry["scenes_written"] = conn.execute("SELECT COUNT(*) FROM finalized_scenes").fetchone()[0]
+    if "run_state" in tables:
+        counts = dict(conn.execute("SELECT kind, COUNT(*) FROM run_state GROUP BY kind").fetchall())
+        entry["brainstorm_runs"] = counts.get("brainstorm", 0)
+        entry["write_runs"] = counts.get("write", 0)
+        last = conn.execute(
+            "SELECT kind, id, status, updated_at FROM run_state ORDER BY updated_at DESC, id DESC LIMIT 1"
+        ).fetchone()
+        if last:
+            entry.update(last_run_kind=last[0], last_run_id=last[1], last_run_status=last[2], last_run_at=last[3])
+    path = database_path(conn)
+    if path and Path(path).exists():
+        entry["size_bytes"] = Path(path).stat().st_size
+    for col in ("scenes_total", "scenes_written", "brainstorm_runs", "write_runs", "size_bytes"):
+        entry[col] = entry[col] or 0
+    return entry
+
+
+def register_projects(base_dir: Union[str, Path], entries: Iterable[Tuple[str, Dict]],
+                      catalog: Optional[sqlite3.Connection] = None) -> int:
+    """Insert or refresh catalog rows for (name, entry) pairs in one transaction."""
+    rows = [(name, *(entry.get(col) for col in ENTRY_COLUMNS)) for name, entry in entries]
+    if not rows:
+        return 0
+    conn = catalog or open_catalog(base_dir)
+    try:
+        columns = ", ".join(ENTRY_COLUMNS)
+        updates = ", ".join(f"{col} = excluded.{col}" for col in ENTRY_COLUMNS if col != "created_at")
+        conn.executemany(
+            f"""
+            INSERT INTO projects (name, {columns}, updated_at)
+            VALUES (?, {', '.join('?' * len(ENTRY_COLUMNS))}, CURRENT_TIMESTAMP)
+            ON CONFLICT(name) DO UPDATE SET {updates},
+                created_at = COALESCE(projects.created_at, excluded.created_at),
+                updated_at = CURRENT_TIMESTAMP
+            """,
+            rows,
+        )
+        conn.commit()
+    finally:
+        if catalog is None:
+            conn.close()
+    return len(rows)
+
+
+def update_catalog(conn: sqlite3.Connection):
+    """
+    Refresh the catalog row of the project behind an open connection.
+
+    Databases outside the <root>/<name>/<name>.sqlite layout (templates,
+    scratch files) are ignored; catalog errors are reported, never raised,
+    so bookkeeping cannot fail a run.
+    """
+    location = project_location(database_path(conn) or "")
+    if not location:
+        return
+    base, name = location
+    try:
+        register_projects(base, [(name, project_entry(conn))])
+    except (OSError, sqlite3.Error) as e:
+        print(f"⚠️  Could not update the project catalog: {e}")
+
+
+def rebuild_catalog(base_dir: Union[str, Path] = "projects", catalog: Optional[sqlite3.Connection] = None) -> int:
+    """Scan the projects directory and rewrite every catalog row (opens each project database once)."""
+    base = Path(base_dir)
+    entries = []
+    for project_dir in sorted(d for d in base.iterdir() if d.is_dir()) if base.exists() else []:
+        db_path = project_dir / f"{project_dir.name}.sqlite"
+        if not db_path.exists():
+            continue
+        try:
+            conn = connect(db_path)
+            try:
+                entries.append((project_dir.name, project_entry(conn)))
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            print(f"⚠️  Skipped {project_dir.name} while building the catalog: {e}")
+    conn = catalog or open_catalog(base)
+    try:
+        conn.execute("DELETE FROM projects")
+        register_projects(base, entries, catalog=conn)
+    finally:
+        if catalog is None:
+            conn.close()
+    return len(entries)
+
+
+def _filters(search: Optional[str], genre: Optional[str], status: Optional[str]) -> Tuple[str, List]:
+    clauses, params = [], []
+    if search:
+        clauses.append("(name LIKE ? OR title LIKE ?)")
+        params += [f"%{search}%"] * 2
+    if genre:
+        clauses.append("genre = ? COLLATE NOCASE")
+        params.append(genre)
+    if status:
+        clauses.append("last_run_status = ?")
+        params.append(status)
+    return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+
+def list_projects(base_dir: Union[str, Path] = "projects", search: Optional[str] = None,
+                  genre: Optional[str] = None, status: Optional[str] = None, order: str = "updated",
+                  limit: int = PAGE_SIZE, offset: int = 0) -> List[Dict]:
+    """
+    One page of catalog rows.
+
+    Args:
+        search: Substring of the project name or title
+        genre: Exact genre (case-insensitive)
+        status: Status of the last run ('running', 'complete')
+        order: One of ORDERINGS
+    """
+    where, params = _filters(search, genre, status)
+    conn = open_catalog(base_dir)
+    try:
+        rows = conn.execute(
+            f"SELECT * FROM projects{where} ORDER BY {ORDERINGS[order]} LIMIT ? OFFSET ?",
+            (*params, limit, offset),
+        ).fetchall()
+        return [dict(r) for r in rows]
+    finally:
+        conn.close()
+
+
+def count_projects(base_dir: Union[str, Path] = "projects", search: Optional[str] = None,
+                   genre: Optional[str] = None, status: Optional[str] = None) -> int:
+    where, params = _filters(search, genre, status)
+    conn = open_catalog(base_dir)
+    try:
+        return conn.execute(f"SELECT COUNT(*) FROM projects{where}", params).fetchone()[0]
+    finally:
+        conn.close()
+
+
+def find_project(base_dir: Union[str, Path], name: str) -> Optional[Dict]:
+    """Catalog row for a project; a project database missing from the catalog is added first."""
+    if not name:
+        return None
+    conn = open_catalog(base_dir)
+    try:
+        row = conn.execute("SELECT * FROM projects WHERE name = ?", (name,)).fetchone()
+        if row is None:
+            db_path = Path(base_dir) / name / f"{name}.sqlite"
+            if not db_path.exists():
+                return None
+            project = connect(db_path)
+            try:
+                register_projects(base_dir, [(name, project_entry(project))], catalog=conn)
+            finally:
+                project.close()
+            row = conn.execute("SELECT * FROM projects WHERE name = ?", (name,)).fetchone()
+        return dict(row)
+    finally:
+        conn.close()
+
+
+def catalog_stats(base_dir: Union[str, Path] = "projects") -> Dict:
+    conn = open_catalog(base_dir)
+    try:
+        totals = conn.execute(
+            """
+            SELECT COUNT(*), COALESCE(SUM(scenes_written), 0), COALESCE(SUM(size_bytes), 0),
+                   COALESCE(SUM(brainstorm_runs), 0), COALESCE(SUM(write_runs), 0),
+                   COALESCE(SUM(scenes_total > 0 AND scenes_written >= scenes_total), 0)
+            FROM projects
+            """
+        ).fetchone()
+        return {
+            "projects": totals[0],
+            "scenes_written": totals[1],
+            "size_bytes": totals[2],
+            "brainstorm_runs": totals[3],
+            "write_runs": totals[4],
+            "finished": totals[5],
+            "by_genre": [tuple(r) for r in conn.execute(
+                "SELECT COALESCE(genre, '-'), COUNT(*) FROM projects GROUP BY 1 ORDER BY 2 DESC"
+            )],
+            "by_status": [tuple(r) for r in conn.execute(
+                "SELECT COALESCE(last_run_status, 'no runs'), COUNT(*) FROM projects GROUP BY 1 ORDER BY 2 DESC"
+            )],
+        }
+    finally:
+        conn.close()
+
+
+def describe(project: Dict) -> str:
+    """One-line summary of a catalog row."""
+    parts = [f"{project['scenes_written']}/{project['scenes_total']} scenes"]
+    if project.get("last_run_kind"):
+        parts.append(f"last: {project['last_run_kind']} {project['last_run_status']}")
+    if project.get("genre"):
+        parts.append(project["genre"])
+    return f"{project['name']}  ({', '.join(parts)})"
+
+
+def choose_project(base_dir: Union[str, Path] = "projects", prompt: str = "Enter project name: ",
+                   allow_new: bool = False) -> Optional[str]:
+    """
+    Page through the catalog until the user enters a project name.
+
+    Enter shows the next page and "/text" filters by name or title.
+    Returns None when there are no projects (and allow_new is False);
+    with allow_new, any non-empty name is returned as typed.
+    """
+    if not allow_new and not count_projects(base_dir):
+        return None
+    search, offset = None, 0
+    while True:
+        total = count_projects(base_dir, search=search)
+        page = list_projects(base_dir, search=search, limit=PAGE_SIZE, offset=offset)
+        if page:
+            print(f"📂 Projects {offset + 1}-{offset + len(page)} of {total}"
+                  + (f" matching '{search}'" if search else "") + ":")
+            for project in page:
+                print(f"  - {describe(project)}")
+        else:
+            print(f"  (No projects{f' matching {search!r}' if search else ''})")
+        more = offset + len(page) < total
+        print("  " + ("Enter: next page · " if more else "") + "/text: filter")
+        print()
+        answer = input(prompt).strip()
+        if not answer:
+            offset = offset + PAGE_SIZE if more else 0
+            continue
+        if answer.startswith("/"):
+            search, offset = answer[1:].strip() or None, 0
+            continue
+        if allow_new or find_project(base_dir, answer):
+            return answer
+        print("❌ Project not found. Please enter a valid project name.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="List and summarize Lizzy projects from the catalog")
+    parser.add_argument("--search", help="Substring of the project name or title")
+    parser.add_argument("--genre", help="Only projects of this genre")
+    parser.add_argument("--status", help="Only projects whose last run has this status (running, complete)")
+    parser.add_argument("--order", choices=sorted(ORDERINGS), default="updated", help="Sort order (default: updated)")
+    parser.add_argument("--page", type=int, default=1, help="Page number (default 1)")
+    parser.add_argument("--page-size", type=int, default=PAGE_SIZE, help=f"Projects per page (default {PAGE_SIZE})")
+    parser.add_argument("--stats", action="store_true", help="Totals across all projects")
+    parser.add_argument("--rebuild", action="store_true", help="Rebuild the catalog from the project databases")
+    parser.add_argument("--base-dir", default="projects", help="Projects directory (default: projects)")
+    args = parser.parse_args()
+
+    print("🗃️  Lizzy Alpha - Project Catalog")
+    print("=" * 40)
+    if args.rebuild:
+        print(f"✅ Catalog rebuilt: {rebuild_catalog(args.base_dir)} projects")
+    if args.stats:
+        s = catalog_stats(args.base_dir)
+        print(f"📚 {s['projects']} projects, {s['finished']} fully written")
+        print(f"📝 {s['scenes_written']} scenes written over {s['write_runs']} write runs "
+              f"({s['brainstorm_runs']} brainstorm runs)")
+        print(f"💾 {s['size_bytes'] / (1024 * 1024):.1f} MB of project databases")
+        print("🎭 By genre: " + ", ".join(f"{g} {n}" for g, n in s["by_genre"]))
+        print("⏱️  Last run: " + ", ".join(f"{st} {n}" for st, n in s["by_status"]))
+        return
+
+    filters = {"search": args.search, "genre": args.genre, "status": args.status}
+    total = count_projects(args.base_dir, **filters)
+    if not total:
+        print("❌ No matching projects.")
+        return
+    pages = (total + args.page_size - 1) // args.page_size
+    page = min(max(args.page, 1), pages)
+    for project in list_projects(args.base_dir, order=args.order, limit=args.page_size,
+                                 offset=(page - 1) * args.page_size, **filters):
+        print(f"  - {describe(project)}")
+    print(f"\n📄 Page {page} of {pages} ({total} projects)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Lizzy Alpha - Context Packer
+============================
+Token accounting for write prompts. Each prompt section gets a fixed
+token budget and a priority; when the whole scene context is over the
+overall budget, the lowest-priority sections are trimmed first. A section
+given a summary is summarized instead of cut: its summary is followed by
+as much of the kept end of the text as still fits.
+
+Tokens are counted with tiktoken (a requirement); without it, or when its
+encoding files cannot be loaded offline, they are estimated at about 4
+characters per token.
+
+Author: Lizzy AI Writing Framework
+"""
+
+import os
+from typing import Dict, List, Optional
+
+TIKTOKEN_AVAILABLE = True
+try:
+    import tiktoken
+except ImportError:
+    TIKTOKEN_AVAILABLE = False
+
+TOKENIZER_MODEL = os.getenv("LLM_MODEL_NAME", "gpt-4o-mini")
+TRIM_MARKER = "...[trimmed]"
+
+_encoding = None
+_encoding_failed = False
+
+
+def _get_encoding():
+    """tiktoken encoding for the generation model, or None (no tiktoken / no BPE files offline)."""
+    global _encoding, _encoding_failed
+    if _encoding is not None or _encoding_failed or not TIKTOKEN_AVAILABLE:
+        return _encoding
+    try:
+        try:
+            _encoding = tiktoken.encoding_for_model(TOKENIZER_MODEL)
+        except KeyError:
+            _encoding = tiktoken.get_encoding("o200k_base")
+    except Exception:
+        _encoding_failed = True
+    return _encoding
+
+
+def count_tokens(text: str) -> int:
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return (len(text) + 3) // 4
+
+
+def truncate_to_tokens(text: str, max_tokens: int, keep: str = "head") -> str:
+    """
+    Cut text to at most max_tokens.
+
+    keep="head" keeps the beginning, keep="tail" keeps the ending, and
+    keep="lines" / "tail_lines" drop whole lines from the end / start.
+    """
+    if not text or count_tokens(text) <= max_tokens:
+        return text
+    if max_tokens <= 0:
+        return ""
+
+    if keep in ("lines", "tail_lines"):
+        lines = text.splitlines()
+        if keep == "tail_lines":
+            lines = lines[::-1]
+        kept: List[str] = []
+        used = count_tokens(TRIM_MARKER)
+        for line in lines:
+            cost = count_tokens(line) + 1
+            if used + cost > max_tokens:
+                break
+            kept.append(line)
+            used += cost
+        if keep == "tail_lines":
+            return "\n".join([TRIM_MARKER] + kept[::-1])
+        return "\n".join(kept + [TRIM_MARKER])
+
+    budget = max(0, max_tokens - count_tokens(TRIM_MARKER))
+    encoding = _get_encoding()
+    if encoding is not None:
+        ids = encoding.encode(text, disallowed_special=())
+        cut = encoding.decode(ids[-budget:] if keep == "tail" and budget else ids[:budget])
+    else:
+        chars = budget * 4
+        cut = text[-chars:] if keep == "tail" and chars else text[:chars]
+    return f"{TRIM_MARKER}{cut}" if keep == "tail" else f"{cut}{TRIM_MARKER}"
+
+
+class ContextPacker:
+    """
+    Fit named prompt sections into per-section and overall token budgets.
+
+    Priority 1 is the most important; higher numbers are trimmed first
+    when the packed total exceeds total_budget.
+    """
+
+    def __init__(self, total_budget: int):
+        self.total_budget = total_budget
+        self._sections: Dict[str, Dict] = {}
+        self.tokens: Dict[str, int] = {}
+        self.trimmed: List[str] = []
+        self.summarized: List[str] = []
+
+    def add(self, name: str, text: str, budget: Optional[int] = None, priority: int = 1, keep: str = "head",
+            summary: str = ""):
+        self._sections[name] = {"text": text or "", "budget": budget, "priority": priority, "keep": keep,
+                                "summary": summary or ""}
+
+    def _fit(self, name: str, max_tokens: int):
+        section = self._sections[name]
+        if count_tokens(section["text"]) <= max_tokens:
+            self.tokens[name] = count_tokens(section["text"])
+            return
+        summary = section["summary"]
+        if summary and name not in self.summarized:
+            # Summary first, then the kept end of the original text in whatever budget is left
+            rest = max_tokens - count_tokens(summary) - 1
+            if rest > 0:
+                fitted = f"{summary}\n{truncate_to_tokens(section['text'], rest, section['keep'])}"
+            else:
+                fitted = truncate_to_tokens(summary, max_tokens)
+            self.summarized.append(name)
+        else:
+            fitted = truncate_to_tokens(section["text"], max_tokens, section["keep"])
+            if name not in self.trimmed:
+                self.trimmed.append(name)
+        section["text"] = fitted
+        self.tokens[name] = count_tokens(fitted)
+
+    def pack(self) -> Dict[str, str]:
+        # 1) Per-section budgets
+        for name, section in self._sections.items():
+            if section["budget"] is not None:
+                self._fit(name, section["budget"])
+            else:
+                self.tokens[name] = count_tokens(section["text"])
+
+        # 2) Overall budget: shrink lowest-priority sections first
+        overflow = self.total - self.total_budget
+        for name in sorted(self._sections, key=lambda n: -self._sections[n]["priority"]):
+            if overflow <= 0:
+                break
+            if self._sections[name]["priority"] <= 1:
+                break
+            target = max(0, self.tokens[name] - overflow)
+            before = self.tokens[name]
+            self._fit(name, target)
+            overflow -= before - self.tokens[name]
+
+        return {name: section["text"] for name, section in self._sections.items()}
+
+    @property
+    def total(self) -> int:
+        return sum(self.tokens.values())
+
+    def summary(self) -> str:
+        parts = ", ".join(f"{n} {t}" for n, t in self.tokens.items() if t)
+        trimmed = f"; trimmed: {', '.join(self.trimmed)}" if self.trimmed else ""
+        summarized = f"; summarized: {', '.join(self.summarized)}" if self.summarized else ""
+        return f"{self.total}/{self.total_budget} tokens ({parts}{trimmed}{summarized})"
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Lizzy Alpha - Database Connections
+==================================
+One place that opens project databases, so every module gets the same
+tuning:
+
+- WAL journaling: readers never block the writer and vice versa
+- synchronous=NORMAL: commits append to the WAL without an fsync each
+  (durable at checkpoints; a crash can lose only the last moments)
+- memory-mapped reads and a larger page cache
+- a busy timeout instead of immediate "database is locked" errors
+
+High-volume row writes (brainstorm responses, run outputs, drafts and
+finalized scenes) go through a WriteQueue: one background thread with
+its own connection that executes queued writes in order and commits
+them in batches. Each queued write runs in its own savepoint, so a
+failing write is rolled back alone and the rest of the batch commits.
+Callers flush() before reading back what they queued.
+
+Author: Lizzy AI Writing Framework
+"""
+
+import atexit
+import os
+import queue
+import sqlite3
+import threading
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Any, Callable, Dict, Union
+
+PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "mmap_size": 256 * 1024 * 1024,
+    "cache_size": -64 * 1024,          # KiB (negative) -> 64 MB
+    "temp_store": "MEMORY",
+    "busy_timeout": 30000,             # ms
+}
+
+DEFAULT_BATCH_SIZE = 256               # queued writes per commit, at most
+
+WriteJob = Callable[[sqlite3.Connection], Any]
+_STOP = object()
+
+
+def connect(db_path: Union[str, Path], **kwargs) -> sqlite3.Connection:
+    """Open a database with the shared pragmas (usable from any thread; callers serialize access)."""
+    kwargs.setdefault("check_same_thread", False)
+    kwargs.setdefault("timeout", PRAGMAS["busy_timeout"] / 1000)
+    conn = sqlite3.connect(db_path, **kwargs)
+    for name, value in PRAGMAS.items():
+        conn.execute(f"PRAGMA {name} = {value}")
+    return conn
+
+
+def database_path(conn: sqlite3.Connection) -> str:
+    """File behind a connection's main database ("" for in-memory databases)."""
+    for row in conn.execute("PRAGMA database_list"):
+        if row[1] == "main":
+            return row[2] or ""
+    return ""
+
+
+class WriteQueue:
+    """A single writer thread for one database: queued writes run in order and commit in batches."""
+
+    def __init__(self, db_path: Union[str, Path], batch_size: int = DEFAULT_BATCH_SIZE):
+        self.db_path = str(db_path)
+        self.batch_size = batch_size
+        self.stats = {"writes": 0, "commits": 0, "failed": 0}
+        self._queue: "queue.Queue" = queue.Queue()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name=f"db-writer:{Path(self.db_path).name}", daemon=True)
+        self._thread.start()
+
+    def submit(self, job: WriteJob) -> Future:
+        """
+        Queue job(conn) to run on the writer's connection; return a future for its result.
+
+        The future resolves once the job's batch is committed. Jobs must not
+        commit themselves (pass commit=False to helpers that would).
+        """
+        if self._closed:
+            raise RuntimeError(f"Write queue for {self.db_path} is closed")
+        future: Future = Future()
+        self._queue.put((job, future))
+        return future
+
+    def execute(self, sql: str, params=()) -> Future:
+        """Queue a single statement; the future resolves to its lastrowid."""
+        return self.submit(lambda conn: conn.execute(sql, params).lastrowid)
+
+    def flush(self):
+        """Block until everything queued so far is committed."""
+        if self._closed:
+            return
+        marker: Future = Future()
+        self._queue.put((None, marker))
+        marker.result()
+
+    def close(self):
+        if self._closed:
+            return
+        self.flush()
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join()
+
+    def report(self) -> str:
+        s = self.stats
+        return (f"🗄️  DB writes: {s['writes']} in {s['commits']} commits"
+                + (f", {s['failed']} failed" if s["failed"] else ""))
+
+    def _run(self):
+        # Explicit transactions: one BEGIN IMMEDIATE ... COMMIT per batch, a savepoint per job
+        conn = connect(self.db_path, isolation_level=None)
+        try:
+            while True:
+                item = self._queue.get()
+                if item is _STOP:
+                    return
+                batch = [item]
+                while len(batch) < self.batch_size:
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is _STOP:
+                        self._queue.put(_STOP)  # finish this batch first
+                        break
+                    batch.append(item)
+                self._commit_batch(conn, batch)
+        finally:
+            conn.close()
+
+    def _commit_batch(self, conn: sqlite3.Connection, batch):
+        if all(job is None for job, _ in batch):
+            for _, marker in batch:
+                marker.set_result(None)
+            return
+        done = []
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for job, future in batch:
+                if job is None:
+                    done.append((future, None))
+                    continue
+                conn.execute("SAVEPOINT queued_write")
+                try:
+                    result = job(conn)
+                    conn.execute("RELEASE queued_write")
+                    done.append((future, result))
+                except Exception as e:
+                    conn.execute("ROLLBACK TO queued_write")
+                    conn.execute("RELEASE queued_write")
+                    self.stats["failed"] += 1
+                    print(f"⚠️  Database write failed: {e}")
+                    future.set_exception(e)
+            conn.execute("COMMIT")
+        except sqlite3.Error as e:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            print(f"⚠️  Database batch of {len(batch)} writes failed: {e}")
+            for job, future in batch:
+                if not future.done():
+                    if job is None:
+                        future.set_result(None)
+                    else:
+                        self.stats["failed"] += 1
+                        future.set_exception(e)
+            return
+        self.stats["commits"] += 1
+        self.stats["writes"] += sum(1 for job, future in batch if job is not None and not future.done())
+        for future, result in done:
+            future.set_result(result)
+
+
+_queues: Dict[str, WriteQueue] = {}
+_queues_lock = threading.Lock()
+
+
+def get_write_queue(conn_or_path: Union[sqlite3.Connection, str, Path]) -> WriteQueue:
+    """The process-wide write queue for a database (given its path or any connection to it)."""
+    path = database_path(conn_or_path) if isinstance(conn_or_path, sqlite3.Connection) else str(conn_or_path)
+    if not path:
+        raise ValueError("A write queue needs a file-backed database")
+    key = os.path.abspath(path)
+    with _queues_lock:
+        writer = _queues.get(key)
+        if writer is None or writer._closed:
+            writer = _queues[key] = WriteQueue(key)
+        return writer
+
+
+def close_write_queues():
+    """Commit and stop every write queue (also runs at interpreter exit)."""
+    with _queues_lock:
+        writers = list(_queues.values())
+        _queues.clear()
+    for writer in writers:
+        writer.close()
+
+
+atexit.register(close_write_queues)
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Lizzy Alpha - Brainstorm Digest
+===============================
+Optional stage between brainstorm.py and write.py.
+Condenses each scene's books/scripts/plays responses into a short,
+structured digest stored in the project database (brainstorm_digests).
+Digests are keyed by a hash of the source responses, so they are only
+recomputed when the brainstorm itself changes. write.py uses a scene's
+digest in place of the raw bucket text whenever a current one exists.
+
+Author: Lizzy AI Writing Framework
+"""
+
+import asyncio
+import hashlib
+import sqlite3
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from blob_store import BlobStore
+from catalog import choose_project
+from context_packer import count_tokens
+from db import connect
+from llm_client import acomplete, usage_stats
+from run_tables import BRAINSTORM_TABLE, ensure_run_tables, latest_run_id, run_label
+
+DIGEST_MODEL = "gpt-4o-mini"
+DIGEST_TEMPERATURE = 0.3
+DIGEST_MAX_TOKENS = 350
+DEFAULT_DIGEST_CONCURRENCY = 6
+
+SceneKey = Tuple[int, int]
+
+
+def ensure_digest_table(conn: sqlite3.Connection):
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS brainstorm_digests (
+            act INTEGER NOT NULL,
+            scene INTEGER NOT NULL,
+            source_hash TEXT NOT NULL,
+            source_table TEXT,
+            digest TEXT NOT NULL,
+            source_tokens INTEGER,
+            digest_tokens INTEGER,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (act, scene, source_hash)
+        )
+        """
+    )
+    conn.commit()
+
+
+def latest_brainstorm_run(conn: sqlite3.Connection) -> Optional[int]:
+    ensure_run_tables(conn)
+    return latest_run_id(conn, "brainstorm")
+
+
+def load_brainstorm_index(conn: sqlite3.Connection, run_id: int) -> Dict[SceneKey, Dict[str, str]]:
+    """One query: (act, scene) -> bucket -> concatenated responses of a brainstorm run."""
+    grouped: Dict[SceneKey, Dict[str, List[str]]] = {}
+    blobs = BlobStore(conn)
+    cursor = conn.cursor()
+    cursor.execute(
+        f"SELECT act, scene, bucket_name, response FROM {BRAINSTORM_TABLE} WHERE run_id = ? ORDER BY id",
+        (run_id,),
+    )
+    for act, scene, bucket, response in cursor.fetchall():
+        grouped.setdefault((act, scene), {}).setdefault(bucket.strip(), []).append(blobs.resolve(response))
+    return {
+        key: {b: "\n\n".join(txts) for b, txts in buckets.items()}
+        for key, buckets in grouped.items()
+    }
+
+
+def source_hash(by_bucket: Dict[str, str]) -> str:
+    h = hashlib.sha256()
+    for bucket in sorted(by_bucket):
+        h.update(bucket.encode("utf-8") + b"\x00" + by_bucket[bucket].encode("utf-8") + b"\x00")
+    return h.hexdigest()
+
+
+def build_digest_prompt(act: int, scene: int, title: str, by_bucket: Dict[str, str]) -> str:
+    sources = "\n\n".join(f"[{b.upper()}]\n{text.strip()}" for b, text in by_bucket.items())
+    sections = "\n".join(f"{b.upper()}: <2-3 sentences: the most useful advice from this source>" for b in by_bucket)
+    return f"""
+Condense the brainstorming notes below for Act {act}, Scene {scene} ({title or 'Untitled'}) into a digest
+a scene writer can act on. Keep concrete ideas (beats, jokes, images, lines of tension); drop generic advice,
+repetition and references the writer does not need. At most 180 words, in exactly this shape:
+
+{sections}
+IDEAS TO TRY:
+- <idea>
+- <idea>
+- <idea>
+
+NOTES
+{sources}
+""".strip()
+
+
+class BrainstormDigester:
+    """Builds and looks up per-scene digests of a brainstorm run."""
+
+    def __init__(self, conn: sqlite3.Connection, max_concurrency: int = DEFAULT_DIGEST_CONCURRENCY):
+        self.conn = conn
+        self.max_concurrency = max_concurrency
+        ensure_digest_table(conn)
+
+    def get(self, act: int, scene: int, digest_hash: str) -> Optional[str]:
+        cursor = self.conn.cursor()
+        cursor.execute(
+            "SELECT digest FROM brainstorm_digests WHERE act=? AND scene=? AND source_hash=?",
+            (act, scene, digest_hash),
+        )
+        row = cursor.fetchone()
+        return row[0] if row else None
+
+    def current_digests(self, index: Dict[SceneKey, Dict[str, str]]) -> Dict[SceneKey, str]:
+        """Digests whose source hash matches the brainstorm currently in use."""
+        digests: Dict[SceneKey, str] = {}
+        for (act, scene), by_bucket in index.items():
+            digest = self.get(act, scene, source_hash(by_bucket))
+            if digest:
+                digests[(act, scene)] = digest
+        return digests
+
+    def save(self, act: int, scene: int, digest_hash: str, run_id: int, by_bucket: Dict[str, str], digest: str):
+        self.conn.execute(
+            """
+            INSERT OR REPLACE INTO brainstorm_digests
+            (act, scene, source_hash, source_table, digest, source_tokens, digest_tokens, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+            """,
+            (act, scene, digest_hash, run_label("brainstorm", run_id), digest,
+             sum(count_tokens(t) for t in by_bucket.values()), count_tokens(digest)),
+        )
+        self.conn.commit()
+
+    async def adigest_all(self, run_id: int, index: Dict[SceneKey, Dict[str, str]],
+                          titles: Optional[Dict[SceneKey, str]] = None) -> Dict[str, int]:
+        """Digest every scene that has no current digest; return counts for the report."""
+        limit = asyncio.Semaphore(self.max_concurrency)
+        counts = {"digested": 0, "reused": 0, "failed": 0}
+
+        async def one(key: SceneKey, by_bucket: Dict[str, str]):
+            act, scene = key
+            digest_hash = source_hash(by_bucket)
+            if self.get(act, scene, digest_hash):
+                counts["reused"] += 1
+                return
+            prompt = build_digest_prompt(act, scene, (titles or {}).get(key, ""), by_bucket)
+            async with limit:
+                try:
+                    digest = await acomplete(prompt, model=DIGEST_MODEL, temperature=DIGEST_TEMPERATURE,
+                                             max_tokens=DIGEST_MAX_TOKENS)
+                except Exception as e:
+                    print(f"  ⚠️  Act {act}, Scene {scene}: digest failed - {e}")
+                    counts["failed"] += 1
+                    return
+            if not digest:
+                counts["failed"] += 1
+                return
+            self.save(act, scene, digest_hash, run_id, by_bucket, digest)
+            counts["digested"] += 1
+            print(f"  🧾 Act {act}, Scene {scene}: digest saved")
+
+        await asyncio.gather(*(one(key, by_bucket) for key, by_bucket in sorted(index.items())))
+        return counts
+
+    def run(self, run_id: int, titles: Optional[Dict[SceneKey, str]] = None,
+            index: Optional[Dict[SceneKey, Dict[str, str]]] = None) -> Dict[SceneKey, str]:
+        """Digest a brainstorm run and return the current digests."""
+        index = index if index is not None else load_brainstorm_index(self.conn, run_id)
+        print(f"🧾 Digesting {len(index)} scenes from {run_label('brainstorm', run_id)}...")
+        counts = asyncio.run(self.adigest_all(run_id, index, titles))
+        digests = self.current_digests(index)
+        source = sum(count_tokens(t) for k in digests for t in index[k].values())
+        condensed = sum(count_tokens(d) for d in digests.values())
+        print(f"✅ Digests: {counts['digested']} new, {counts['reused']} unchanged, {counts['failed']} failed")
+        if source:
+            print(f"📉 Brainstorm context: {source} → {condensed} tokens ({1 - condensed / source:.0%} smaller)")
+        return digests
+
+
+def main():
+    print("🧾 Lizzy Alpha - Brainstorm Digest")
+    print("=" * 40)
+    base_dir = Path("projects")
+    name = choose_project(base_dir)
+    if not name:
+        print("❌ No projects found. Run 'python3 start.py' first to create a project.")
+        return
+    db_path = base_dir / name / f"{name}.sqlite"
+
+    conn = connect(db_path)
+    try:
+        run_id = latest_brainstorm_run(conn)
+        if not run_id:
+            print("❌ No brainstorming run found. Run 'python3 brainstorm.py' first.")
+            return
+        titles = {(a, s): t for a, s, t in conn.execute("SELECT act, scene, scene_title FROM story_outline")}
+        BrainstormDigester(conn).run(run_id, titles)
+        print(usage_stats.report())
+    except KeyboardInterrupt:
+        print("\n\n⏸️  Digest cancelled. Finished digests are saved.")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
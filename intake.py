@@ -17,6 +17,9 @@ from rich.prompt import Prompt, Confirm
 from rich.panel import Panel
 from rich import print as rprint
 
+from catalog import PAGE_SIZE, count_projects, describe, list_projects
+from db import connect
+
 
 class RichIntake:
     """Rich terminal interface for story editing."""
@@ -36,22 +39,39 @@ class RichIntake:
         # Create base directory if it doesn't exist
         self.base_dir.mkdir(parents=True, exist_ok=True)
         
-        # List existing projects
-        existing_projects = [d.name for d in self.base_dir.iterdir() if d.is_dir()]
-        if not existing_projects:
+        # List existing projects, a page at a time from the catalog
+        if not count_projects(self.base_dir):
             self.console.print("[red]❌ No projects found. Run 'python start.py' first to create a project.[/red]")
             return False
         
-        self.console.print("📂 Available projects:")
-        for i, project in enumerate(existing_projects, 1):
-            self.console.print(f"  {i}. {project}")
-        
-        choice = Prompt.ask("Select project number", choices=[str(i+1) for i in range(len(existing_projects))])
-        try:
-            idx = int(choice) - 1
-            self.project_name = existing_projects[idx]
-        except (ValueError, IndexError):
-            return False
+        search, offset = None, 0
+        while True:
+            total = count_projects(self.base_dir, search=search)
+            page = list_projects(self.base_dir, search=search, limit=PAGE_SIZE, offset=offset)
+            if not page:
+                self.console.print(f"[yellow]No projects matching '{search}'[/yellow]")
+                search, offset = None, 0
+                continue
+            self.console.print(f"📂 Projects {offset + 1}-{offset + len(page)} of {total}:")
+            for i, project in enumerate(page, 1):
+                self.console.print(f"  {i}. {describe(project)}")
+            more = offset + len(page) < total
+            choice = Prompt.ask("Select project number" + (" (Enter: next page, /text: filter)" if more
+                                                           else " (/text: filter)"), default="", show_default=False)
+            if not choice:
+                offset = offset + PAGE_SIZE if more else 0
+                continue
+            if choice.startswith("/"):
+                search, offset = choice[1:].strip() or None, 0
+                continue
+            try:
+                idx = int(choice) - 1
+                if not 0 <= idx < len(page):
+                    raise IndexError
+                self.project_name = page[idx]["name"]
+                break
+            except (ValueError, IndexError):
+                self.console.print("[red]❌ Enter a number from the list.[/red]")
         
         # Connect to database
         project_dir = self.base_dir / self.project_name
@@ -62,7 +82,7 @@ class RichIntake:
             return False
         
         try:
-            self.conn = sqlite3.connect(self.db_path)
+            self.conn = connect(self.db_path)
             self.conn.row_factory = sqlite3.Row
             self.console.print(f"[green]✅ Connected to project: {self.project_name}[/green]")
             return True
@@ -0,0 +1,390 @@
+#!/usr/bin/env python3
+"""
+Lizzy Alpha - LLM Client
+========================
+One shared, pooled OpenAI client for the whole process.
+Every module goes through the same persistent HTTP connection pool
+(keep-alive, so no TLS handshake per scene) with configurable timeouts.
+An async variant is kept per event loop for concurrent generation.
+
+Failed calls are retried with jittered exponential backoff when the
+error is transient (timeouts, connection drops, 429, 5xx); permanent
+errors and exhausted retries raise GenerationError instead of being
+returned as text.
+
+Every completion first passes the shared client-side rate limiter
+(rate_limit.py): requests and estimated tokens per minute, plus an
+adaptive concurrency window that backs off on 429s.
+
+Prompt/cached-token usage reported by the provider is accumulated in
+usage_stats for an end-of-run report.
+
+Point LLM_BASE_URL (or OPENAI_BASE_URL) at any OpenAI-compatible server,
+e.g. a local stub, to exercise the full request path offline.
+
+Author: Lizzy AI Writing Framework
+"""
+
+import asyncio
+import os
+import random
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from context_packer import count_tokens
+from rate_limit import get_rate_limiter
+
+try:
+    from dotenv import load_dotenv
+    load_dotenv()
+except ImportError:
+    pass
+
+DEFAULT_MODEL = os.getenv("LLM_MODEL_NAME", "gpt-4o-mini")
+DEFAULT_SYSTEM_PROMPT = "You are an expert screenwriter and novelist specializing in romantic comedies."
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+def client_settings() -> Dict[str, float]:
+    """Pool and timeout settings, read from the environment at client creation."""
+    return {
+        "timeout": _env_float("LLM_TIMEOUT", 120.0),
+        "connect_timeout": _env_float("LLM_CONNECT_TIMEOUT", 10.0),
+        "max_connections": int(_env_float("LLM_MAX_CONNECTIONS", 20)),
+        "max_keepalive": int(_env_float("LLM_MAX_KEEPALIVE", 10)),
+        "keepalive_expiry": _env_float("LLM_KEEPALIVE_EXPIRY", 60.0),
+    }
+
+
+def retry_settings() -> Dict[str, float]:
+    return {
+        "max_retries": int(_env_float("LLM_MAX_RETRIES", 4)),
+        "base_delay": _env_float("LLM_RETRY_BASE_DELAY", 1.0),
+        "max_delay": _env_float("LLM_RETRY_MAX_DELAY", 30.0),
+    }
+
+
+def _base_url(base_url: Optional[str]) -> Optional[str]:
+    return base_url or os.getenv("LLM_BASE_URL") or os.getenv("OPENAI_BASE_URL") or None
+
+
+_lock = threading.Lock()
+_client = None
+_async_clients: Dict[int, object] = {}
+
+
+def get_client(base_url: Optional[str] = None):
+    """Return the process-wide synchronous OpenAI client (created on first use)."""
+    global _client
+    if _client is not None and base_url is None:
+        return _client
+
+    import httpx
+    import openai
+
+    cfg = client_settings()
+    with _lock:
+        if _client is not None and base_url is None:
+            return _client
+        client = openai.OpenAI(
+            base_url=_base_url(base_url),
+            max_retries=0,  # retries are handled by call_with_retries
+            timeout=httpx.Timeout(cfg["timeout"], connect=cfg["connect_timeout"]),
+            http_client=httpx.Client(
+                limits=httpx.Limits(
+                    max_connections=cfg["max_connections"],
+                    max_keepalive_connections=cfg["max_keepalive"],
+                    keepalive_expiry=cfg["keepalive_expiry"],
+                ),
+                timeout=httpx.Timeout(cfg["timeout"], connect=cfg["connect_timeout"]),
+            ),
+        )
+        if base_url is None:
+            _client = client
+        return client
+
+
+def get_async_client(base_url: Optional[str] = None):
+    """
+    Return the AsyncOpenAI client for the running event loop.
+
+    httpx async connections are bound to the loop that opened them, so
+    one pooled client is kept per loop rather than one per process.
+    """
+    import httpx
+    import openai
+
+    loop = asyncio.get_running_loop()
+    key = id(loop)
+    if base_url is None and key in _async_clients:
+        return _async_clients[key]
+
+    cfg = client_settings()
+    client = openai.AsyncOpenAI(
+        base_url=_base_url(base_url),
+        max_retries=0,  # retries are handled by acall_with_retries
+        timeout=httpx.Timeout(cfg["timeout"], connect=cfg["connect_timeout"]),
+        http_client=httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=cfg["max_connections"],
+                max_keepalive_connections=cfg["max_keepalive"],
+                keepalive_expiry=cfg["keepalive_expiry"],
+            ),
+            timeout=httpx.Timeout(cfg["timeout"], connect=cfg["connect_timeout"]),
+        ),
+    )
+    if base_url is None:
+        # Drop clients whose loop has gone away (each asyncio.run() makes a new loop)
+        for stale in [k for k in _async_clients if k != key]:
+            _async_clients.pop(stale, None)
+        _async_clients[key] = client
+    return client
+
+
+def reset_clients():
+    """Forget cached clients so the next call picks up new settings (e.g. a stub base URL)."""
+    global _client
+    with _lock:
+        if _client is not None:
+            _client.close()
+        _client = None
+        _async_clients.clear()
+
+
+class GenerationError(Exception):
+    """An LLM call that failed permanently or ran out of retries."""
+
+    def __init__(self, message: str, transient: bool = False, attempts: int = 1):
+        super().__init__(message)
+        self.transient = transient
+        self.attempts = attempts
+
+
+TRANSIENT_STATUS_CODES = {408, 409, 425, 429, 500, 502, 503, 504}
+
+
+def is_transient(exc: BaseException) -> bool:
+    """True for errors worth retrying: timeouts, dropped connections, rate limits, server errors."""
+    if isinstance(exc, GenerationError):
+        return False  # already retried
+    if isinstance(exc, (asyncio.TimeoutError, TimeoutError, ConnectionError)):
+        return True
+    try:
+        import httpx
+        import openai
+    except ImportError:
+        return False
+    if isinstance(exc, (openai.APITimeoutError, openai.APIConnectionError, httpx.TransportError)):
+        return True
+    if isinstance(exc, openai.APIStatusError):
+        return exc.status_code in TRANSIENT_STATUS_CODES
+    return False
+
+
+def retry_delay(attempt: int, exc: Optional[BaseException] = None) -> float:
+    """Full-jitter exponential backoff, honouring a server's Retry-After when it sends one."""
+    cfg = retry_settings()
+    response = getattr(exc, "response", None)
+    retry_after = response.headers.get("retry-after") if response is not None else None
+    if retry_after:
+        try:
+            return min(cfg["max_delay"], float(retry_after))
+        except ValueError:
+            pass
+    return random.uniform(0, min(cfg["max_delay"], cfg["base_delay"] * (2 ** attempt)))
+
+
+def _describe(exc: BaseException) -> str:
+    return f"{type(exc).__name__}: {exc}"
+
+
+def is_rate_limited(exc: BaseException) -> bool:
+    return getattr(exc, "status_code", None) == 429
+
+
+def estimate_request_tokens(messages: List[Dict[str, str]], max_tokens: int) -> int:
+    """Tokens a request can consume: the prompt plus the full completion budget."""
+    return sum(count_tokens(m.get("content") or "") + 4 for m in messages) + max_tokens
+
+
+def response_tokens(response) -> Optional[int]:
+    usage = getattr(response, "usage", None)
+    return getattr(usage, "total_tokens", None) if usage is not None else None
+
+
+def call_with_retries(fn: Callable, *args, label: str = "LLM call", tokens: int = 0, **kwargs):
+    """
+    Call fn, retrying transient failures; raise GenerationError when it cannot succeed.
+
+    With `tokens` (the request's estimated size) every attempt is admitted by the shared rate limiter.
+    """
+    max_retries = retry_settings()["max_retries"]
+    limiter = get_rate_limiter() if tokens else None
+    for attempt in range(max_retries + 1):
+        if limiter:
+            limiter.acquire(tokens)
+        started = time.monotonic()
+        try:
+            result = fn(*args, **kwargs)
+            if limiter:
+                limiter.release(time.monotonic() - started, reserved=tokens, used=response_tokens(result))
+            return result
+        except Exception as e:
+            if limiter:
+                # Nothing was generated: the whole reservation goes back to the token budget
+                limiter.release(time.monotonic() - started, rate_limited=is_rate_limited(e), reserved=tokens, used=0)
+            if not is_transient(e):
+                if isinstance(e, GenerationError):
+                    raise
+                raise GenerationError(_describe(e), transient=False, attempts=attempt + 1) from e
+            if attempt == max_retries:
+                raise GenerationError(_describe(e), transient=True, attempts=attempt + 1) from e
+            delay = retry_delay(attempt, e)
+            print(f"  🔁 {label} failed ({_describe(e)}); retry {attempt + 1}/{max_retries} in {delay:.1f}s")
+            time.sleep(delay)
+        except BaseException:
+            # Cancelled (asyncio.CancelledError) or interrupted: free the slot and the reservation
+            if limiter:
+                limiter.release(time.monotonic() - started, reserved=tokens, cancelled=True)
+            raise
+
+
+async def acall_with_retries(fn: Callable, *args, label: str = "LLM call", tokens: int = 0, **kwargs):
+    """Async counterpart of call_with_retries for coroutine functions."""
+    max_retries = retry_settings()["max_retries"]
+    limiter = get_rate_limiter() if tokens else None
+    for attempt in range(max_retries + 1):
+        if limiter:
+            await limiter.aacquire(tokens)
+        started = time.monotonic()
+        try:
+            result = await fn(*args, **kwargs)
+            if limiter:
+                limiter.release(time.monotonic() - started, reserved=tokens, used=response_tokens(result))
+            return result
+        except Exception as e:
+            if limiter:
+                # Nothing was generated: the whole reservation goes back to the token budget
+                limiter.release(time.monotonic() - started, rate_limited=is_rate_limited(e), reserved=tokens, used=0)
+            if not is_transient(e):
+                if isinstance(e, GenerationError):
+                    raise
+                raise GenerationError(_describe(e), transient=False, attempts=attempt + 1) from e
+            if attempt == max_retries:
+                raise GenerationError(_describe(e), transient=True, attempts=attempt + 1) from e
+            delay = retry_delay(attempt, e)
+            print(f"  🔁 {label} failed ({_describe(e)}); retry {attempt + 1}/{max_retries} in {delay:.1f}s")
+            await asyncio.sleep(delay)
+        except BaseException:
+            # Cancelled (asyncio.CancelledError) or interrupted: free the slot and the reservation
+            if limiter:
+                limiter.release(time.monotonic() - started, reserved=tokens, cancelled=True)
+            raise
+
+
+class UsageStats:
+    """Running totals of prompt tokens and provider-cached prompt tokens."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.cached_tokens = 0
+        self.completion_tokens = 0
+
+    def record(self, response):
+        usage = getattr(response, "usage", None)
+        if usage is None:
+            return
+        details = getattr(usage, "prompt_tokens_details", None)
+        with self._lock:
+            self.calls += 1
+            self.prompt_tokens += getattr(usage, "prompt_tokens", 0) or 0
+            self.completion_tokens += getattr(usage, "completion_tokens", 0) or 0
+            self.cached_tokens += (getattr(details, "cached_tokens", 0) or 0) if details else 0
+
+    def report(self) -> str:
+        if not self.calls:
+            return "📈 LLM usage: no provider calls this run"
+        share = self.cached_tokens / self.prompt_tokens if self.prompt_tokens else 0.0
+        return (
+            f"📈 LLM usage: {self.calls} calls, {self.prompt_tokens} prompt tokens "
+            f"({self.cached_tokens} served from provider cache, {share:.0%}), "
+            f"{self.completion_tokens} completion tokens"
+        )
+
+
+usage_stats = UsageStats()
+
+
+def build_messages(prompt: str, system: Optional[str] = DEFAULT_SYSTEM_PROMPT,
+                   history: Optional[List[Dict[str, str]]] = None) -> List[Dict[str, str]]:
+    messages: List[Dict[str, str]] = []
+    if system:
+        messages.append({"role": "system", "content": system})
+    messages.extend(history or [])
+    messages.append({"role": "user", "content": prompt})
+    return messages
+
+
+def complete(prompt: str, system: Optional[str] = DEFAULT_SYSTEM_PROMPT, model: str = DEFAULT_MODEL,
+             temperature: Optional[float] = 0.7, max_tokens: int = 2000, **kwargs) -> str:
+    """Single chat completion through the shared pooled client (retried; raises GenerationError)."""
+    if temperature is not None:
+        kwargs["temperature"] = temperature
+    messages = build_messages(prompt, system)
+    response = call_with_retries(
+        get_client().chat.completions.create,
+        tokens=estimate_request_tokens(messages, max_tokens),
+        model=model,
+        messages=messages,
+        max_tokens=max_tokens,
+        **kwargs,
+    )
+    usage_stats.record(response)
+    return (response.choices[0].message.content or "").strip()
+
+
+async def acomplete(prompt: str, system: Optional[str] = DEFAULT_SYSTEM_PROMPT, model: str = DEFAULT_MODEL,
+                    temperature: Optional[float] = 0.7, max_tokens: int = 2000,
+                    history: Optional[List[Dict[str, str]]] = None, **kwargs) -> str:
+    """Async chat completion through the pooled client for the running loop (retried; raises GenerationError)."""
+    if temperature is not None:
+        kwargs["temperature"] = temperature
+    messages = build_messages(prompt, system, history)
+    response = await acall_with_retries(
+        get_async_client().chat.completions.create,
+        tokens=estimate_request_tokens(messages, max_tokens),
+        model=model,
+        messages=messages,
+        max_tokens=max_tokens,
+        **kwargs,
+    )
+    usage_stats.record(response)
+    return (response.choices[0].message.content or "").strip()
+
+
+async def lightrag_llm_func(prompt, system_prompt=None, history_messages=None, keyword_extraction=False, **kwargs) -> str:
+    """LightRAG llm_model_func that routes bucket queries through the shared async pool."""
+    extra = {}
+    if keyword_extraction:
+        extra["response_format"] = {"type": "json_object"}
+    return await acomplete(
+        prompt,
+        system=system_prompt,
+        model=os.getenv("QUERY_LLM_MODEL_NAME", DEFAULT_MODEL),
+        temperature=kwargs.get("temperature"),
+        max_tokens=kwargs.get("max_tokens", 2000),
+        history=history_messages,
+        **extra,
+    )
@@ -18,10 +18,11 @@ from pathlib import Path
 from typing import Dict, List, Tuple
 
 # Import all Lizzy modules
-from start import LizzyStart
+from db import connect
+from start import LizzyStart, write_project_metadata
 from intake_enhanced import LizzyIntakeEnhanced
 from brainstorm import BrainstormingAgent, initialize_lightrag_buckets
-from write import LizzyWrite
+from write import WriteAgent
 
 # Story concept generators for unique ideas
 UNIQUE_PREMISES = [
@@ -244,23 +245,19 @@ class LizzyOrchestrator:
         
         # Add metadata
         if start.conn:
-            cursor = start.conn.cursor()
-            cursor.execute("INSERT OR REPLACE INTO project_metadata (key, value) VALUES (?, ?)", 
-                          ('title', self.project_title))
-            cursor.execute("INSERT OR REPLACE INTO project_metadata (key, value) VALUES (?, ?)", 
-                          ('genre', 'Romantic Comedy'))
-            cursor.execute("INSERT OR REPLACE INTO project_metadata (key, value) VALUES (?, ?)", 
-                          ('tone', 'Golden Era Romcom'))
-            cursor.execute("INSERT OR REPLACE INTO project_metadata (key, value) VALUES (?, ?)", 
-                          ('logline', concept['logline']))
-            start.conn.commit()
+            write_project_metadata(start.conn, self.project_name, {
+                'title': self.project_title,
+                'genre': 'Romantic Comedy',
+                'tone': 'Golden Era Romcom',
+                'logline': concept['logline'],
+            })
             start.conn.close()
         
         print(f"   ✅ Project '{self.project_name}' created\n")
         
         # Step 3: Generate characters and outline using enhanced intake
         print("👥 Step 3: Creating professional character templates...")
-        self.conn = sqlite3.connect(start.db_path)
+        self.conn = connect(start.db_path)
         self.conn.row_factory = sqlite3.Row  # Enable dict-like access
         
         # Use enhanced intake to generate professional templates
@@ -333,14 +330,8 @@ class LizzyOrchestrator:
                 ])
                 brainstorm.setup_table()
                 
-                # Process scenes
-                scenes_data = brainstorm.fetch_all_scenes()
-                for act, scene_num, description in scenes_data:
-                    print(f"   Processing Act {act}, Scene {scene_num}...")
-                    for bucket_name in lightrag_instances.keys():
-                        prompt = brainstorm.create_prompt(bucket_name, description)
-                        response = brainstorm.query_bucket(bucket_name, prompt)
-                        brainstorm.save_response(act, scene_num, description, bucket_name, response)
+                # Process scenes (concurrent bucket×scene fan-out)
+                brainstorm.run()
                 
                 print(f"   ✅ Brainstorming complete\n")
             else:
@@ -350,61 +341,24 @@ class LizzyOrchestrator:
         
         # Step 5: Write scenes
         print("✍️  Step 5: Writing complete 30-scene manuscript with continuity...")
-        writer = LizzyWrite()
+        # WriteAgent generates through the shared pooled LLM client (llm_client.py)
+        writer = WriteAgent()
         writer.project_name = self.project_name
         writer.db_path = start.db_path
         writer.conn = self.conn
-        # Ensure writer connection also has row_factory
-        if not hasattr(writer.conn, 'row_factory') or writer.conn.row_factory != sqlite3.Row:
-            writer.conn.row_factory = sqlite3.Row
         
         # Configure writing
-        writer.writing_style = "cinematic"
+        writer.style = "cinematic"
         writer.tone = "witty and heartfelt"
         writer.easter_egg = brainstorm.easter_egg if 'brainstorm' in locals() else ""
+        writer.require_brainstorm = False
+        writer.setup_session_table()
         
-        # Get data
-        metadata = writer.get_project_metadata()
-        characters_list = writer.get_characters()
-        scenes_list = writer.get_story_outline()
-        brainstorm_table = writer.get_latest_brainstorm_table()
-        
-        # Write each scene
-        for scene in scenes_list:
-            act, scene_num = scene['act'], scene['scene']
-            print(f"   Writing Act {act}, Scene {scene_num}: {scene.get('scene_title', 'Untitled')}...")
-            
-            # Get contexts
-            brainstorm_context = None
-            if brainstorm_table:
-                brainstorm_context = writer.get_brainstorm_for_scene(brainstorm_table, act, scene_num)
-            
-            prev_text = writer.summarize_prev_if_long(writer.get_prev_scene_text(act, scene_num))
-            outline_snap = writer.make_outline_snapshot(scenes_list, act, scene_num)
-            next_desc = writer.get_next_scene_outline_desc(act, scene_num)
-            
-            # Build and execute
-            prompt = writer.build_scene_prompt(
-                metadata, characters_list, scene, brainstorm_context,
-                outline_snapshot=outline_snap,
-                prev_scene_text=prev_text,
-                next_scene_desc=next_desc,
-                min_words=700, max_words=900
-            )
-            
-            try:
-                scene_text = writer.generate_scene_text(prompt)
-                writer.save_scene_draft(scene, prompt, scene_text)
-                writer.save_finalized_scene(scene, scene_text)
-            except Exception as e:
-                print(f"      ⚠️  Error: {e}")
+        # Write every scene with continuity; exports to Desktop on completion (Step 6)
+        writer.run()
         
         print(f"   ✅ Writing complete\n")
         
-        # Step 6: Export to Desktop
-        print("💾 Step 6: Exporting to Desktop...")
-        writer.export_full_script(scenes_list, metadata)
-        
         # Close connections
         if self.conn:
             self.conn.close()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Lizzy Alpha - Prompt Compiler
+=============================
+Builds the session-invariant part of a prompt (tone preset, characters,
+outline, format rules) once per run and appends the per-scene material
+after it. Every call in a run then starts with the same long prefix,
+which is what provider-side prompt caching matches on.
+
+Reuse is tracked locally (prefix tokens sent again) and, via
+llm_client, from the provider's reported cached prompt tokens.
+
+Author: Lizzy AI Writing Framework
+"""
+
+import hashlib
+from typing import Callable, Dict, Hashable, List
+
+from context_packer import count_tokens
+
+PREFIX_SEPARATOR = "\n\n"
+
+
+class PromptCompiler:
+    """Cache of compiled static prefixes for one run, with reuse accounting."""
+
+    def __init__(self, label: str = "prompt"):
+        self.label = label
+        self._prefixes: Dict[Hashable, str] = {}
+        self._uses: Dict[Hashable, int] = {}
+        self._tokens: Dict[Hashable, int] = {}
+
+    def prefix(self, key: Hashable, build: Callable[[], str]) -> str:
+        """Return the compiled prefix for key, building it only the first time."""
+        if key not in self._prefixes:
+            self._prefixes[key] = build().strip()
+            self._uses[key] = 0
+            self._tokens[key] = count_tokens(self._prefixes[key])
+        return self._prefixes[key]
+
+    def prefixes(self) -> List[str]:
+        """Every prefix compiled so far (used to store prompts as shared prefix + remainder)."""
+        return list(self._prefixes.values())
+
+    def prefix_tokens(self, key: Hashable) -> int:
+        return self._tokens.get(key, 0)
+
+    def assemble(self, key: Hashable, build: Callable[[], str], variable: str) -> str:
+        """Static prefix first, per-call material after it."""
+        text = self.prefix(key, build)
+        self._uses[key] += 1
+        return f"{text}{PREFIX_SEPARATOR}{variable.strip()}"
+
+    def fingerprint(self, key: Hashable) -> str:
+        return hashlib.sha256(self._prefixes.get(key, "").encode("utf-8")).hexdigest()[:12]
+
+    def stats(self) -> Dict[str, int]:
+        prefix_tokens = self._tokens
+        calls = sum(self._uses.values())
+        reused = sum(prefix_tokens[k] * max(0, n - 1) for k, n in self._uses.items())
+        return {
+            "prefixes": len(self._prefixes),
+            "calls": calls,
+            "prefix_tokens": sum(prefix_tokens.values()),
+            "reused_tokens": reused,
+        }
+
+    def report(self) -> str:
+        s = self.stats()
+        if not s["calls"]:
+            return f"🧩 Static {self.label} prefix: not used"
+        return (
+            f"🧩 Static {self.label} prefix: {s['prefixes']} compiled (~{s['prefix_tokens']} tokens), "
+            f"shared by {s['calls']} calls — ~{s['reused_tokens']} prefix tokens eligible for provider caching"
+        )
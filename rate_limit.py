@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Lizzy Alpha - Rate Limiter
+==========================
+Client-side limiter shared by every LLM call in the process (brainstorm
+bucket queries and scene generation alike).
+
+- Two token buckets: requests per minute (LLM_RPM) and tokens per
+  minute (LLM_TPM). A call reserves one request and its estimated
+  tokens (prompt + max_tokens) before it is sent; the estimate is
+  corrected from the provider's reported usage afterwards.
+- An AIMD concurrency window: halved on every 429, grown by roughly one
+  slot per window of healthy (not slower than usual) responses, between
+  LLM_MIN_CONCURRENCY and LLM_MAX_CONCURRENCY.
+
+It is loop-agnostic (plain locks and polling), so the same limiter
+serves sync calls, worker threads and each asyncio.run() loop.
+
+Author: Lizzy AI Writing Framework
+"""
+
+import asyncio
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+DEFAULT_RPM = 500
+DEFAULT_TPM = 200000
+DEFAULT_MAX_CONCURRENCY = 16
+DEFAULT_MIN_CONCURRENCY = 1
+POLL_SECONDS = 0.05
+SLOW_FACTOR = 1.5          # latency above 1.5x the running average counts as unhealthy
+RATE_LIMIT_PAUSE = 2.0     # seconds every caller waits after a 429
+
+
+def _env_number(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+class TokenBucket:
+    """Continuously refilling bucket holding up to `per_minute` units."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until `amount` is available (0 if it is available now)."""
+        self._refill(now)
+        amount = min(amount, self.capacity)  # oversize requests wait for a full bucket
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / self.rate
+
+    def take(self, amount: float):
+        self.level -= min(amount, self.capacity)
+
+    def give_back(self, amount: float):
+        self.level = min(self.capacity, self.level + amount)
+
+
+class RateLimiter:
+    """Requests/tokens per minute plus an AIMD concurrency window."""
+
+    def __init__(self, rpm: float = DEFAULT_RPM, tpm: float = DEFAULT_TPM,
+                 max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+                 min_concurrency: int = DEFAULT_MIN_CONCURRENCY):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.window = float(max(min_concurrency, min(max_concurrency, max_concurrency // 2 or 1)))
+
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self.avg_latency: Optional[float] = None
+        self._lock = threading.Lock()
+
+        self.calls = 0
+        self.rate_limited = 0
+        self.waited = 0.0
+        self.peak_window = self.window
+
+    # ---------
+    # Admission
+    # ---------
+    def _try_admit(self, tokens: int) -> float:
+        """Admit the call and return 0, or return how long to wait before trying again."""
+        with self._lock:
+            now = time.monotonic()
+            if now < self.paused_until:
+                return self.paused_until - now
+            if self.in_flight >= int(self.window):
+                return POLL_SECONDS
+            wait = max(self.requests.wait_time(1, now), self.tokens.wait_time(tokens, now))
+            if wait > 0:
+                return min(wait, 1.0)
+            self.requests.take(1)
+            self.tokens.take(tokens)
+            self.in_flight += 1
+            self.calls += 1
+            return 0.0
+
+    def _record_wait(self, started: float):
+        with self._lock:
+            self.waited += time.monotonic() - started
+
+    def acquire(self, tokens: int):
+        started = time.monotonic()
+        while True:
+            wait = self._try_admit(tokens)
+            if not wait:
+                break
+            time.sleep(wait)
+        self._record_wait(started)
+
+    async def aacquire(self, tokens: int):
+        started = time.monotonic()
+        while True:
+            wait = self._try_admit(tokens)
+            if not wait:
+                break
+            await asyncio.sleep(wait)
+        self._record_wait(started)
+
+    # --------
+    # Feedback
+    # --------
+    def release(self, latency: float, rate_limited: bool = False, reserved: int = 0,
+                used: Optional[int] = None, cancelled: bool = False):
+        """
+        Free the slot, correct the token estimate, and adapt the concurrency window.
+
+        A cancelled or interrupted call (cancelled=True) frees its slot and
+        returns its reserved tokens without counting toward the window.
+        """
+        with self._lock:
+            self.in_flight = max(0, self.in_flight - 1)
+            if cancelled:
+                self.tokens.give_back(reserved)
+                return
+            if used is not None and reserved:
+                if used < reserved:
+                    self.tokens.give_back(reserved - used)
+                else:
+                    self.tokens.take(used - reserved)
+
+            if rate_limited:
+                # Multiplicative decrease, and a short pause for everyone
+                self.rate_limited += 1
+                self.window = max(float(self.min_concurrency), self.window / 2)
+                self.paused_until = max(self.paused_until, time.monotonic() + RATE_LIMIT_PAUSE)
+                return
+
+            healthy = self.avg_latency is None or latency <= self.avg_latency * SLOW_FACTOR
+            self.avg_latency = latency if self.avg_latency is None else 0.8 * self.avg_latency + 0.2 * latency
+            if healthy:
+                # Additive increase: about one slot per window of healthy calls
+                self.window = min(float(self.max_concurrency), self.window + 1.0 / self.window)
+                self.peak_window = max(self.peak_window, self.window)
+
+    # -----
+    # Stats
+    # -----
+    def stats(self) -> Dict[str, float]:
+        return {
+            "calls": self.calls,
+            "rate_limited": self.rate_limited,
+            "window": int(self.window),
+            "peak_window": int(self.peak_window),
+            "waited_seconds": self.waited,
+        }
+
+    def report(self) -> str:
+        s = self.stats()
+        return (
+            f"🚦 Rate limiter: {s['calls']} calls, {s['rate_limited']} rate-limited, "
+            f"concurrency {s['window']} (peak {s['peak_window']}), {s['waited_seconds']:.1f}s spent waiting"
+        )
+
+
+_shared_limiter: Optional[RateLimiter] = None
+_shared_lock = threading.Lock()
+
+
+def get_rate_limiter() -> Optional[RateLimiter]:
+    """Process-wide limiter configured from the environment, or None when LLM_RATE_LIMIT=off."""
+    global _shared_limiter
+    if os.getenv("LLM_RATE_LIMIT", "on").lower() in ("off", "0", "false", "no"):
+        return None
+    with _shared_lock:
+        if _shared_limiter is None:
+            _shared_limiter = RateLimiter(
+                rpm=_env_number("LLM_RPM", DEFAULT_RPM),
+                tpm=_env_number("LLM_TPM", DEFAULT_TPM),
+                max_concurrency=int(_env_number("LLM_MAX_CONCURRENCY", DEFAULT_MAX_CONCURRENCY)),
+                min_concurrency=int(_env_number("LLM_MIN_CONCURRENCY", DEFAULT_MIN_CONCURRENCY)),
+            )
+        return _shared_limiter
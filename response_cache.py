@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Lizzy Alpha - Response Cache
+============================
+Persistent, prompt-keyed cache for LLM and LightRAG responses.
+Shared by brainstorm.py and write.py, and across all projects, so a
+byte-identical prompt (e.g. the untouched 30-scene template) is only
+paid for once.
+
+Entries are keyed by (model/bucket, query mode, prompt hash, temperature)
+and evicted by age and by total size.
+
+Author: Lizzy AI Writing Framework
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+DEFAULT_CACHE_PATH = Path.home() / ".lizzy" / "response_cache.sqlite"
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024      # 256 MB of response text
+DEFAULT_MAX_ENTRIES = 50000
+DEFAULT_MAX_AGE_DAYS = 30
+EVICT_EVERY = 50                            # run eviction every N writes
+
+
+class ResponseCache:
+    """On-disk SQLite cache of prompt → response with hit/miss accounting."""
+
+    def __init__(
+        self,
+        path: Optional[Path] = None,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        max_age_days: float = DEFAULT_MAX_AGE_DAYS,
+    ):
+        self.path = Path(path or os.getenv("LIZZY_CACHE_PATH") or DEFAULT_CACHE_PATH)
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.max_age_seconds = max_age_days * 86400
+
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self._lock = threading.Lock()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                cache_key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                mode TEXT NOT NULL,
+                temperature TEXT NOT NULL,
+                prompt_hash TEXT NOT NULL,
+                response TEXT NOT NULL,
+                size_bytes INTEGER NOT NULL,
+                hit_count INTEGER DEFAULT 0,
+                created_at REAL NOT NULL,
+                last_used_at REAL NOT NULL
+            )
+            """
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_last_used ON responses(last_used_at)")
+        self.conn.commit()
+
+    # -----------
+    # Key helpers
+    # -----------
+    @staticmethod
+    def hash_prompt(prompt: str) -> str:
+        return hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+
+    @classmethod
+    def make_key(cls, model: str, mode: str, prompt: str, temperature: Optional[float]) -> str:
+        temp = "default" if temperature is None else f"{float(temperature):.3f}"
+        return "|".join([model, mode, temp, cls.hash_prompt(prompt)])
+
+    # ------------
+    # Get / Put
+    # ------------
+    def get(self, model: str, mode: str, prompt: str, temperature: Optional[float] = None) -> Optional[str]:
+        key = self.make_key(model, mode, prompt, temperature)
+        now = time.time()
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT response, created_at FROM responses WHERE cache_key = ?", (key,)
+            ).fetchone()
+            if row and now - row[1] <= self.max_age_seconds:
+                self.conn.execute(
+                    "UPDATE responses SET hit_count = hit_count + 1, last_used_at = ? WHERE cache_key = ?",
+                    (now, key),
+                )
+                self.conn.commit()
+                self.hits += 1
+                return row[0]
+            self.misses += 1
+            return None
+
+    def put(self, model: str, mode: str, prompt: str, temperature: Optional[float], response: str):
+        if not response:
+            return
+        key = self.make_key(model, mode, prompt, temperature)
+        temp = key.split("|")[2]
+        now = time.time()
+        with self._lock:
+            self.conn.execute(
+                """
+                INSERT OR REPLACE INTO responses
+                (cache_key, model, mode, temperature, prompt_hash, response, size_bytes, created_at, last_used_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (key, model, mode, temp, self.hash_prompt(prompt), response,
+                 len(response.encode("utf-8")), now, now),
+            )
+            self.conn.commit()
+            self.writes += 1
+            if self.writes % EVICT_EVERY == 0:
+                self._evict_locked()
+
+    # --------
+    # Eviction
+    # --------
+    def evict(self) -> int:
+        """Drop expired entries, then least-recently-used ones until under the size/count limits."""
+        with self._lock:
+            return self._evict_locked()
+
+    def _evict_locked(self) -> int:
+        cursor = self.conn.cursor()
+        removed = cursor.execute(
+            "DELETE FROM responses WHERE created_at < ?", (time.time() - self.max_age_seconds,)
+        ).rowcount
+
+        count, total = cursor.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size_bytes), 0) FROM responses"
+        ).fetchone()
+        if count > self.max_entries or total > self.max_bytes:
+            rows = cursor.execute(
+                "SELECT cache_key, size_bytes FROM responses ORDER BY last_used_at ASC"
+            ).fetchall()
+            doomed = []
+            for key, size in rows:
+                if count <= self.max_entries and total <= self.max_bytes:
+                    break
+                doomed.append((key,))
+                count -= 1
+                total -= size
+            cursor.executemany("DELETE FROM responses WHERE cache_key = ?", doomed)
+            removed += len(doomed)
+
+        self.conn.commit()
+        return removed
+
+    # -----
+    # Stats
+    # -----
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            count, total = self.conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size_bytes), 0) FROM responses"
+            ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / lookups) if lookups else 0.0,
+            "entries": count,
+            "size_bytes": total,
+        }
+
+    def report(self) -> str:
+        s = self.stats()
+        return (
+            f"🗃️  Response cache: {s['hits']} hits / {s['misses']} misses "
+            f"({s['hit_rate']:.0%} hit rate) — {s['entries']} entries, "
+            f"{s['size_bytes'] / (1024 * 1024):.1f} MB at {self.path}"
+        )
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+
+_shared_cache: Optional[ResponseCache] = None
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """Return the process-wide cache, or None when disabled with LIZZY_CACHE=off."""
+    global _shared_cache
+    if os.getenv("LIZZY_CACHE", "on").lower() in ("off", "0", "false", "no"):
+        return None
+    if _shared_cache is None:
+        try:
+            _shared_cache = ResponseCache()
+        except (sqlite3.Error, OSError) as e:
+            print(f"⚠️  Response cache unavailable: {e}")
+            return None
+    return _shared_cache
+
+
+def main():
+    """Print cache statistics, optionally evicting first (python3 response_cache.py [--evict])."""
+    import sys
+
+    cache = ResponseCache()
+    if "--evict" in sys.argv:
+        print(f"🧹 Evicted {cache.evict()} entries")
+    print(cache.report())
+    cache.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Lizzy Alpha - Run State
+=======================
+Checkpoint records for brainstorm and write sessions.
+Each run gets a row in run_state; every finished (scene, bucket) unit
+gets a row in run_units. An interrupted run can then be resumed
+without redoing completed units. Units whose
+generation failed are recorded as 'failed' (with the error) rather than
+stored as content, and are retried on resume. Starting and completing a
+run refreshes the project's row in the project catalog.
+
+Author: Lizzy AI Writing Framework
+"""
+
+import json
+import sqlite3
+from typing import Dict, Optional, Set, Tuple
+
+from catalog import update_catalog
+
+Unit = Tuple[int, int, str]
+
+
+def ensure_run_state_tables(conn: sqlite3.Connection):
+    cursor = conn.cursor()
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS run_state (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            kind TEXT NOT NULL,
+            table_name TEXT NOT NULL,
+            config TEXT,
+            status TEXT NOT NULL DEFAULT 'running',
+            total_units INTEGER,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """
+    )
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS run_units (
+            run_id INTEGER NOT NULL,
+            act INTEGER NOT NULL,
+            scene INTEGER NOT NULL,
+            bucket TEXT NOT NULL DEFAULT '',
+            status TEXT NOT NULL DEFAULT 'done',
+            error TEXT,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (run_id, act, scene, bucket)
+        )
+        """
+    )
+    if "error" not in [r[1] for r in cursor.execute("PRAGMA table_info(run_units)").fetchall()]:
+        cursor.execute("ALTER TABLE run_units ADD COLUMN error TEXT")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_run_state_kind_status ON run_state(kind, status)")
+    conn.commit()
+
+
+class RunState:
+    """A single brainstorm/write run and the units it has completed."""
+
+    def __init__(self, conn: sqlite3.Connection, run_id: int, kind: str, table_name: str, config: Dict):
+        self.conn = conn
+        self.run_id = run_id
+        self.kind = kind
+        self.table_name = table_name
+        self.config = config
+
+    @classmethod
+    def start(cls, conn: sqlite3.Connection, kind: str, table_name: str, config: Optional[Dict] = None) -> "RunState":
+        ensure_run_state_tables(conn)
+        cursor = conn.cursor()
+        cursor.execute(
+            "INSERT INTO run_state (kind, table_name, config) VALUES (?, ?, ?)",
+            (kind, table_name, json.dumps(config or {})),
+        )
+        conn.commit()
+        update_catalog(conn)
+        return cls(conn, cursor.lastrowid, kind, table_name, config or {})
+
+    @classmethod
+    def latest_incomplete(cls, conn: sqlite3.Connection, kind: str) -> Optional["RunState"]:
+        ensure_run_state_tables(conn)
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            SELECT id, table_name, config FROM run_state
+            WHERE kind = ? AND status = 'running'
+            ORDER BY id DESC LIMIT 1
+            """,
+            (kind,),
+        )
+        row = cursor.fetchone()
+        if not row:
+            return None
+        return cls(conn, row[0], kind, row[1], json.loads(row[2] or "{}"))
+
+    def set_total(self, total_units: int):
+        self.conn.execute(
+            "UPDATE run_state SET total_units = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
+            (total_units, self.run_id),
+        )
+        self.conn.commit()
+
+    def done_units(self) -> Set[Unit]:
+        cursor = self.conn.cursor()
+        cursor.execute(
+            "SELECT act, scene, bucket FROM run_units WHERE run_id = ? AND status = 'done'",
+            (self.run_id,),
+        )
+        return {(r[0], r[1], r[2]) for r in cursor.fetchall()}
+
+    def mark_done(self, act: int, scene: int, bucket: str = "", commit: bool = True,
+                  conn: Optional[sqlite3.Connection] = None):
+        """
+        Record a finished unit; pass commit=False to fold it into the caller's transaction
+        (and `conn` when that transaction is on another connection, e.g. a write queue's).
+        """
+        conn = conn or self.conn
+        conn.execute(
+            """
+            INSERT OR REPLACE INTO run_units (run_id, act, scene, bucket, status, error, updated_at)
+            VALUES (?, ?, ?, ?, 'done', NULL, CURRENT_TIMESTAMP)
+            """,
+            (self.run_id, act, scene, bucket),
+        )
+        conn.execute(
+            "UPDATE run_state SET updated_at = CURRENT_TIMESTAMP WHERE id = ?", (self.run_id,)
+        )
+        if commit:
+            conn.commit()
+
+    def mark_failed(self, act: int, scene: int, bucket: str = "", error: str = "", commit: bool = True,
+                    conn: Optional[sqlite3.Connection] = None):
+        """Record a unit that could not be generated; it stays eligible for --resume."""
+        conn = conn or self.conn
+        conn.execute(
+            """
+            INSERT OR REPLACE INTO run_units (run_id, act, scene, bucket, status, error, updated_at)
+            VALUES (?, ?, ?, ?, 'failed', ?, CURRENT_TIMESTAMP)
+            """,
+            (self.run_id, act, scene, bucket, error),
+        )
+        conn.execute(
+            "UPDATE run_state SET updated_at = CURRENT_TIMESTAMP WHERE id = ?", (self.run_id,)
+        )
+        if commit:
+            conn.commit()
+
+    def failed_units(self) -> Dict[Unit, str]:
+        cursor = self.conn.cursor()
+        cursor.execute(
+            "SELECT act, scene, bucket, error FROM run_units WHERE run_id = ? AND status = 'failed'",
+            (self.run_id,),
+        )
+        return {(r[0], r[1], r[2]): r[3] or "" for r in cursor.fetchall()}
+
+    def complete(self):
+        self.conn.execute(
+            "UPDATE run_state SET status = 'complete', updated_at = CURRENT_TIMESTAMP WHERE id = ?",
+            (self.run_id,),
+        )
+        self.conn.commit()
+        update_catalog(self.conn)
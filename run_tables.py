@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Lizzy Alpha - Run Tables
+========================
+One brainstorm_responses table and one write_outputs table for every
+run, keyed by run_id (the run's row in run_state), replacing the
+per-run brainstorming_log_vN / write_runs_vN tables. Composite indexes
+serve the per-run lookups and cross-run history of a scene.
+
+Projects that still have _vN tables are migrated the first time a run
+opens them: each legacy table is copied into the unified table under
+its run_state row (created for tables older than run_state, dated by
+their first row) and dropped, one table per transaction.
+
+Usage:
+    python run_tables.py    # migrate every project under projects/
+
+Author: Lizzy AI Writing Framework
+"""
+
+import json
+import re
+import sqlite3
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from catalog import update_catalog
+from db import connect
+from run_state import ensure_run_state_tables
+
+BRAINSTORM_TABLE = "brainstorm_responses"
+WRITE_TABLE = "write_outputs"
+
+# kind -> (unified table, legacy table prefix)
+RUN_TABLES = {
+    "brainstorm": (BRAINSTORM_TABLE, "brainstorming_log_v"),
+    "write": (WRITE_TABLE, "write_runs_v"),
+}
+
+# Unified columns copied from legacy tables (missing ones become the given default)
+LEGACY_COLUMNS = {
+    "brainstorm": (("act", None), ("scene", None), ("scene_description", None), ("bucket_name", None),
+                   ("response", None), ("input_hash", "NULL"), ("created_at", "CURRENT_TIMESTAMP")),
+    "write": (("act", None), ("scene", None), ("scene_title", "NULL"), ("prompt", None), ("output", None),
+              ("status", "'complete'"), ("created_at", "CURRENT_TIMESTAMP")),
+}
+
+
+def ensure_run_tables(conn: sqlite3.Connection, migrate: bool = True):
+    """Create the unified run tables and fold in any legacy _vN tables."""
+    ensure_run_state_tables(conn)
+    cursor = conn.cursor()
+    cursor.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS {BRAINSTORM_TABLE} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            run_id INTEGER NOT NULL,
+            act INTEGER NOT NULL,
+            scene INTEGER NOT NULL,
+            scene_description TEXT NOT NULL,
+            bucket_name TEXT NOT NULL,
+            response TEXT NOT NULL,
+            input_hash TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """
+    )
+    cursor.execute(
+        f"CREATE INDEX IF NOT EXISTS idx_brainstorm_responses_run "
+        f"ON {BRAINSTORM_TABLE}(run_id, act, scene, bucket_name)"
+    )
+    cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_brainstorm_responses_input ON {BRAINSTORM_TABLE}(input_hash)")
+    cursor.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS {WRITE_TABLE} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            run_id INTEGER NOT NULL,
+            act INTEGER NOT NULL,
+            scene INTEGER NOT NULL,
+            scene_title TEXT,
+            prompt TEXT NOT NULL,
+            output TEXT NOT NULL,
+            status TEXT DEFAULT 'complete',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """
+    )
+    cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_write_outputs_run ON {WRITE_TABLE}(run_id, act, scene, status)")
+    cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_write_outputs_scene ON {WRITE_TABLE}(act, scene, run_id)")
+    conn.commit()
+    if migrate and legacy_tables(conn):
+        migrate_legacy_tables(conn)
+
+
+def run_label(kind: str, run_id: Optional[int]) -> str:
+    """Readable name for a run (batch job files, dependency records, session names)."""
+    return f"{kind}_run_{run_id}"
+
+
+def latest_run_id(conn: sqlite3.Connection, kind: str) -> Optional[int]:
+    """Most recently started run of a kind, or None."""
+    ensure_run_state_tables(conn)
+    row = conn.execute(
+        "SELECT id FROM run_state WHERE kind = ? ORDER BY created_at DESC, id DESC LIMIT 1", (kind,)
+    ).fetchone()
+    return row[0] if row else None
+
+
+def run_config(conn: sqlite3.Connection, run_id: int) -> Dict:
+    row = conn.execute("SELECT config FROM run_state WHERE id = ?", (run_id,)).fetchone()
+    return json.loads(row[0] or "{}") if row else {}
+
+
+def run_id_for_table(conn: sqlite3.Connection, kind: str, table_name: str) -> Optional[int]:
+    """Run a legacy table name was migrated into (resolves table names kept in old run configs)."""
+    row = conn.execute(
+        "SELECT id FROM run_state WHERE kind = ? AND table_name = ? ORDER BY id DESC LIMIT 1", (kind, table_name)
+    ).fetchone()
+    return row[0] if row else None
+
+
+def legacy_tables(conn: sqlite3.Connection) -> List[Tuple[str, str, int]]:
+    """(kind, table, version) for every remaining _vN table, oldest first."""
+    names = [r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")]
+    found = []
+    for kind, (_, prefix) in RUN_TABLES.items():
+        for name in names:
+            match = re.fullmatch(rf"{prefix}(\d+)", name)
+            if match:
+                found.append((kind, name, int(match.group(1))))
+    return sorted(found, key=lambda t: (t[0], t[2]))
+
+
+def migrate_legacy_tables(conn: sqlite3.Connection) -> Dict[str, int]:
+    """Copy every legacy _vN table into its unified table under a run_id, then drop it."""
+    ensure_run_state_tables(conn)
+    moved = {"tables": 0, "rows": 0}
+    for kind, table, _ in legacy_tables(conn):
+        unified = RUN_TABLES[kind][0]
+        present = {r[1] for r in conn.execute(f"PRAGMA table_info({table})")}
+        columns = LEGACY_COLUMNS[kind]
+        select = ", ".join(col if col in present else f"{default} AS {col}" for col, default in columns)
+        try:
+            run_id = run_id_for_table(conn, kind, table)
+            if run_id is None:
+                # Table predates run_state: register it as a finished run dated by its first row
+                started = conn.execute(f"SELECT MIN(created_at) FROM {table}").fetchone()[0] \
+                    if "created_at" in present else None
+                cursor = conn.execute(
+                    """
+                    INSERT INTO run_state (kind, table_name, config, status, created_at, updated_at)
+                    VALUES (?, ?, '{}', 'complete', COALESCE(?, CURRENT_TIMESTAMP), COALESCE(?, CURRENT_TIMESTAMP))
+                    """,
+                    (kind, table, started, started),
+                )
+                run_id = cursor.lastrowid
+            cursor = conn.execute(
+                f"INSERT INTO {unified} (run_id, {', '.join(c for c, _ in columns)}) "
+                f"SELECT ?, {select} FROM {table} ORDER BY id",
+                (run_id,),
+            )
+            moved["rows"] += cursor.rowcount
+            conn.execute(f"DROP TABLE {table}")
+            conn.commit()
+            moved["tables"] += 1
+        except sqlite3.Error as e:
+            conn.rollback()
+            print(f"⚠️  Could not migrate {table}: {e}")
+    if moved["tables"]:
+        print(f"🗂️  Migrated {moved['tables']} versioned tables ({moved['rows']} rows) "
+              f"into {BRAINSTORM_TABLE} / {WRITE_TABLE}")
+    return moved
+
+
+def main():
+    print("🗂️  Lizzy Alpha - Run Table Migration")
+    print("=" * 40)
+    base_dir = Path("projects")
+    databases = sorted(base_dir.glob("*/*.sqlite")) if base_dir.exists() else []
+    if not databases:
+        print("❌ No projects found.")
+        return
+    for db_path in databases:
+        conn = connect(db_path)
+        try:
+            pending = legacy_tables(conn)
+            if not pending:
+                print(f"✅ {db_path.parent.name}: already migrated")
+                continue
+            print(f"📂 {db_path.parent.name}: {len(pending)} versioned tables")
+            ensure_run_tables(conn)
+            conn.execute("VACUUM")
+            update_catalog(conn)
+        finally:
+            conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Lizzy Alpha - Scene Dependency Graph
+====================================
+Records which inputs every finalized scene was written from, so that
+write.py --dirty can rewrite only the scenes whose inputs changed:
+
+- outline_hash:     the scene's story_outline row
+- brainstorm_hash:  the scene's brainstorm rows (all buckets)
+- characters_hash:  the character profiles its prompt included
+- prev_hash:        the previous-scene text it was written from (normally
+                    the previous scene's finalized text; an act bridge
+                    or outline stand-in in the parallel modes)
+
+Each scene depends on the scene before it through prev_hash, so a
+rewritten scene makes its successor stale in turn. --depth bounds how
+far that propagates: a scene beyond it keeps its text and takes the new
+previous scene as its baseline, so later runs do not pick the chain up.
+
+Author: Lizzy AI Writing Framework
+"""
+
+import hashlib
+import json
+import sqlite3
+from typing import Dict, List, Optional
+
+DEPENDENCY_REASONS = {
+    "outline_hash": "outline changed",
+    "brainstorm_hash": "brainstorm changed",
+    "characters_hash": "characters changed",
+    "prev_hash": "previous scene changed",
+}
+PREV_CHANGED = DEPENDENCY_REASONS["prev_hash"]
+
+# Outline columns that do not shape the prompt
+OUTLINE_IGNORED_FIELDS = ("id", "created_at", "updated_at")
+
+
+def ensure_dependency_table(conn: sqlite3.Connection):
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS scene_dependencies (
+            act INTEGER NOT NULL,
+            scene INTEGER NOT NULL,
+            outline_hash TEXT NOT NULL,
+            brainstorm_hash TEXT NOT NULL,
+            characters_hash TEXT NOT NULL,
+            prev_hash TEXT NOT NULL,
+            brainstorm_table TEXT,
+            run_table TEXT,
+            recorded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (act, scene)
+        )
+        """
+    )
+    conn.commit()
+
+
+def hash_text(text: str) -> str:
+    return hashlib.sha256((text or "").encode("utf-8")).hexdigest()
+
+
+def hash_outline(scene: Dict) -> str:
+    fields = {k: v for k, v in scene.items() if k not in OUTLINE_IGNORED_FIELDS}
+    return hash_text(json.dumps(fields, sort_keys=True, default=str))
+
+
+def hash_characters(profiles: List[str]) -> str:
+    return hash_text("\n".join(sorted(profiles)))
+
+
+class SceneGraph:
+    """Per-scene input records in the project database."""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+        ensure_dependency_table(conn)
+
+    def get(self, act: int, scene: int) -> Optional[Dict[str, str]]:
+        cursor = self.conn.cursor()
+        cursor.execute(
+            f"SELECT {', '.join(DEPENDENCY_REASONS)} FROM scene_dependencies WHERE act=? AND scene=?",
+            (act, scene),
+        )
+        row = cursor.fetchone()
+        return dict(zip(DEPENDENCY_REASONS, row)) if row else None
+
+    def record(self, act: int, scene: int, inputs: Dict[str, str], brainstorm_table: Optional[str] = None,
+               run_table: Optional[str] = None, commit: bool = True, conn: Optional[sqlite3.Connection] = None):
+        conn = conn or self.conn
+        conn.execute(
+            f"""
+            INSERT OR REPLACE INTO scene_dependencies
+            (act, scene, {', '.join(DEPENDENCY_REASONS)}, brainstorm_table, run_table, recorded_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+            """,
+            (act, scene, *(inputs[k] for k in DEPENDENCY_REASONS), brainstorm_table, run_table),
+        )
+        if commit:
+            conn.commit()
+
+    def accept_prev(self, act: int, scene: int, prev_hash: str, commit: bool = True,
+                    conn: Optional[sqlite3.Connection] = None):
+        """Keep a scene as written but record its current previous-scene text as its baseline."""
+        conn = conn or self.conn
+        conn.execute(
+            "UPDATE scene_dependencies SET prev_hash = ?, recorded_at = CURRENT_TIMESTAMP WHERE act=? AND scene=?",
+            (prev_hash, act, scene),
+        )
+        if commit:
+            conn.commit()
+
+    @staticmethod
+    def changed(recorded: Dict[str, str], current: Dict[str, str]) -> List[str]:
+        """Human-readable reasons a scene is stale (empty when it is up to date)."""
+        return [reason for key, reason in DEPENDENCY_REASONS.items() if recorded.get(key) != current.get(key)]
@@ -0,0 +1,389 @@
+#!/usr/bin/env python3
+"""
+Lizzy Alpha - Search
+====================
+Full-text search (SQLite FTS5) over a project's finalized scenes,
+scene drafts, brainstorm responses and story outline, with ranked
+(bm25) results and highlighted snippets.
+
+Index tables live next to the data they cover:
+- finalized_scenes_fts, story_outline_fts: hold their own copy of the
+  text and are kept in sync by triggers. Both source tables are written
+  with INSERT OR REPLACE, which deletes rows without firing delete
+  triggers, so these triggers key on (act, scene) and are idempotent.
+- scene_drafts_fts: an external-content index over scene_drafts
+  (append-only, thousands of versions), synced by triggers and storing
+  no second copy of the text.
+- brainstorm_responses_fts: responses are stored as compressed blob
+  references (blob_store.py) that SQL triggers cannot read, so new rows
+  are indexed incrementally, by id, before each search.
+
+The index is created (and filled from existing rows) the first time it
+is needed; `--rebuild` recreates it from scratch.
+
+Usage:
+    python search.py                          # interactive
+    python search.py myproject "bookshop"
+    python search.py myproject "bookshop" --source scenes drafts --limit 5
+
+Author: Lizzy AI Writing Framework
+"""
+
+import argparse
+import re
+import sqlite3
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from blob_store import BlobStore
+from catalog import choose_project, find_project
+from db import connect
+from run_tables import BRAINSTORM_TABLE, ensure_run_tables, latest_run_id
+
+TOKENIZER = "porter unicode61 remove_diacritics 2"
+DEFAULT_LIMIT = 10
+SNIPPET_TOKENS = 16
+HIGHLIGHT = ("[", "]")
+ELLIPSIS = "…"
+BRAINSTORM_INDEX_BATCH = 500
+
+# Outline columns worth searching (only those present in the project are indexed)
+OUTLINE_TEXT_FIELDS = (
+    "scene_title", "beat", "location", "characters_present", "scene_purpose", "key_events",
+    "key_characters", "nudge", "emotional_beats", "dialogue_notes", "plot_threads", "notes",
+)
+
+SOURCES = ("scenes", "drafts", "brainstorm", "outline")
+INDEX_TABLES = {
+    "scenes": "finalized_scenes_fts",
+    "drafts": "scene_drafts_fts",
+    "brainstorm": "brainstorm_responses_fts",
+    "outline": "story_outline_fts",
+}
+
+# FTS5 query syntax; a query using any of it is passed through unchanged
+_QUERY_SYNTAX = re.compile(r'["*^():]|\b(AND|OR|NOT|NEAR)\b')
+
+
+def table_exists(conn: sqlite3.Connection, name: str) -> bool:
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE name = ?", (name,)).fetchone() is not None
+
+
+def table_columns(conn: sqlite3.Connection, table: str) -> List[str]:
+    return [r[1] for r in conn.execute(f"PRAGMA table_info({table})")]
+
+
+def _create_scenes_index(conn: sqlite3.Connection):
+    conn.executescript(
+        f"""
+        CREATE VIRTUAL TABLE finalized_scenes_fts USING fts5(
+            final_text, act UNINDEXED, scene UNINDEXED, tokenize = '{TOKENIZER}'
+        );
+        CREATE TRIGGER finalized_scenes_fts_ai AFTER INSERT ON finalized_scenes BEGIN
+            DELETE FROM finalized_scenes_fts WHERE act = NEW.act AND scene = NEW.scene;
+            INSERT INTO finalized_scenes_fts (rowid, final_text, act, scene)
+            VALUES (NEW.id, NEW.final_text, NEW.act, NEW.scene);
+        END;
+        CREATE TRIGGER finalized_scenes_fts_au AFTER UPDATE ON finalized_scenes BEGIN
+            DELETE FROM finalized_scenes_fts WHERE rowid = OLD.id;
+            INSERT INTO finalized_scenes_fts (rowid, final_text, act, scene)
+            VALUES (NEW.id, NEW.final_text, NEW.act, NEW.scene);
+        END;
+        CREATE TRIGGER finalized_scenes_fts_ad AFTER DELETE ON finalized_scenes BEGIN
+            DELETE FROM finalized_scenes_fts WHERE rowid = OLD.id;
+        END;
+        INSERT INTO finalized_scenes_fts (rowid, final_text, act, scene)
+            SELECT id, final_text, act, scene FROM finalized_scenes;
+        """
+    )
+
+
+def _create_drafts_index(conn: sqlite3.Connection):
+    conn.executescript(
+        f"""
+        CREATE VIRTUAL TABLE scene_drafts_fts USING fts5(
+            draft_text, content = 'scene_drafts', content_rowid = 'id', tokenize = '{TOKENIZER}'
+        );
+        CREATE TRIGGER scene_drafts_fts_ai AFTER INSERT ON scene_drafts BEGIN
+            INSERT INTO scene_drafts_fts (rowid, draft_text) VALUES (NEW.id, NEW.draft_text);
+        END;
+        CREATE TRIGGER scene_drafts_fts_ad AFTER DELETE ON scene_drafts BEGIN
+            INSERT INTO scene_drafts_fts (scene_drafts_fts, rowid, draft_text) VALUES ('delete', OLD.id, OLD.draft_text);
+        END;
+        CREATE TRIGGER scene_drafts_fts_au AFTER UPDATE OF draft_text ON scene_drafts BEGIN
+            INSERT INTO scene_drafts_fts (scene_drafts_fts, rowid, draft_text) VALUES ('delete', OLD.id, OLD.draft_text);
+            INSERT INTO scene_drafts_fts (rowid, draft_text) VALUES (NEW.id, NEW.draft_text);
+        END;
+        INSERT INTO scene_drafts_fts (scene_drafts_fts) VALUES ('rebuild');
+        """
+    )
+
+
+def _create_outline_index(conn: sqlite3.Connection):
+    fields = [f for f in OUTLINE_TEXT_FIELDS if f in table_columns(conn, "story_outline")]
+    cols = ", ".join(fields)
+    new_values = ", ".join(f"NEW.{f}" for f in fields)
+    conn.executescript(
+        f"""
+        CREATE VIRTUAL TABLE story_outline_fts USING fts5(
+            {cols}, act UNINDEXED, scene UNINDEXED, tokenize = '{TOKENIZER}'
+        );
+        CREATE TRIGGER story_outline_fts_ai AFTER INSERT ON story_outline BEGIN
+            DELETE FROM story_outline_fts WHERE act = NEW.act AND scene = NEW.scene;
+            INSERT INTO story_outline_fts (rowid, {cols}, act, scene) VALUES (NEW.id, {new_values}, NEW.act, NEW.scene);
+        END;
+        CREATE TRIGGER story_outline_fts_au AFTER UPDATE ON story_outline BEGIN
+            DELETE FROM story_outline_fts WHERE rowid = OLD.id;
+            INSERT INTO story_outline_fts (rowid, {cols}, act, scene) VALUES (NEW.id, {new_values}, NEW.act, NEW.scene);
+        END;
+        CREATE TRIGGER story_outline_fts_ad AFTER DELETE ON story_outline BEGIN
+            DELETE FROM story_outline_fts WHERE rowid = OLD.id;
+        END;
+        INSERT INTO story_outline_fts (rowid, {cols}, act, scene)
+            SELECT id, {cols}, act, scene FROM story_outline;
+        """
+    )
+
+
+def _create_brainstorm_index(conn: sqlite3.Connection):
+    # Contentless: the text stays in the blob store; snippets are cut from the resolved text
+    conn.execute(
+        f"CREATE VIRTUAL TABLE brainstorm_responses_fts USING fts5(response, content = '', tokenize = '{TOKENIZER}')"
+    )
+    conn.commit()
+
+
+_CREATORS = {
+    "scenes": ("finalized_scenes", _create_scenes_index),
+    "drafts": ("scene_drafts", _create_drafts_index),
+    "outline": ("story_outline", _create_outline_index),
+    "brainstorm": (BRAINSTORM_TABLE, _create_brainstorm_index),
+}
+
+
+def ensure_search_index(conn: sqlite3.Connection):
+    """Create any missing index (filled from existing rows) with its sync triggers."""
+    ensure_run_tables(conn)
+    for source, (content_table, create) in _CREATORS.items():
+        if table_exists(conn, content_table) and not table_exists(conn, INDEX_TABLES[source]):
+            create(conn)
+
+
+def drop_search_index(conn: sqlite3.Connection):
+    for source, table in INDEX_TABLES.items():
+        for (trigger,) in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger' AND name LIKE ?", (f"{table}_%",)
+        ).fetchall():
+            conn.execute(f"DROP TRIGGER {trigger}")
+        conn.execute(f"DROP TABLE IF EXISTS {table}")
+    conn.commit()
+
+
+def sync_brainstorm_index(conn: sqlite3.Connection) -> int:
+    """Index brainstorm rows added since the last sync; return how many were indexed."""
+    if not table_exists(conn, INDEX_TABLES["brainstorm"]):
+        return 0
+    blobs = BlobStore(conn)
+    indexed = 0
+    while True:
+        last = conn.execute("SELECT COALESCE(MAX(rowid), 0) FROM brainstorm_responses_fts").fetchone()[0]
+        rows = conn.execute(
+            f"SELECT id, response FROM {BRAINSTORM_TABLE} WHERE id > ? ORDER BY id LIMIT ?",
+            (last, BRAINSTORM_INDEX_BATCH),
+        ).fetchall()
+        if not rows:
+            break
+        conn.executemany(
+            "INSERT INTO brainstorm_responses_fts (rowid, response) VALUES (?, ?)",
+            [(row_id, blobs.resolve(response) or "") for row_id, response in rows],
+        )
+        conn.commit()
+        indexed += len(rows)
+    return indexed
+
+
+def to_match_query(query: str) -> str:
+    """Plain words become an AND of quoted terms; queries already using FTS5 syntax pass through."""
+    query = query.strip()
+    if _QUERY_SYNTAX.search(query):
+        return query
+    return " ".join('"' + term.replace('"', '""') + '"' for term in query.split())
+
+
+def text_snippet(text: str, query: str, tokens: int = SNIPPET_TOKENS) -> str:
+    """Snippet cut in Python (for contentless indexes), highlighting words that start with a query term."""
+    terms = [t.lower() for t in re.findall(r"\w+", query) if t not in ("AND", "OR", "NOT", "NEAR")]
+    words = (text or "").split()
+    if not words:
+        return ""
+
+    def hit(word: str) -> bool:
+        w = re.sub(r"\W+", "", word).lower()
+        return any(w.startswith(t[:max(4, len(t) - 2)]) for t in terms)
+
+    first = next((i for i, w in enumerate(words) if hit(w)), 0)
+    start = max(0, first - tokens // 3)
+    window = words[start:start + tokens]
+    marked = [f"{HIGHLIGHT[0]}{w}{HIGHLIGHT[1]}" if hit(w) else w for w in window]
+    return ((ELLIPSIS if start > 0 else "") + " ".join(marked)
+            + (ELLIPSIS if start + tokens < len(words) else ""))
+
+
+def _snippet_sql(table: str, column: int) -> str:
+    return f"snippet({table}, {column}, '{HIGHLIGHT[0]}', '{HIGHLIGHT[1]}', '{ELLIPSIS}', {SNIPPET_TOKENS})"
+
+
+def search(conn: sqlite3.Connection, query: str, sources: Optional[Iterable[str]] = None,
+           limit: int = DEFAULT_LIMIT, all_versions: bool = False,
+           brainstorm_run: Optional[int] = None) -> Dict[str, List[Dict]]:
+    """
+    Ranked matches per source: {source: [{act, scene, label, snippet, rank}, ...]}.
+
+    Unless all_versions is set, drafts are collapsed to the best-ranked
+    version per scene and brainstorm matches come from the latest run
+    (or brainstorm_run).
+    """
+    ensure_search_index(conn)
+    sources = list(sources or SOURCES)
+    match = to_match_query(query)
+    results: Dict[str, List[Dict]] = {}
+
+    if "scenes" in sources:
+        rows = conn.execute(
+            f"""
+            SELECT act, scene, {_snippet_sql('finalized_scenes_fts', 0)}, rank
+            FROM finalized_scenes_fts WHERE finalized_scenes_fts MATCH ? ORDER BY rank LIMIT ?
+            """,
+            (match, limit),
+        ).fetchall()
+        results["scenes"] = [
+            {"act": a, "scene": s, "label": "final", "snippet": snip, "rank": rank} for a, s, snip, rank in rows
+        ]
+
+    if "drafts" in sources:
+        # Pick the rows first (best version per scene), then cut snippets for just those
+        per_scene = "" if all_versions else "WHERE best = 1"
+        picked = conn.execute(
+            f"""
+            SELECT id, act, scene, version, status, rank FROM (
+                SELECT d.id, d.act, d.scene, d.version, d.status, scene_drafts_fts.rank AS rank,
+                       ROW_NUMBER() OVER (PARTITION BY d.act, d.scene ORDER BY scene_drafts_fts.rank, d.id DESC) AS best
+                FROM scene_drafts_fts JOIN scene_drafts d ON d.id = scene_drafts_fts.rowid
+                WHERE scene_drafts_fts MATCH ?
+            ) {per_scene}
+            ORDER BY rank LIMIT ?
+            """,
+            (match, limit),
+        ).fetchall()
+        ids = [row[0] for row in picked]
+        snippets = dict(conn.execute(
+            f"""
+            SELECT rowid, {_snippet_sql('scene_drafts_fts', 0)} FROM scene_drafts_fts
+            WHERE scene_drafts_fts MATCH ? AND rowid IN ({', '.join('?' * len(ids))})
+            """,
+            (match, *ids),
+        ).fetchall()) if ids else {}
+        results["drafts"] = [
+            {"act": a, "scene": s, "label": f"v{v} {status}", "snippet": snippets.get(row_id, ""), "rank": rank}
+            for row_id, a, s, v, status, rank in picked
+        ]
+
+    if "brainstorm" in sources and table_exists(conn, INDEX_TABLES["brainstorm"]):
+        sync_brainstorm_index(conn)
+        run_id = brainstorm_run or latest_run_id(conn, "brainstorm")
+        run_filter = "" if all_versions else "AND r.run_id = ?"
+        args = (match,) if all_versions else (match, run_id)
+        rows = conn.execute(
+            f"""
+            SELECT r.act, r.scene, r.bucket_name, r.run_id, r.response, brainstorm_responses_fts.rank
+            FROM brainstorm_responses_fts JOIN {BRAINSTORM_TABLE} r ON r.id = brainstorm_responses_fts.rowid
+            WHERE brainstorm_responses_fts MATCH ? {run_filter}
+            ORDER BY brainstorm_responses_fts.rank LIMIT ?
+            """,
+            (*args, limit),
+        ).fetchall()
+        blobs = BlobStore(conn)
+        results["brainstorm"] = [
+            {"act": a, "scene": s, "label": f"{bucket} (run {run})",
+             "snippet": text_snippet(blobs.resolve(response), query), "rank": rank}
+            for a, s, bucket, run, response, rank in rows
+        ]
+
+    if "outline" in sources:
+        rows = conn.execute(
+            f"""
+            SELECT act, scene, {_snippet_sql('story_outline_fts', -1)}, rank
+            FROM story_outline_fts WHERE story_outline_fts MATCH ? ORDER BY rank LIMIT ?
+            """,
+            (match, limit),
+        ).fetchall()
+        results["outline"] = [
+            {"act": a, "scene": s, "label": "outline", "snippet": snip, "rank": rank} for a, s, snip, rank in rows
+        ]
+
+    return results
+
+
+def print_results(results: Dict[str, List[Dict]], query: str):
+    total = sum(len(hits) for hits in results.values())
+    print(f"\n🔎 {total} matches for: {query}")
+    for source in SOURCES:
+        hits = results.get(source)
+        if hits is None:
+            continue
+        print(f"\n📚 {source.capitalize()} ({len(hits)})")
+        for hit in hits:
+            print(f"  • Act {hit['act']}, Scene {hit['scene']} [{hit['label']}]")
+            print(f"    {hit['snippet']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Full-text search over a Lizzy project")
+    parser.add_argument("project", nargs="?", help="Project name (asked for when omitted)")
+    parser.add_argument("query", nargs="?", help="Words to find, or an FTS5 query (asked for when omitted)")
+    parser.add_argument("--source", nargs="+", choices=SOURCES, help="Limit the search to these sources")
+    parser.add_argument("--limit", type=int, default=DEFAULT_LIMIT, help="Matches per source (default 10)")
+    parser.add_argument("--all-versions", action="store_true",
+                        help="Every matching draft version and brainstorm run, not just the best per scene")
+    parser.add_argument("--rebuild", action="store_true", help="Recreate the search index from scratch")
+    args = parser.parse_args()
+
+    print("🔎 Lizzy Alpha - Search")
+    print("=" * 40)
+    base_dir = Path("projects")
+    name = args.project or choose_project(base_dir)
+    if not name:
+        print("❌ No projects found. Run 'python3 start.py' first to create a project.")
+        return
+    if not find_project(base_dir, name):
+        print(f"❌ Database not found for project '{name}'.")
+        return
+    db_path = base_dir / name / f"{name}.sqlite"
+
+    conn = connect(db_path)
+    try:
+        if args.rebuild:
+            drop_search_index(conn)
+            ensure_search_index(conn)
+            print(f"✅ Search index rebuilt ({sync_brainstorm_index(conn)} brainstorm responses indexed)")
+        query = args.query
+        while True:
+            if not query:
+                query = input("\nSearch (blank to quit): ").strip()
+                if not query:
+                    break
+            try:
+                print_results(search(conn, query, args.source, args.limit, args.all_versions), query)
+            except sqlite3.OperationalError as e:
+                print(f"❌ Invalid search query: {e}")
+            if args.query:
+                break
+            query = None
+    except KeyboardInterrupt:
+        print("\n")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -5,14 +5,136 @@ Lizzy Alpha - Start Module
 Initializes new writing projects with proper database schema.
 This module establishes the foundation for all subsequent creative work.
 
+New project databases are copied from a pre-built template
+(~/.lizzy/templates/project_template_<key>.sqlite) that already holds the
+schema, indexes and 30-scene outline; only the per-project metadata rows
+are written afterwards. The key is a hash of the schema and seed rows the
+build actually produces, including tables owned by other modules, so any
+schema change gets a fresh template instead of a stale copy.
+
 Author: Lizzy AI Writing Framework
 """
 
+import contextlib
+import hashlib
+import io
 import os
+import shutil
 import sqlite3
 import sys
 from datetime import datetime
 from pathlib import Path
+from typing import Dict, Iterable, Optional, Union
+
+from catalog import choose_project, find_project, project_entry, register_projects, update_catalog
+from db import connect
+from search import ensure_search_index
+
+DEFAULT_TEMPLATE_DIR = Path.home() / ".lizzy" / "templates"
+LIZZY_VERSION = "alpha_1.0"
+
+# Metadata rows that differ per project (cleared from the template, written on creation)
+PROJECT_METADATA_KEYS = ("project_name", "created_date")
+
+
+def sanitize_project_name(project_name: str) -> str:
+    """Letters, digits and ._- only, spaces as underscores ("" if nothing is left)."""
+    sanitized = "".join(c for c in project_name if c.isalnum() or c in "._- ").strip()
+    return sanitized.replace(" ", "_")
+
+
+def template_dir() -> Path:
+    return Path(os.getenv("LIZZY_TEMPLATE_DIR") or DEFAULT_TEMPLATE_DIR)
+
+
+def schema_fingerprint(conn: sqlite3.Connection) -> str:
+    """Hash of a database's schema and rows (timestamp columns and search index contents excluded)."""
+    digest = hashlib.sha256()
+    objects = conn.execute(
+        "SELECT type, name, sql FROM sqlite_master WHERE sql IS NOT NULL ORDER BY type, name"
+    ).fetchall()
+    for obj in objects:
+        digest.update(repr(obj).encode())
+    # Virtual tables and their shadow tables only mirror the rows hashed below
+    virtual = [name for _, name, sql in objects if sql.upper().startswith("CREATE VIRTUAL TABLE")]
+    for kind, table, _ in objects:
+        if kind != "table" or any(table == v or table.startswith(f"{v}_") for v in virtual):
+            continue
+        columns = [
+            f'"{name}"' for _, name, decl, *_ in conn.execute(f'PRAGMA table_info("{table}")')
+            if "TIME" not in (decl or "").upper()
+        ]
+        if columns:
+            rows = conn.execute(f'SELECT {", ".join(columns)} FROM "{table}"').fetchall()
+            digest.update(repr((table, sorted(map(repr, rows)))).encode())
+    return digest.hexdigest()[:16]
+
+
+_template: Optional[Path] = None
+
+
+def ensure_project_template() -> Path:
+    """Path of the template for the current schema, building it on first use.
+
+    The schema is built in memory once per process to compute its key; the
+    file is only written when no template with that key exists yet.
+    """
+    global _template
+    if _template and _template.exists():
+        return _template
+    directory = template_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    builder = LizzyStart(base_dir=directory)
+    builder.project_name = ""
+    builder.db_path = ":memory:"
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            builder.build_database()
+        placeholders = ", ".join("?" * len(PROJECT_METADATA_KEYS))
+        builder.conn.execute(f"DELETE FROM project_metadata WHERE key IN ({placeholders})", PROJECT_METADATA_KEYS)
+        builder.conn.commit()
+        path = directory / f"project_template_{schema_fingerprint(builder.conn)}.sqlite"
+        if not path.exists():
+            tmp = path.with_name(f"{path.stem}.{os.getpid()}.tmp")
+            tmp.unlink(missing_ok=True)
+            target = sqlite3.connect(tmp)
+            try:
+                builder.conn.backup(target)
+            finally:
+                target.close()
+            # Atomic: concurrent creators either see no template or a complete one
+            os.replace(tmp, path)
+    finally:
+        if builder.conn:
+            builder.conn.close()
+    _template = path
+    return path
+
+
+def write_project_metadata(conn: sqlite3.Connection, project_name: str, extra: Optional[Dict[str, str]] = None,
+                           catalog: bool = True):
+    """Write the per-project metadata rows (plus any extra key/value pairs) in one transaction, then catalog them."""
+    rows = {"project_name": project_name, "created_date": datetime.now().isoformat(), **(extra or {})}
+    conn.executemany(
+        """
+        INSERT OR REPLACE INTO project_metadata (key, value, updated_at)
+        VALUES (?, ?, CURRENT_TIMESTAMP)
+        """,
+        [(key, value) for key, value in rows.items() if value is not None],
+    )
+    conn.commit()
+    if catalog:
+        update_catalog(conn)
+
+
+def clone_project_template(db_path: Union[str, Path]):
+    """Create a project database as a copy of the template."""
+    db_path = Path(db_path)
+    try:
+        shutil.copyfile(ensure_project_template(), db_path)
+    except BaseException:
+        db_path.unlink(missing_ok=True)
+        raise
 
 
 class LizzyStart:
@@ -60,27 +182,11 @@ class LizzyStart:
     
     def setup_project(self):
         """Handle project selection/creation with user interaction."""
-        print("📂 Available Projects:")
-        projects = [d.name for d in self.base_dir.iterdir() if d.is_dir()]
-        
-        if projects:
-            for i, project in enumerate(projects, 1):
-                print(f"  {i}. {project}")
-        else:
-            print("  (No existing projects)")
-        
-        print()
-        
         while True:
-            project_name = input("Enter project name (or create new): ").strip()
+            project_name = choose_project(self.base_dir, "Enter project name (or create new): ", allow_new=True)
             
-            if not project_name:
-                print("❌ Project name cannot be empty.")
-                continue
-                
             # Sanitize project name
-            project_name = "".join(c for c in project_name if c.isalnum() or c in "._- ").strip()
-            project_name = project_name.replace(" ", "_")
+            project_name = sanitize_project_name(project_name)
             
             if not project_name:
                 print("❌ Invalid project name. Use letters, numbers, spaces, hyphens, or underscores.")
@@ -90,7 +196,7 @@ class LizzyStart:
             project_dir = self.base_dir / self.project_name
             self.db_path = project_dir / f"{self.project_name}.sqlite"
             
-            if project_name in projects:
+            if find_project(self.base_dir, project_name):
                 print(f"📝 Opening existing project: {project_name}")
                 break
             else:
@@ -103,11 +209,30 @@ class LizzyStart:
                     continue
     
     def setup_database(self):
+        """Create a new project database from the template; existing databases are brought up to date."""
+        if not Path(self.db_path).exists():
+            try:
+                clone_project_template(self.db_path)
+                self.conn = connect(self.db_path)
+                write_project_metadata(self.conn, self.project_name)
+                print("🗄️  Project database created from template (schema + 30-scene outline)")
+                return
+            except (OSError, sqlite3.Error) as e:
+                print(f"⚠️  Project template unavailable ({e}); building the database from scratch")
+                if self.conn:
+                    self.conn.close()
+                    self.conn = None
+                Path(self.db_path).unlink(missing_ok=True)
+        self.build_database()
+        if self.conn:
+            update_catalog(self.conn)
+
+    def build_database(self):
         """Initialize ONLY the tables needed by brainstorm.py and write.py."""
         print("🗄️  Setting up project database...")
 
         try:
-            self.conn = sqlite3.connect(self.db_path)
+            self.conn = connect(self.db_path)
             cursor = self.conn.cursor()
             cursor.execute("PRAGMA foreign_keys = ON")
 
@@ -209,6 +334,9 @@ class LizzyStart:
             cursor.execute("CREATE INDEX IF NOT EXISTS idx_scene_drafts_act_scene ON scene_drafts(act, scene)")
             cursor.execute("CREATE INDEX IF NOT EXISTS idx_finalized_scenes_act_scene ON finalized_scenes(act, scene)")
 
+            # Full-text search indexes, kept in sync by triggers from here on
+            ensure_search_index(self.conn)
+
             # Seed metadata
             cursor.execute("""
                 INSERT OR REPLACE INTO project_metadata (key, value, updated_at)
@@ -223,13 +351,14 @@ class LizzyStart:
             cursor.execute("""
                 INSERT OR REPLACE INTO project_metadata (key, value, updated_at)
                 VALUES ('lizzy_version', ?, CURRENT_TIMESTAMP)
-            """, ('alpha_1.0',))
+            """, (LIZZY_VERSION,))
 
             self.conn.commit()
             print("✅ Database schema initialized successfully")
             
             # Populate 30-scene professional structure
             self.populate_30_scene_template(cursor)
+            self.conn.commit()
 
         except sqlite3.Error as e:
             print(f"❌ Database error: {e}")
@@ -335,8 +464,7 @@ def create_new_project(project_name, title=None, genre="Romance", tone="Romantic
     """
     try:
         # Sanitize project name
-        sanitized_name = "".join(c for c in project_name if c.isalnum() or c in "._- ").strip()
-        sanitized_name = sanitized_name.replace(" ", "_")
+        sanitized_name = sanitize_project_name(project_name)
         
         if not sanitized_name:
             raise ValueError("Invalid project name")
@@ -357,24 +485,11 @@ def create_new_project(project_name, title=None, genre="Romance", tone="Romantic
         
         # Add additional metadata
         if start_module.conn:
-            cursor = start_module.conn.cursor()
-            
-            cursor.execute('''
-                INSERT OR REPLACE INTO project_metadata (key, value, updated_at)
-                VALUES ('title', ?, CURRENT_TIMESTAMP)
-            ''', (title or project_name,))
-            
-            cursor.execute('''
-                INSERT OR REPLACE INTO project_metadata (key, value, updated_at)
-                VALUES ('genre', ?, CURRENT_TIMESTAMP)
-            ''', (genre,))
-            
-            cursor.execute('''
-                INSERT OR REPLACE INTO project_metadata (key, value, updated_at)
-                VALUES ('tone', ?, CURRENT_TIMESTAMP)
-            ''', (tone,))
-            
-            start_module.conn.commit()
+            write_project_metadata(start_module.conn, sanitized_name, {
+                "title": title or project_name,
+                "genre": genre,
+                "tone": tone,
+            })
             start_module.conn.close()
         
         return True
@@ -384,6 +499,69 @@ def create_new_project(project_name, title=None, genre="Romance", tone="Romantic
         return False
 
 
+def create_projects_bulk(projects: Iterable[Union[str, Dict[str, str]]], base_dir="projects") -> Dict[str, bool]:
+    """
+    Create many projects in one call (for batch pipelines).
+    
+    Each project is a copy of the template database with its metadata
+    rows written; the template is built at most once and all new
+    projects are added to the catalog in one transaction.
+    
+    Args:
+        projects: Project names, or dicts with 'project_name' and optional
+            'title', 'genre', 'tone' and any further metadata keys
+        base_dir (str): Directory holding the projects
+    
+    Returns:
+        dict: Sanitized project name -> True if created, False if it
+        already existed or could not be created
+    """
+    base = Path(base_dir)
+    base.mkdir(exist_ok=True)
+    template = ensure_project_template()
+    results: Dict[str, bool] = {}
+    entries = []
+    for spec in projects:
+        spec = {"project_name": spec} if isinstance(spec, str) else dict(spec)
+        raw_name = spec.pop("project_name", "")
+        name = sanitize_project_name(raw_name)
+        if not name:
+            print(f"❌ Invalid project name: {raw_name!r}")
+            results[raw_name] = False
+            continue
+        if name in results:
+            print(f"⚠️  Project '{name}' is listed more than once; skipped")
+            continue
+        db_path = base / name / f"{name}.sqlite"
+        if db_path.exists():
+            print(f"⚠️  Project '{name}' already exists; skipped")
+            results[name] = False
+            continue
+        try:
+            db_path.parent.mkdir(exist_ok=True)
+            shutil.copyfile(template, db_path)
+            conn = connect(db_path)
+            try:
+                write_project_metadata(conn, name, {
+                    "title": spec.pop("title", None) or raw_name,
+                    "genre": spec.pop("genre", "Romance"),
+                    "tone": spec.pop("tone", "Romantic Comedy"),
+                    **spec,
+                }, catalog=False)
+                entries.append((name, project_entry(conn)))
+            finally:
+                conn.close()
+            results[name] = True
+        except (OSError, sqlite3.Error) as e:
+            db_path.unlink(missing_ok=True)
+            print(f"❌ Could not create project '{name}': {e}")
+            results[name] = False
+    register_projects(base, entries)
+    created = sum(results.values())
+    print(f"✨ Created {created} of {len(results)} projects from template {template.stem}")
+    return results
+
+
 def main():
     """Entry point when running as a script."""
     start_module = LizzyStart()
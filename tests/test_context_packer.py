@@ -0,0 +1,26 @@
+from context_packer import ContextPacker, count_tokens
+
+
+def test_over_budget_section_is_summarized_then_keeps_its_ending():
+    text = "\n".join(f"Paragraph {i} of the previous scene." for i in range(200))
+    packer = ContextPacker(total_budget=1000)
+    packer.add("prev_text", text, budget=120, keep="tail", summary="(Earlier:) They argued about the lease.")
+    packed = packer.pack()["prev_text"]
+    assert packed.startswith("(Earlier:) They argued about the lease.")
+    assert packed.endswith("Paragraph 199 of the previous scene.")
+    assert count_tokens(packed) <= 120
+    assert packer.summarized == ["prev_text"] and packer.trimmed == []
+
+
+def test_section_without_summary_is_trimmed():
+    packer = ContextPacker(total_budget=1000)
+    packer.add("next_desc", "word " * 500, budget=50)
+    packer.pack()
+    assert packer.trimmed == ["next_desc"] and packer.tokens["next_desc"] <= 50
+
+
+def test_section_within_budget_is_untouched():
+    packer = ContextPacker(total_budget=1000)
+    packer.add("prev_text", "Short scene.", budget=50, summary="unused")
+    assert packer.pack()["prev_text"] == "Short scene."
+    assert packer.summarized == [] and packer.trimmed == []
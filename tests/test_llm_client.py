@@ -0,0 +1,49 @@
+import asyncio
+
+import pytest
+
+import llm_client
+from llm_client import GenerationError, acall_with_retries, call_with_retries
+from rate_limit import RateLimiter
+
+TPM = 6000
+REQUEST_TOKENS = 2000
+
+
+@pytest.fixture
+def limiter(monkeypatch):
+    limiter = RateLimiter(rpm=1000, tpm=TPM)
+    monkeypatch.setattr(llm_client, "get_rate_limiter", lambda: limiter)
+    monkeypatch.setattr(llm_client, "retry_delay", lambda attempt, exc: 0)
+    monkeypatch.setenv("LLM_MAX_RETRIES", "2")
+    return limiter
+
+
+def fail_with(exc):
+    def fn():
+        raise exc
+    return fn
+
+
+def test_failed_attempt_returns_its_reservation(limiter):
+    with pytest.raises(GenerationError):
+        call_with_retries(fail_with(ValueError("bad request")), tokens=REQUEST_TOKENS)
+    assert limiter.tokens.level == pytest.approx(TPM, abs=1)
+    assert limiter.in_flight == 0
+
+
+def test_retried_transient_failures_do_not_drain_the_budget(limiter):
+    with pytest.raises(GenerationError):
+        call_with_retries(fail_with(ConnectionError("reset")), tokens=REQUEST_TOKENS)
+    # Three attempts of 2000 tokens each would empty a 6000-token bucket
+    assert limiter.tokens.level == pytest.approx(TPM, abs=1)
+
+
+def test_async_failed_attempt_returns_its_reservation(limiter):
+    async def fn():
+        raise ConnectionError("reset")
+
+    with pytest.raises(GenerationError):
+        asyncio.run(acall_with_retries(fn, tokens=REQUEST_TOKENS))
+    assert limiter.tokens.level == pytest.approx(TPM, abs=1)
+    assert limiter.in_flight == 0
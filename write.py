@@ -4,24 +4,48 @@ Lizzy Alpha - Write Module (v3)
 ================================
 Refactored to mirror the Brainstorm module's structure and UX, per spec:
 - Processes ALL scenes automatically
-- Requires an existing brainstorming session (brainstorming_log_vX)
+- Requires an existing brainstorming run (brainstorm_responses)
 - For each scene, pulls brainstorming responses for ALL buckets and blends them
 - Injects bucket-specific guidance (books/scripts/plays) into the prompt
 - Always includes continuity triad: previous scene text, outline snapshot, next scene outline
 - Target length: 700–900 words; Golden-Era Romcom tone baked in
-- Logs to versioned run table (write_runs_vX) + scene_drafts + finalized_scenes
+- Logs every generation to write_outputs under its run_id + scene_drafts + finalized_scenes
 - Auto-exports compiled .txt and .md on completion
 
 Author: Lizzy AI Writing Framework
 """
 
+import argparse
+import asyncio
+import difflib
+import hashlib
 import os
 import re
 import sqlite3
+import sys
+import time
+from concurrent.futures import Future
 from pathlib import Path
 from datetime import datetime
 from typing import Dict, List, Optional, Tuple
 
+from batch import BatchRunner, build_request
+from blob_store import BlobStore
+from buckets import LazyBuckets
+from catalog import choose_project
+from context_packer import ContextPacker, count_tokens, truncate_to_tokens
+from db import WriteQueue, connect, get_write_queue
+from digest import BrainstormDigester, latest_brainstorm_run, load_brainstorm_index
+from llm_client import (DEFAULT_SYSTEM_PROMPT, GenerationError, acomplete, build_messages, complete,
+                        estimate_request_tokens, get_client, is_rate_limited, is_transient, retry_delay,
+                        retry_settings, usage_stats)
+from prompt_compiler import PromptCompiler
+from rate_limit import get_rate_limiter
+from response_cache import get_response_cache
+from run_state import RunState
+from run_tables import BRAINSTORM_TABLE, WRITE_TABLE, ensure_run_tables, run_label
+from scene_graph import PREV_CHANGED, SceneGraph, hash_characters, hash_outline, hash_text
+
 # LightRAG / LLM imports (for gpt_4o_mini wrapper)
 LIGHTRAG_AVAILABLE = True
 try:
@@ -69,32 +93,65 @@ BUCKET_GUIDANCE = {
     ),
 }
 
+GENERATION_MODEL = "gpt-4o-mini"
+GENERATION_TEMPERATURE = 0.7
+SCENE_MAX_TOKENS = 2000
+REPAIR_MAX_TOKENS = 700
+REPAIR_PREV_CHARS = 1200  # ending of the previous scene a transition repair sees
+DEFAULT_WRITE_CONCURRENCY = 6
+DEFAULT_DIRTY_DEPTH = 1
+
+# Story-so-far memory bounds (predictable input size per scene)
+SUMMARY_MAX_TOKENS = 200
+MAX_SCENE_SUMMARIES_IN_PROMPT = 8
+
+# Token budgets for scene prompts. Static sections are fitted once when the
+# prefix is compiled; per-scene sections are packed into WRITE_PROMPT_TOKEN_BUDGET,
+# trimming the highest priority number first (scene context is never trimmed).
+SECTION_TOKEN_BUDGETS = {
+    "characters": 600,
+    "outline": 600,
+    "story_so_far": 800,
+    "prev_text": 500,
+    "next_desc": 200,
+    "brainstorm_bucket": 500,
+}
+SECTION_PRIORITIES = {
+    "scene_context": 1,
+    "scene_characters": 2,
+    "prev_text": 2,
+    "story_so_far": 3,
+    "next_desc": 4,
+    "brainstorm": 5,
+}
+DEFAULT_PROMPT_TOKEN_BUDGET = 3500
+
+# Streaming: partial scene text is checkpointed into the run table this often
+STREAM_CHECKPOINT_SECONDS = 5.0
+STREAM_CHECKPOINT_CHARS = 800
+CONTINUE_INSTRUCTION = (
+    "Continue the scene exactly where your previous message stopped. "
+    "Do not repeat any text and add no preamble; output only the continuation."
+)
+
+# Characters always in every scene prompt; others only where the outline lists them
+CORE_CHARACTER_ROLES = ("protagonist", "love_interest")
+CHARACTER_MATCH_CUTOFF = 0.8
+
+OUTLINE_FIELDS = [
+    "scene_title", "location", "time_of_day", "characters_present", "scene_purpose",
+    "key_events", "emotional_beats", "dialogue_notes", "beat", "nudge", "plot_threads", "notes",
+]
+
 # -----------------------------
 # Helpers to initialize buckets
 # -----------------------------
 
 def initialize_lightrag_buckets() -> Dict[str, "LightRAG"]:
-    """Initialize LightRAG instances for standard buckets. (Not strictly required for write.)"""
-    buckets: Dict[str, "LightRAG"] = {}
+    """Register LightRAG buckets lazily. (Not required for write; nothing is loaded unless queried.)"""
     if not LIGHTRAG_AVAILABLE:
-        return buckets
-
-    bucket_configs = {
-        "books": "./lightrag_working_dir/books",
-        "scripts": "./lightrag_working_dir/scripts",
-        "plays": "./lightrag_working_dir/plays",
-    }
-
-    print("🔧 Initializing LightRAG buckets...")
-    for name, root in bucket_configs.items():
-        try:
-            Path(root).mkdir(parents=True, exist_ok=True)
-            buckets[name] = LightRAG(working_dir=root)
-            print(f"  ✅ {name}: {root}")
-        except Exception as e:
-            print(f"  ⚠️  Skip {name}: {e}")
-
-    return buckets
+        return {}
+    return LazyBuckets()
 
 
 # -----------------------------
@@ -117,42 +174,76 @@ class WriteAgent:
         self.easter_egg = ""
         self.format = "prose"                 # prose | screenplay
 
-        # Session table
-        self.table_name: Optional[str] = None  # write_runs_vX
+        # This run's row in run_state; keys its rows in write_outputs
+        self.run_id: Optional[int] = None
+
+        # Run mode: "sequential" (true prev-scene continuity) | "fast" (speculative parallel drafts)
+        #           | "acts" (one sequential chain per act, acts in parallel)
+        #           | "batch" (fast mode's two passes as provider batch jobs)
+        #           | "dirty" (rewrite only scenes whose recorded inputs changed)
+        self.mode = "sequential"
+        # How many successors of a rewritten scene --dirty also rewrites
+        self.dirty_depth = DEFAULT_DIRTY_DEPTH
+        self.max_concurrency = int(os.getenv("WRITE_MAX_CONCURRENCY", DEFAULT_WRITE_CONCURRENCY))
 
         # Hard requirement per spec
         self.require_brainstorm = True
 
+        # Shared on-disk response cache (None when disabled)
+        self.cache = get_response_cache()
+
+        # Deduplicated, compressed storage for run-table prompts and outputs
+        self.blobs: Optional[BlobStore] = None
+
+        # Background single writer for run rows, drafts and finalized scenes (db.py)
+        self.writes: Optional[WriteQueue] = None
+
+        # Checkpoint record for this run (see run_state.py)
+        self.run_state: Optional[RunState] = None
+
+        # Sequential runs stream each scene to the terminal as it is generated
+        self.stream = True
+
+        # Brainstorm context loaded once per session: (act, scene) -> bucket -> text
+        self.brainstorm_index: Dict[Tuple[int, int], Dict[str, str]] = {}
+        self.brainstorm_index_run: Optional[int] = None
+
+        # Condensed per-scene brainstorm digests (digest.py), used in place of raw bucket text
+        self.digests: Dict[Tuple[int, int], str] = {}
+        self.build_digests = False
+
+        # Session-invariant prompt prefixes, compiled once per run
+        self.prompt_compiler = PromptCompiler("scene")
+
+        # (act, scene) -> indexes into the run's character list, matched once per run
+        self.scene_cast: Dict[Tuple[int, int], List[int]] = {}
+
+        # What every finalized scene was written from (see scene_graph.py)
+        self.scene_graph: Optional[SceneGraph] = None
+        self.run_characters: List[Dict] = []
+        self.run_scenes: Dict[Tuple[int, int], Dict] = {}
+
+        # Token budget for the per-scene part of each prompt
+        self.prompt_token_budget = int(os.getenv("WRITE_PROMPT_TOKEN_BUDGET", DEFAULT_PROMPT_TOKEN_BUDGET))
+
     # -------------
     # Setup & Schema
     # -------------
     def setup_project(self) -> bool:
-        print("📂 Available Projects:")
-        projects = [d.name for d in self.base_dir.iterdir() if d.is_dir()]
-        if not projects:
+        name = choose_project(self.base_dir)
+        if not name:
             print("❌ No projects found. Run 'python3 start.py' first to create a project.")
             return False
-        for p in projects:
-            print(f"  - {p}")
-        print()
-        while True:
-            name = input("Enter project name: ").strip()
-            if name in projects:
-                self.project_name = name
-                self.db_path = self.base_dir / name / f"{name}.sqlite"
-                if not self.db_path.exists():
-                    print(f"❌ Database not found for project '{name}'.")
-                    continue
-                try:
-                    self.conn = sqlite3.connect(self.db_path)
-                    self.conn.row_factory = sqlite3.Row
-                    print(f"✅ Connected to project: {name}")
-                    return True
-                except sqlite3.Error as e:
-                    print(f"❌ Database connection error: {e}")
-                    return False
-            else:
-                print("❌ Project not found. Please enter a valid project name.")
+        self.project_name = name
+        self.db_path = self.base_dir / name / f"{name}.sqlite"
+        try:
+            self.conn = connect(self.db_path)
+            self.conn.row_factory = sqlite3.Row
+            print(f"✅ Connected to project: {name}")
+            return True
+        except sqlite3.Error as e:
+            print(f"❌ Database connection error: {e}")
+            return False
 
     def ensure_support_tables(self):
         cursor = self.conn.cursor()
@@ -169,51 +260,74 @@ class WriteAgent:
             )
             """
         )
-        self.conn.commit()
-
-    def get_next_table_name(self) -> str:
-        cursor = self.conn.cursor()
+        # Story-so-far memory: one summary per finalized scene, one per act
         cursor.execute(
             """
-            SELECT name FROM sqlite_master
-            WHERE type='table' AND name LIKE 'write_runs_v%'
+            CREATE TABLE IF NOT EXISTS scene_summaries (
+                act INTEGER NOT NULL,
+                scene INTEGER NOT NULL,
+                source_hash TEXT NOT NULL,
+                summary TEXT NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (act, scene)
+            )
             """
         )
-        tables = [r[0] for r in cursor.fetchall()]
-        versions: List[int] = []
-        for t in tables:
-            m = re.search(r"_v(\d+)$", t)
-            if m:
-                versions.append(int(m.group(1)))
-        next_v = max(versions) + 1 if versions else 1
-        return f"write_runs_v{next_v}"
-
-    def setup_session_table(self):
-        self.ensure_support_tables()
-        self.table_name = self.get_next_table_name()
-        cursor = self.conn.cursor()
         cursor.execute(
-            f"""
-            CREATE TABLE IF NOT EXISTS {self.table_name} (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                act INTEGER NOT NULL,
-                scene INTEGER NOT NULL,
-                scene_title TEXT,
-                prompt TEXT NOT NULL,
-                output TEXT NOT NULL,
+            """
+            CREATE TABLE IF NOT EXISTS act_summaries (
+                act INTEGER PRIMARY KEY,
+                source_hash TEXT NOT NULL,
+                summary TEXT NOT NULL,
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             )
             """
         )
+        self.conn.commit()
+
+    def setup_session_table(self):
+        self.ensure_support_tables()
+        self.run_state = RunState.start(self.conn, "write", WRITE_TABLE, {
+            "style": self.style,
+            "tone": self.tone,
+            "goal": self.goal,
+            "easter_egg": self.easter_egg,
+            "format": self.format,
+            "mode": self.mode,
+            "depth": self.dirty_depth,
+        })
+        self.run_id = self.run_state.run_id
+        cursor = self.conn.cursor()
         cursor.execute(
             """
             INSERT INTO write_sessions (session_name, style, tone, goal, easter_egg)
             VALUES (?, ?, ?, ?, ?)
             """,
-            (f"Session {self.table_name} ({self.format})", self.style, self.tone, self.goal, self.easter_egg or "None"),
+            (f"Session {run_label('write', self.run_id)} ({self.format})", self.style, self.tone, self.goal,
+             self.easter_egg or "None"),
         )
         self.conn.commit()
-        print(f"📝 Created writing table: {self.table_name}")
+        print(f"📝 Started writing run: {run_label('write', self.run_id)}")
+
+    def resume_latest(self) -> bool:
+        """Continue the most recent incomplete writing run with its original presets."""
+        ensure_run_tables(self.conn)
+        state = RunState.latest_incomplete(self.conn, "write")
+        if not state:
+            print("ℹ️  No incomplete writing run to resume; starting a new one.")
+            return False
+        self.run_state = state
+        self.run_id = state.run_id
+        self.style = state.config.get("style", self.style)
+        self.tone = state.config.get("tone", self.tone)
+        self.goal = state.config.get("goal", self.goal)
+        self.easter_egg = state.config.get("easter_egg", "")
+        self.format = state.config.get("format", self.format)
+        self.mode = state.config.get("mode", self.mode)
+        self.dirty_depth = state.config.get("depth", self.dirty_depth)
+        print(f"⏯️  Resuming {self.mode} writing run: {run_label('write', self.run_id)} "
+              f"({self.format}, {self.style}, {self.tone})")
+        return True
 
     # --------------------
     # Authoring Experience
@@ -304,46 +418,59 @@ class WriteAgent:
         )
         return [dict(r) for r in cursor.fetchall()]
 
-    def get_latest_brainstorm_table(self) -> Optional[str]:
-        cursor = self.conn.cursor()
-        cursor.execute(
-            """
-            SELECT name FROM sqlite_master
-            WHERE type='table' AND name LIKE 'brainstorming_log_v%'
-            """
-        )
-        tables = [r[0] for r in cursor.fetchall()]
-        if not tables:
-            return None
-        def ver(t: str) -> int:
-            m = re.search(r"_v(\d+)$", t)
-            return int(m.group(1)) if m else 0
-        tables.sort(key=ver, reverse=True)
-        return tables[0]
+    def get_latest_brainstorm_run(self) -> Optional[int]:
+        if self.brainstorm_index_run:
+            return self.brainstorm_index_run
+        return latest_brainstorm_run(self.conn)
+
+    def load_brainstorm_index(self, run_id: int) -> int:
+        """Bulk-load a brainstorm run into memory in one query; return the number of scenes covered."""
+        try:
+            self.brainstorm_index = load_brainstorm_index(self.conn, run_id)
+        except sqlite3.OperationalError:
+            return 0
+        self.brainstorm_index_run = run_id
+        return len(self.brainstorm_index)
+
+    def brainstorm_label(self) -> Optional[str]:
+        return run_label("brainstorm", self.brainstorm_index_run) if self.brainstorm_index_run else None
+
+    def load_digests(self, scenes: List[Dict]):
+        """Build missing digests when asked (--digest), then pick up every current one."""
+        digester = BrainstormDigester(self.conn, self.max_concurrency)
+        if self.build_digests:
+            titles = {(s["act"], s["scene"]): s.get("scene_title") or "" for s in scenes}
+            self.digests = digester.run(self.brainstorm_index_run, titles, self.brainstorm_index)
+        else:
+            self.digests = digester.current_digests(self.brainstorm_index)
+        if self.digests:
+            print(f"🧾 Using brainstorm digests for {len(self.digests)} of {len(self.brainstorm_index)} scenes")
 
-    def get_brainstorm_by_bucket(self, table: str, act: int, scene: int) -> Dict[str, str]:
+    def get_brainstorm_by_bucket(self, run_id: int, act: int, scene: int) -> Dict[str, str]:
         """Return a dict of bucket_name -> concatenated response for this scene."""
+        if run_id == self.brainstorm_index_run:
+            return self.brainstorm_index.get((act, scene), {})
         cursor = self.conn.cursor()
         try:
             cursor.execute(
-                f"SELECT bucket_name, response FROM {table} WHERE act=? AND scene=? ORDER BY id",
-                (act, scene),
+                f"SELECT bucket_name, response FROM {BRAINSTORM_TABLE} WHERE run_id=? AND act=? AND scene=? ORDER BY id",
+                (run_id, act, scene),
             )
             rows = cursor.fetchall()
             bucket_map: Dict[str, List[str]] = {}
             for r in rows:
                 b = r["bucket_name"].strip()
-                bucket_map.setdefault(b, []).append(r["response"])
+                bucket_map.setdefault(b, []).append(self.blob_store().resolve(r["response"]))
             return {b: "\n\n".join(txts) for b, txts in bucket_map.items()} if bucket_map else {}
         except sqlite3.OperationalError:
             return {}
 
-    def verify_brainstorm_coverage(self, table: str, scenes: List[Dict]) -> None:
+    def verify_brainstorm_coverage(self, run_id: int, scenes: List[Dict]) -> None:
         """Ensure every scene has at least one brainstorm row; raise if any are missing."""
         missing: List[Tuple[int, int]] = []
         for s in scenes:
             act, sc = s["act"], s["scene"]
-            by_bucket = self.get_brainstorm_by_bucket(table, act, sc)
+            by_bucket = self.get_brainstorm_by_bucket(run_id, act, sc)
             if not by_bucket:
                 missing.append((act, sc))
         if missing:
@@ -356,67 +483,98 @@ class WriteAgent:
     # -------------
     # Prompt Builder
     # -------------
-    def build_prompt(
+    @staticmethod
+    def is_core_character(c: Dict) -> bool:
+        role = (c.get("role") or "").strip().lower().replace(" ", "_")
+        return role in CORE_CHARACTER_ROLES
+
+    @staticmethod
+    def format_character(c: Dict) -> str:
+        name = c.get("name", "")
+        role = c.get("role", "")
+        desc = c.get("description", "")
+        bits: List[str] = []
+        if c.get("romantic_challenge"): bits.append(f"Challenge: {c['romantic_challenge']}")
+        if c.get("lovable_trait"): bits.append(f"Lovable: {c['lovable_trait']}")
+        if c.get("comedic_flaw"): bits.append(f"Comedy: {c['comedic_flaw']}")
+        tag = f" - {name}"
+        if role: tag += f" ({role})"
+        if desc: tag += f": {desc}"
+        if bits: tag += f" [{'; '.join(bits)}]"
+        return tag
+
+    def match_scene_characters(self, characters: List[Dict], scenes: List[Dict]) -> Dict[Tuple[int, int], List[int]]:
+        """
+        Map each scene to the non-core characters its outline mentions
+        (characters_present / key_characters). Names match on full name,
+        first or last name, or role, exactly or fuzzily via difflib.
+        """
+        aliases: Dict[str, int] = {}
+        for i, c in enumerate(characters):
+            if self.is_core_character(c):
+                continue
+            name = (c.get("name") or "").strip().lower()
+            if name:
+                aliases.setdefault(name, i)
+                for part in (name.split()[0], name.split()[-1]):
+                    aliases.setdefault(part, i)
+            role = (c.get("role") or "").strip().lower()
+            if role:
+                aliases.setdefault(role.replace("_", " "), i)
+        keys = list(aliases)
+
+        cast: Dict[Tuple[int, int], List[int]] = {}
+        for s in scenes:
+            text = " , ".join(filter(None, [s.get("characters_present"), s.get("key_characters")]))
+            mentions = [m.strip().lower() for m in re.split(r",|;|/|&|\n|\band\b", text) if m.strip()]
+            found: List[int] = []
+            for mention in mentions:
+                words = re.findall(r"[\w'.-]+", mention)
+                candidates = [mention] + words
+                for candidate in candidates:
+                    match = aliases.get(candidate)
+                    if match is None and len(candidate) >= 4:
+                        close = difflib.get_close_matches(candidate, keys, n=1, cutoff=CHARACTER_MATCH_CUTOFF)
+                        match = aliases[close[0]] if close else None
+                    if match is not None:
+                        if match not in found:
+                            found.append(match)
+                        break
+            cast[(s["act"], s["scene"])] = found
+        return cast
+
+    def session_buckets(self) -> List[str]:
+        """Buckets present anywhere in the loaded brainstorm index (stable for the whole run)."""
+        seen = {b for by_bucket in self.brainstorm_index.values() for b in by_bucket}
+        return [b for b in BUCKET_GUIDANCE if b in seen] + sorted(seen - set(BUCKET_GUIDANCE))
+
+    def build_static_prefix(
         self,
         metadata: Dict[str, str],
         characters: List[Dict],
-        scene: Dict,
-        brainstorm_by_bucket: Dict[str, str],
         outline_snapshot: str,
-        prev_text: str,
-        next_desc: str,
+        buckets: List[str],
         min_words: int = 700,
         max_words: int = 900,
     ) -> str:
+        """Session-invariant head of every scene prompt: compiled once per run."""
         title = metadata.get("project_name", self.project_name or "Untitled Project")
         genre = metadata.get("genre", "Romantic Comedy")
         pov = metadata.get("pov", "third-person limited")
         tense = metadata.get("tense", "past")
 
-        # Character summaries
-        char_lines: List[str] = []
-        for c in characters:
-            name = c.get("name", "")
-            role = c.get("role", "")
-            desc = c.get("description", "")
-            bits: List[str] = []
-            if c.get("romantic_challenge"): bits.append(f"Challenge: {c['romantic_challenge']}")
-            if c.get("lovable_trait"): bits.append(f"Lovable: {c['lovable_trait']}")
-            if c.get("comedic_flaw"): bits.append(f"Comedy: {c['comedic_flaw']}")
-            tag = f" - {name}"
-            if role: tag += f" ({role})"
-            if desc: tag += f": {desc}"
-            if bits: tag += f" [{'; '.join(bits)}]"
-            char_lines.append(tag)
-
-        # Scene context
-        def ctx(scene: Dict) -> str:
-            parts: List[str] = []
-            if scene.get('scene_title'): parts.append(f"Title: {scene['scene_title']}")
-            if scene.get('location'): parts.append(f"Location: {scene['location']}")
-            if scene.get('time_of_day'): parts.append(f"Time: {scene['time_of_day']}")
-            if scene.get('characters_present'): parts.append(f"Characters: {scene['characters_present']}")
-            if scene.get('scene_purpose'): parts.append(f"Purpose: {scene['scene_purpose']}")
-            if scene.get('key_events'): parts.append(f"Key Events: {scene['key_events']}")
-            if scene.get('emotional_beats'): parts.append(f"Emotional Journey: {scene['emotional_beats']}")
-            if scene.get('dialogue_notes'): parts.append(f"Dialogue Notes: {scene['dialogue_notes']}")
-            if scene.get('beat'): parts.append(f"Story Beat: {scene['beat']}")
-            if scene.get('nudge'): parts.append(f"Direction: {scene['nudge']}")
-            if scene.get('plot_threads'): parts.append(f"Plot Threads: {scene['plot_threads']}")
-            if scene.get('notes'): parts.append(f"Notes: {scene['notes']}")
-            return "\n".join(parts)
+        # Core cast (protagonist, love interest) is in every scene; the rest is added per scene
+        char_lines = [self.format_character(c) for c in characters if self.is_core_character(c)]
+        characters_block = truncate_to_tokens(
+            "\n".join(char_lines), SECTION_TOKEN_BUDGETS["characters"], keep="lines"
+        )
 
-        # Build bucket guidance and context blocks (only for buckets present in brainstorm rows)
-        present_buckets = list(brainstorm_by_bucket.keys())
+        # Bucket guidance for every bucket this run draws on
         guidance_lines: List[str] = []
-        for b in present_buckets:
+        for b in buckets:
             g = BUCKET_GUIDANCE.get(b, "Provide creative insights for this scene.")
             guidance_lines.append(f"- {b}: {g}")
 
-        bucket_context_lines: List[str] = []
-        for b in present_buckets:
-            bucket_context_lines.append(f"[{b.upper()}]\n{brainstorm_by_bucket[b].strip()}")
-
         style_blend = self.style
         egg = f"\n- Easter egg to weave in: {self.easter_egg}" if self.easter_egg else ""
 
@@ -445,7 +603,6 @@ She slides the cup across the counter with practiced ease.
 
 TARGET: {min_words}-{max_words} words in screenplay format{egg}
 """
-            task_instruction = "Make a brief internal plan, then write ONE complete scene in proper screenplay format that advances stakes and arcs while honoring all locks and continuity. Output the screenplay scene only."
             no_headers_instruction = "- Use proper screenplay scene headings (INT./EXT. LOCATION - TIME)."
         else:
             format_instructions = f"""
@@ -454,10 +611,9 @@ STYLE & TARGET
 - Tone: {self.tone}
 - Target length: {min_words}-{max_words} words{egg}
 """
-            task_instruction = "Make a brief internal plan, then write ONE continuous, production-ready scene in polished prose that advances stakes and arcs while honoring all locks and continuity. Output the scene text only."
             no_headers_instruction = "- No scene headers or lists; output prose only."
 
-        prompt = f"""
+        return f"""
 TONE PRESET
 {GOLDEN_ERA_ROMCOM_TONE}
 
@@ -466,32 +622,18 @@ GENRE: {genre}
 
 CONTINUITY LOCKS (must not change):
 - POV: {pov} | Tense: {tense}
-- Names & spelling: Use exactly as in CHARACTERS.
+- Names & spelling: Use exactly as in CHARACTERS and SCENE CHARACTERS.
 - Setting/time for this scene must match SCENE CONTEXT.
 
 CHARACTERS
-{chr(10).join(char_lines) if char_lines else '(No characters defined)'}
-
-SCENE CONTEXT
-Act {scene['act']}, Scene {scene['scene']}
-{ctx(scene)}
+{characters_block if characters_block else '(No protagonist or love interest defined)'}
 
-CONTINUITY CONTEXT
-- Previous Scene Text (for tone/voice/emotional carry-over):
-{prev_text}
-
-- Outline Snapshot (full structure, current marked with ">>"):
+OUTLINE (full structure; the scene to write is given in SCENE CONTEXT below)
 {outline_snapshot}
 
-- Next Scene Description (for pacing/foreshadowing alignment):
-{next_desc if next_desc else '(No next scene listed.)'}
-
 BUCKET GUIDANCE (apply all)
 {chr(10).join(guidance_lines) if guidance_lines else '- (no bucket guidance present)'}
 
-BRAINSTORM CONTEXT BY BUCKET (inspiration; do not copy verbatim)
-{chr(10).join(bucket_context_lines) if bucket_context_lines else '(No brainstorming context available)'}
-
 {format_instructions}
 
 DO
@@ -505,77 +647,423 @@ DON'T
 {no_headers_instruction}
 - Do not quote or closely paraphrase brainstorm text. Synthesize.
 - Do not introduce new named characters or revise canon facts.
+""".strip()
+
+    def build_prompt(
+        self,
+        metadata: Dict[str, str],
+        characters: List[Dict],
+        scene: Dict,
+        brainstorm_by_bucket: Dict[str, str],
+        outline_snapshot: str,
+        prev_text: str,
+        next_desc: str,
+        min_words: int = 700,
+        max_words: int = 900,
+        story_so_far: str = "",
+        prev_summary: str = "",
+    ) -> str:
+        # Scene context
+        def ctx(scene: Dict) -> str:
+            parts: List[str] = []
+            if scene.get('scene_title'): parts.append(f"Title: {scene['scene_title']}")
+            if scene.get('location'): parts.append(f"Location: {scene['location']}")
+            if scene.get('time_of_day'): parts.append(f"Time: {scene['time_of_day']}")
+            if scene.get('characters_present'): parts.append(f"Characters: {scene['characters_present']}")
+            if scene.get('scene_purpose'): parts.append(f"Purpose: {scene['scene_purpose']}")
+            if scene.get('key_events'): parts.append(f"Key Events: {scene['key_events']}")
+            if scene.get('emotional_beats'): parts.append(f"Emotional Journey: {scene['emotional_beats']}")
+            if scene.get('dialogue_notes'): parts.append(f"Dialogue Notes: {scene['dialogue_notes']}")
+            if scene.get('beat'): parts.append(f"Story Beat: {scene['beat']}")
+            if scene.get('nudge'): parts.append(f"Direction: {scene['nudge']}")
+            if scene.get('plot_threads'): parts.append(f"Plot Threads: {scene['plot_threads']}")
+            if scene.get('notes'): parts.append(f"Notes: {scene['notes']}")
+            return "\n".join(parts)
+
+        # The static prefix is compiled once per run; everything below it varies per scene
+        buckets = self.session_buckets() or list(brainstorm_by_bucket.keys())
+        prefix_key = ("scene", min_words, max_words, tuple(buckets))
+        build_prefix = lambda: self.build_static_prefix(
+            metadata, characters, outline_snapshot, buckets, min_words, max_words
+        )
+
+        # Pack the per-scene sections into the token budget
+        packer = ContextPacker(self.prompt_token_budget)
+        packer.add("scene_context", ctx(scene), priority=SECTION_PRIORITIES["scene_context"])
+        scene_cast = self.scene_cast.get((scene["act"], scene["scene"]), [])
+        packer.add("scene_characters", "\n".join(self.format_character(characters[i])
+                                                  for i in scene_cast if i < len(characters)),
+                   SECTION_TOKEN_BUDGETS["characters"], SECTION_PRIORITIES["scene_characters"], keep="lines")
+        packer.add("story_so_far", story_so_far, SECTION_TOKEN_BUDGETS["story_so_far"],
+                   SECTION_PRIORITIES["story_so_far"], keep="tail_lines")
+        # An over-budget previous scene becomes its summary plus its ending (the seam to pick up from)
+        packer.add("prev_text", prev_text, SECTION_TOKEN_BUDGETS["prev_text"], SECTION_PRIORITIES["prev_text"],
+                   keep="tail", summary=f"(Earlier in the previous scene:) {prev_summary}" if prev_summary else "")
+        packer.add("next_desc", next_desc or "", SECTION_TOKEN_BUDGETS["next_desc"],
+                   SECTION_PRIORITIES["next_desc"])
+        for b in brainstorm_by_bucket:
+            packer.add(f"brainstorm:{b}", brainstorm_by_bucket[b].strip(), SECTION_TOKEN_BUDGETS["brainstorm_bucket"],
+                       SECTION_PRIORITIES["brainstorm"])
+        packed = packer.pack()
+
+        bucket_context_lines: List[str] = []
+        for b in brainstorm_by_bucket:
+            if packed[f"brainstorm:{b}"]:
+                bucket_context_lines.append(f"[{b.upper()}]\n{packed[f'brainstorm:{b}']}")
+
+        if self.format == "screenplay":
+            task_instruction = "Make a brief internal plan, then write ONE complete scene in proper screenplay format that advances stakes and arcs while honoring all locks and continuity. Output the screenplay scene only."
+        else:
+            task_instruction = "Make a brief internal plan, then write ONE continuous, production-ready scene in polished prose that advances stakes and arcs while honoring all locks and continuity. Output the scene text only."
+
+        variable = f"""
+SCENE CONTEXT
+Act {scene['act']}, Scene {scene['scene']}
+{packed['scene_context']}
+
+SCENE CHARACTERS (also appearing in this scene)
+{packed['scene_characters'] if packed['scene_characters'] else '(Core cast only)'}
+
+CONTINUITY CONTEXT
+- Story So Far (earlier acts and scenes, summarized):
+{packed['story_so_far'] if packed['story_so_far'] else '(This is the opening of the story.)'}
+
+- Previous Scene Text (for tone/voice/emotional carry-over):
+{packed['prev_text'] if packed['prev_text'] else '(No previous scene available.)'}
+
+- Next Scene Description (for pacing/foreshadowing alignment):
+{packed['next_desc'] if packed['next_desc'] else '(No next scene listed.)'}
+
+BRAINSTORM CONTEXT BY BUCKET (inspiration; do not copy verbatim)
+{chr(10).join(bucket_context_lines) if bucket_context_lines else '(No brainstorming context available)'}
 
 TASK
 {task_instruction}
-""".strip()
+"""
+        prompt = self.prompt_compiler.assemble(prefix_key, build_prefix, variable)
+        prefix_tokens = self.prompt_compiler.prefix_tokens(prefix_key)
+        print(f"  📏 Act {scene['act']}, Scene {scene['scene']} prompt: prefix {prefix_tokens} + scene {packer.summary()}")
         return prompt
 
     # --------------
     # Generation & Persist
     # --------------
-    def generate(self, prompt: str) -> str:
-        # Per spec: we do not fan out one draft per bucket; we blend all buckets then generate once.
-        # Use direct OpenAI API call instead of LightRAG's async wrapper
-        if LIGHTRAG_AVAILABLE:
-            try:
-                import openai
-                client = openai.OpenAI()
-                response = client.chat.completions.create(
-                    model="gpt-4o-mini",
-                    messages=[
-                        {"role": "system", "content": "You are an expert screenwriter and novelist specializing in romantic comedies."},
-                        {"role": "user", "content": prompt}
-                    ],
-                    temperature=0.7,
-                    max_tokens=2000
-                )
-                return response.choices[0].message.content.strip()
-            except Exception as e:
-                return f"[Error generating scene: {e}]"
-        return "[Scene generation unavailable - LightRAG not installed]"
+    def generate(self, prompt: str, max_tokens: int = SCENE_MAX_TOKENS) -> str:
+        """
+        Generate once through the shared client (cached, retried).
 
-    def save_run_row(self, act: int, scene: int, title: str, prompt: str, output: str):
+        Raises GenerationError when the call fails permanently or runs out of
+        retries; failures are never returned as text.
+        """
+        # Per spec: we do not fan out one draft per bucket; we blend all buckets then generate once.
+        if not LIGHTRAG_AVAILABLE:
+            raise GenerationError("Scene generation unavailable - LightRAG not installed")
+        model, temperature = GENERATION_MODEL, GENERATION_TEMPERATURE
+        cache_prompt = f"{DEFAULT_SYSTEM_PROMPT}\n\n{prompt}"
+        cached = self.cache.get(model, "chat", cache_prompt, temperature) if self.cache else None
+        if cached is not None:
+            print("  🗃️  Cache hit — reusing previous generation")
+            return cached
+        text = complete(prompt, model=model, temperature=temperature, max_tokens=max_tokens)
+        if not text:
+            raise GenerationError("Empty completion")
+        if self.cache:
+            self.cache.put(model, "chat", cache_prompt, temperature, text)
+        return text
+
+    async def agenerate(self, prompt: str, max_tokens: int = SCENE_MAX_TOKENS) -> str:
+        """Async counterpart of generate() for concurrent drafting (raises GenerationError)."""
+        if not LIGHTRAG_AVAILABLE:
+            raise GenerationError("Scene generation unavailable - LightRAG not installed")
+        model, temperature = GENERATION_MODEL, GENERATION_TEMPERATURE
+        cache_prompt = f"{DEFAULT_SYSTEM_PROMPT}\n\n{prompt}"
+        # The cache is a sqlite file: keep its reads and writes off the event loop
+        cached = None
+        if self.cache:
+            cached = await asyncio.to_thread(self.cache.get, model, "chat", cache_prompt, temperature)
+        if cached is not None:
+            return cached
+        text = await acomplete(prompt, model=model, temperature=temperature, max_tokens=max_tokens)
+        if not text:
+            raise GenerationError("Empty completion")
+        if self.cache:
+            await asyncio.to_thread(self.cache.put, model, "chat", cache_prompt, temperature, text)
+        return text
+
+    def mark_failed(self, act: int, scene: int, error: GenerationError):
+        """Record a scene that could not be generated; nothing is saved as its content."""
+        kind = "transient, retries exhausted" if error.transient else "permanent"
+        print(f"  ❌ Act {act}, Scene {scene} failed ({kind}): {error}")
+        if self.run_state:
+            run_state = self.run_state
+            self.write_queue().submit(
+                lambda conn: run_state.mark_failed(act, scene, "", str(error), commit=False, conn=conn))
+
+    def get_partial_output(self, act: int, scene: int) -> Tuple[Optional[int], str]:
+        """(row id, text) of an interrupted streamed scene in this run, or (None, "")."""
+        self.flush_writes()
         cursor = self.conn.cursor()
         cursor.execute(
             f"""
-            INSERT INTO {self.table_name} (act, scene, scene_title, prompt, output)
-            VALUES (?, ?, ?, ?, ?)
+            SELECT id, output FROM {WRITE_TABLE}
+            WHERE run_id=? AND act=? AND scene=? AND status='partial'
+            ORDER BY id DESC LIMIT 1
             """,
-            (act, scene, title, prompt, output),
+            (self.run_id, act, scene),
         )
-        self.conn.commit()
+        row = cursor.fetchone()
+        return (row["id"], self.blob_store().resolve(row["output"]) or "") if row else (None, "")
 
-    def save_draft_and_final(self, act: int, scene: int, output: str, style_note: str):
+    def has_run_row(self, act: int, scene: int, prompt: str) -> bool:
+        """Whether this run already logged a finished generation for exactly this prompt."""
         cursor = self.conn.cursor()
-        # Draft
         cursor.execute(
+            f"SELECT 1 FROM {WRITE_TABLE} WHERE run_id=? AND act=? AND scene=? AND prompt=? "
+            "AND status='complete' LIMIT 1",
+            (self.run_id, act, scene, self.blob_store().ref(prompt, self.prompt_compiler.prefixes())),
+        )
+        return cursor.fetchone() is not None
+
+    def blob_store(self) -> BlobStore:
+        if self.blobs is None:
+            self.blobs = BlobStore(self.conn)
+        return self.blobs
+
+    def write_queue(self) -> WriteQueue:
+        if self.writes is None:
+            self.writes = get_write_queue(self.conn)
+        return self.writes
+
+    def flush_writes(self):
+        """Wait for queued writes to commit before reading back what they wrote."""
+        if self.writes is not None:
+            self.writes.flush()
+
+    async def aflush_writes(self):
+        """flush_writes() without blocking the event loop (for the concurrent modes)."""
+        if self.writes is not None:
+            await asyncio.to_thread(self.writes.flush)
+
+    def checkpoint_run_row(self, row_id: int, output: str, status: str = "partial"):
+        # Partial text is rewritten every few seconds and stays inline; finished text goes to the blob store
+        blobs = self.blob_store()
+
+        def write(conn: sqlite3.Connection):
+            stored = blobs.put(output, conn=conn) if status == "complete" else output
+            conn.execute(f"UPDATE {WRITE_TABLE} SET output = ?, status = ? WHERE id = ?", (stored, status, row_id))
+
+        self.write_queue().submit(write)
+
+    def generate_streaming(self, prompt: str, act: int, scene: int, title: str,
+                           max_tokens: int = SCENE_MAX_TOKENS) -> Tuple[str, Optional[GenerationError]]:
+        """
+        Stream one scene to the terminal, checkpointing partial text into the run table.
+
+        Returns (text, None) on success or (partial text, error) on failure.
+        A transient failure mid-stream is retried with backoff as a continuation
+        of the text received so far. A scene that still fails keeps its partial
+        row, and the next run of it continues from that text instead of
+        starting over.
+        """
+        if not LIGHTRAG_AVAILABLE:
+            return "", GenerationError("Scene generation unavailable - LightRAG not installed")
+
+        model, temperature = GENERATION_MODEL, GENERATION_TEMPERATURE
+        system = DEFAULT_SYSTEM_PROMPT
+        cache_prompt = f"{system}\n\n{prompt}"
+        row_id, partial = self.get_partial_output(act, scene)
+
+        if not partial:
+            cached = self.cache.get(model, "chat", cache_prompt, temperature) if self.cache else None
+            if cached is not None:
+                print("  🗃️  Cache hit — reusing previous generation")
+                if row_id is None:
+                    self.save_run_row(act, scene, title, prompt, cached)
+                else:
+                    self.checkpoint_run_row(row_id, cached, "complete")
+                return cached, None
+
+        if row_id is None:
+            row_id = self.save_run_row(act, scene, title, prompt, "", status="partial").result()
+        elif partial:
+            print(f"  ⏯️  Continuing from {len(partial)} saved characters")
+
+        text = partial
+        max_retries = retry_settings()["max_retries"]
+        limiter = get_rate_limiter()
+        print("  " + "-" * 56)
+        for attempt in range(max_retries + 1):
+            if text:
+                messages = build_messages(CONTINUE_INSTRUCTION, system, history=[
+                    {"role": "user", "content": prompt},
+                    {"role": "assistant", "content": text},
+                ])
+                budget = max(200, max_tokens - count_tokens(text))
+            else:
+                messages = build_messages(prompt, system)
+                budget = max_tokens
+            last_saved, last_len = time.monotonic(), len(text)
+            reserved, used = estimate_request_tokens(messages, budget), None
+            if limiter:
+                limiter.acquire(reserved)
+            started = time.monotonic()
+            try:
+                stream = get_client().chat.completions.create(
+                    model=model,
+                    messages=messages,
+                    temperature=temperature,
+                    max_tokens=budget,
+                    stream=True,
+                    stream_options={"include_usage": True},
+                )
+                for chunk in stream:
+                    if getattr(chunk, "usage", None):
+                        usage_stats.record(chunk)
+                        used = chunk.usage.total_tokens
+                    if not chunk.choices:
+                        continue
+                    delta = chunk.choices[0].delta.content or ""
+                    if not delta:
+                        continue
+                    text += delta
+                    sys.stdout.write(delta)
+                    sys.stdout.flush()
+                    if (time.monotonic() - last_saved >= STREAM_CHECKPOINT_SECONDS
+                            or len(text) - last_len >= STREAM_CHECKPOINT_CHARS):
+                        self.checkpoint_run_row(row_id, text)
+                        last_saved, last_len = time.monotonic(), len(text)
+                if limiter:
+                    limiter.release(time.monotonic() - started, reserved=reserved, used=used)
+                break
+            except KeyboardInterrupt:
+                if limiter:
+                    limiter.release(time.monotonic() - started, reserved=reserved, cancelled=True)
+                self.checkpoint_run_row(row_id, text)
+                print(f"\n  💾 Saved {len(text)} characters of Act {act}, Scene {scene} before stopping")
+                raise
+            except Exception as e:
+                if limiter:
+                    limiter.release(time.monotonic() - started, rate_limited=is_rate_limited(e))
+                self.checkpoint_run_row(row_id, text)
+                transient = is_transient(e)
+                if not transient or attempt == max_retries:
+                    print(f"\n  ⚠️  Stream stopped after {len(text)} characters: {e}")
+                    return text, GenerationError(f"{type(e).__name__}: {e}", transient, attempt + 1)
+                delay = retry_delay(attempt, e)
+                print(f"\n  🔁 Stream interrupted after {len(text)} characters ({e}); "
+                      f"retry {attempt + 1}/{max_retries} in {delay:.1f}s")
+                time.sleep(delay)
+        print("\n  " + "-" * 56)
+
+        text = text.strip()
+        if not text:
+            return "", GenerationError("Empty completion")
+        self.checkpoint_run_row(row_id, text, "complete")
+        if self.cache:
+            self.cache.put(model, "chat", cache_prompt, temperature, text)
+        return text, None
+
+    def save_run_row(self, act: int, scene: int, title: str, prompt: str, output: str,
+                     status: str = "complete") -> Future:
+        """Queue a run row; the returned future resolves to its row id once committed."""
+        # Prompts are split after their compiled static prefix so the prefix is stored once
+        blobs, prefixes = self.blob_store(), self.prompt_compiler.prefixes()
+
+        def write(conn: sqlite3.Connection) -> int:
+            return conn.execute(
+                f"""
+                INSERT INTO {WRITE_TABLE} (run_id, act, scene, scene_title, prompt, output, status)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                """,
+                (self.run_id, act, scene, title, blobs.put(prompt, prefixes, conn=conn),
+                 blobs.put(output, conn=conn) if status == "complete" else output, status),
+            ).lastrowid
+
+        return self.write_queue().submit(write)
+
+    def save_draft(self, act: int, scene: int, text: str, version: int = 1, status: str = "draft",
+                   conn: Optional[sqlite3.Connection] = None):
+        """Queue a draft, or write it through `conn` as part of the caller's queued write."""
+        if conn is None:
+            self.write_queue().submit(lambda c: self.save_draft(act, scene, text, version, status, conn=c))
+            return
+        conn.execute(
             """
             INSERT INTO scene_drafts (act, scene, draft_id, draft_text, version, status, created_at)
-            VALUES (?, ?, ?, ?, ?, 'draft', CURRENT_TIMESTAMP)
+            VALUES (?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
             """,
             (
                 act,
                 scene,
-                f"write_v1_{datetime.now().strftime('%Y%m%d_%H%M%S')}",
-                output,
-                1,
+                f"write_v{version}_{datetime.now().strftime('%Y%m%d_%H%M%S')}",
+                text,
+                version,
+                status,
             ),
         )
-        # Finalized
-        cursor.execute(
-            """
-            INSERT OR REPLACE INTO finalized_scenes (act, scene, final_text, notes, created_at)
-            VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)
-            """,
-            (act, scene, output, style_note),
-        )
-        self.conn.commit()
+
+    def save_draft_and_final(self, act: int, scene: int, output: str, style_note: str, prev_text: str,
+                             version: int = 1, status: str = "draft"):
+        """
+        Queue the draft, finalized scene, dependency record and checkpoint as one transaction.
+
+        `prev_text` is the previous-scene text (or stand-in) the scene was actually written from.
+        """
+        # Inputs are hashed now; the rows are written by the queue in one transaction
+        inputs = self.current_scene_inputs(act, scene, prev_text)
+
+        def write(conn: sqlite3.Connection):
+            self.save_draft(act, scene, output, version=version, status=status, conn=conn)
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO finalized_scenes (act, scene, final_text, notes, created_at)
+                VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)
+                """,
+                (act, scene, output, style_note),
+            )
+            # Dependency record and checkpoint in the same transaction as the finalized scene
+            if inputs:
+                self.scene_graph.record(act, scene, inputs, brainstorm_table=self.brainstorm_label(),
+                                        run_table=run_label("write", self.run_id), commit=False, conn=conn)
+            if self.run_state:
+                self.run_state.mark_done(act, scene, commit=False, conn=conn)
+
+        self.write_queue().submit(write)
+
+    # -----------------
+    # Scene dependencies
+    # -----------------
+    def scene_inputs(self, scene: Dict, prev_text: Optional[str] = None) -> Dict[str, str]:
+        """
+        Hashes of everything a scene is written from, as it stands now.
+
+        `prev_text` is the previous-scene text the scene was written from;
+        by default, the previous scene's current finalized text.
+        """
+        act, scene_num = scene["act"], scene["scene"]
+        characters = self.run_characters
+        profiles = [self.format_character(c) for c in characters if self.is_core_character(c)]
+        profiles += [self.format_character(characters[i]) for i in self.scene_cast.get((act, scene_num), [])]
+        return {
+            "outline_hash": hash_outline(scene),
+            "brainstorm_hash": hash_text(
+                "\x00".join(f"{b}\x00{t}" for b, t in sorted(self.brainstorm_index.get((act, scene_num), {}).items()))
+            ),
+            "characters_hash": hash_characters(profiles),
+            "prev_hash": hash_text(self.get_prev_scene_text(act, scene_num) if prev_text is None else prev_text),
+        }
+
+    def current_scene_inputs(self, act: int, scene: int, prev_text: str) -> Optional[Dict[str, str]]:
+        """Inputs to record for a scene being finalized (None when dependencies are not tracked)."""
+        if not self.scene_graph or (act, scene) not in self.run_scenes:
+            return None
+        return self.scene_inputs(self.run_scenes[(act, scene)], prev_text)
 
     # -------
     # Export
     # -------
     def export_full_script(self, scenes: List[Dict], metadata: Dict[str, str]):
+        self.flush_writes()
         cursor = self.conn.cursor()
         cursor.execute("SELECT act, scene, final_text FROM finalized_scenes ORDER BY act, scene")
         rows = cursor.fetchall()
@@ -657,103 +1145,867 @@ TASK
     # ----
     # Run
     # ----
-    def run(self):
+    def style_note(self) -> str:
+        return f"Generated with {self.style} style, {self.tone} tone, {self.format} format; Golden-Era Romcom tone preset"
+
+    def prepare_run(self) -> Optional[Tuple[Dict[str, str], List[Dict], List[Dict], Optional[int]]]:
+        """Load metadata, cast, outline and brainstorm run; None if the run cannot proceed."""
         if not self.conn:
             print("❌ No database connection")
-            return
+            return None
 
+        self.ensure_support_tables()
+        ensure_run_tables(self.conn)
+        self.prompt_compiler = PromptCompiler("scene")
         metadata = self.get_project_metadata()
         characters = self.fetch_characters()
         scenes = self.fetch_scenes()
         if not scenes:
             print("❌ No scenes found in story outline. Run 'python3 intake.py' first to add scenes.")
-            return
+            return None
 
-        brainstorm_table = self.get_latest_brainstorm_table()
-        if self.require_brainstorm and not brainstorm_table:
-            print("❌ Required brainstorming table not found. Run 'python3 brainstorm.py' first.")
-            return
+        self.scene_cast = self.match_scene_characters(characters, scenes)
+        self.scene_graph = SceneGraph(self.conn)
+        self.blob_store()  # create the blobs table now, not from inside a concurrent pass
+        self.run_characters = characters
+        self.run_scenes = {(s["act"], s["scene"]): s for s in scenes}
+
+        brainstorm_run = self.get_latest_brainstorm_run()
+        if brainstorm_run:
+            self.load_brainstorm_index(brainstorm_run)
+            self.load_digests(scenes)
+        if self.require_brainstorm and not brainstorm_run:
+            print("❌ Required brainstorming run not found. Run 'python3 brainstorm.py' first.")
+            return None
 
         if self.require_brainstorm:
             try:
-                self.verify_brainstorm_coverage(brainstorm_table, scenes)  # raises on missing
+                self.verify_brainstorm_coverage(brainstorm_run, scenes)  # raises on missing
             except RuntimeError as e:
                 print(str(e))
-                return
-            print(f"📚 Using brainstorming context from: {brainstorm_table}")
+                return None
+            print(f"📚 Using brainstorming context from: {run_label('brainstorm', brainstorm_run)}")
         else:
-            if brainstorm_table:
-                print(f"📚 Using brainstorming context from: {brainstorm_table}")
+            if brainstorm_run:
+                print(f"📚 Using brainstorming context from: {run_label('brainstorm', brainstorm_run)}")
             else:
-                print("📚 No brainstorming context table found; proceeding without it.")
+                print("📚 No brainstorming run found; proceeding without it.")
+
+        return metadata, characters, scenes, brainstorm_run
+
+    def completed_scenes(self, scenes: List[Dict]) -> set:
+        """(act, scene) pairs this run already finalized (for --resume)."""
+        done = set()
+        if self.run_state:
+            self.run_state.set_total(len(scenes))
+            done = {(a, s) for a, s, _ in self.run_state.done_units()}
+            if done:
+                print(f"⏯️  {len(done)} scenes already written in {run_label('write', self.run_id)}; continuing")
+        return done
+
+    def finish_run(self, scenes: List[Dict], metadata: Dict[str, str], written: int, done: set,
+                   total: Optional[int] = None):
+        total = len(scenes) if total is None else total
+        self.flush_writes()
+        missing = total - written - len(done)
+        if self.run_state and missing <= 0:
+            self.run_state.complete()
+        elif missing > 0:
+            print(f"\n⏸️  {missing} scenes are unfinished; continue them with: python3 write.py --resume")
+
+        if written or done:
+            print(f"\n🎉 Writing session complete!")
+            print(f"📊 Wrote {written} of {total} scenes"
+                  + (f" ({len(done)} carried over from the interrupted run)" if done else ""))
+            if self.cache:
+                print(self.cache.report())
+            print(self.prompt_compiler.report())
+            print(usage_stats.report())
+            if get_rate_limiter():
+                print(get_rate_limiter().report())
+            print(self.blob_store().report())
+            if self.writes:
+                print(self.writes.report())
+            print("\n📝 Automatically exporting to Desktop...")
+            self.export_full_script(scenes, metadata)
+        else:
+            print("\n❌ No scenes were successfully written.")
+
+    def compose_scene_prompt(self, metadata: Dict[str, str], characters: List[Dict], scenes: List[Dict],
+                             scene: Dict, brainstorm_run: Optional[int], prev_text: str,
+                             next_desc: Optional[str] = None, story_so_far: str = "",
+                             prev_summary: str = "") -> str:
+        """Gather the per-scene brainstorm, outline snapshot and next-scene context, then build the prompt."""
+        act, scene_num = scene["act"], scene["scene"]
+        # Gather per-scene brainstorm blocks by bucket
+        if (act, scene_num) in self.digests and brainstorm_run == self.brainstorm_index_run:
+            brainstorm_by_bucket = {"digest": self.digests[(act, scene_num)]}
+        else:
+            brainstorm_by_bucket = self.get_brainstorm_by_bucket(brainstorm_run, act, scene_num) if brainstorm_run else {}
+        if next_desc is None:
+            next_desc = self.get_next_scene_outline_desc(act, scene_num)
+        return self.build_prompt(
+            metadata, characters, scene, brainstorm_by_bucket,
+            outline_snapshot=self.make_outline_snapshot(scenes),
+            prev_text=prev_text,
+            next_desc=next_desc,
+            min_words=700, max_words=900,
+            story_so_far=story_so_far,
+            prev_summary=prev_summary,
+        )
+
+    def run(self):
+        prepared = self.prepare_run()
+        if not prepared:
+            return
+        metadata, characters, scenes, brainstorm_run = prepared
 
         print(f"\n🎬 Found {len(scenes)} scenes to write; blending all buckets per scene where available")
         print("=" * 60)
 
+        done = self.completed_scenes(scenes)
+
         written = 0
         for scene in scenes:
             act, scene_num = scene['act'], scene['scene']
-            title = scene.get('scene_title', 'Untitled')
-            print(f"\n✍️  Writing Act {act}, Scene {scene_num}: {title}")
+            if (act, scene_num) in done:
+                continue
+            print(f"\n✍️  Writing Act {act}, Scene {scene_num}: {scene.get('scene_title', 'Untitled')}")
+            if self.write_scene(metadata, characters, scenes, scene, brainstorm_run) is not None:
+                written += 1
+
+        self.finish_run(scenes, metadata, written, done)
+
+    def write_scene(self, metadata: Dict[str, str], characters: List[Dict], scenes: List[Dict],
+                    scene: Dict, brainstorm_run: Optional[int]) -> Optional[str]:
+        """Write and finalize one scene with true previous-scene continuity; None if it failed."""
+        act, scene_num = scene['act'], scene['scene']
+        title = scene.get('scene_title', 'Untitled')
+        prev_raw = self.get_prev_scene_text(act, scene_num)
+        i = scenes.index(scene)
+        prompt = self.compose_scene_prompt(
+            metadata, characters, scenes, scene, brainstorm_run,
+            prev_text=prev_raw,
+            story_so_far=self.story_so_far(scenes, act, scene_num),
+            prev_summary=self.stored_scene_summary(scenes[i - 1], prev_raw) if i > 0 else "",
+        )
 
-            # Gather per-scene brainstorm blocks by bucket
-            brainstorm_by_bucket = self.get_brainstorm_by_bucket(brainstorm_table, act, scene_num) if brainstorm_table else {}
+        if self.stream:
+            output, error = self.generate_streaming(prompt, act, scene_num, title)
+            if error:
+                self.mark_failed(act, scene_num, error)
+                if output:
+                    print(f"  💾 {len(output)} characters kept; --resume continues from them")
+                return None
+        else:
+            try:
+                output = self.generate(prompt)
+            except GenerationError as e:
+                self.mark_failed(act, scene_num, e)
+                return None
+            self.save_run_row(act, scene_num, title, prompt, output)
+        self.save_draft_and_final(act, scene_num, output, style_note=self.style_note(), prev_text=prev_raw)
+        self.ensure_scene_summary(act, scene_num, output)
+        print(f"  ✅ Done Act {act}, Scene {scene_num} ({len(output)} characters)")
+        return output
+
+    # ----------------------------------------
+    # Dirty mode: rewrite only stale scenes
+    # ----------------------------------------
+    def run_dirty(self):
+        """
+        Rewrite only the scenes whose recorded inputs changed (see scene_graph.py).
+
+        A scene is stale when it was never written or its outline row,
+        brainstorm, characters or previous-scene text differ from what it
+        was written from. Rewriting a scene changes its successor's
+        previous-scene input; that propagates at most dirty_depth scenes
+        past each directly stale one, and stops early wherever a rewrite
+        leaves the text unchanged. The scene just past the limit is kept
+        as written and takes the new previous scene as its baseline, so
+        the change does not keep spreading on later runs.
+        """
+        prepared = self.prepare_run()
+        if not prepared:
+            return
+        metadata, characters, scenes, brainstorm_run = prepared
 
-            prev_raw = self.get_prev_scene_text(act, scene_num)
-            prev = self.summarize_prev_if_long(prev_raw)
-            outline_snap = self.make_outline_snapshot(scenes, act, scene_num)
-            next_desc = self.get_next_scene_outline_desc(act, scene_num)
+        print(f"\n🧹 Dirty mode: checking {len(scenes)} scenes for changed inputs "
+              f"(propagating up to {self.dirty_depth} scene(s) past each change)")
+        print("=" * 60)
 
-            prompt = self.build_prompt(
-                metadata, characters, scene, brainstorm_by_bucket,
-                outline_snapshot=outline_snap,
-                prev_text=prev,
-                next_desc=next_desc,
-                min_words=700, max_words=900,
-            )
+        hops: Dict[Tuple[int, int], int] = {}  # scenes rewritten this run -> distance from a direct change
+        baseline, attempted, written, kept = 0, 0, 0, []
+        for i, scene in enumerate(scenes):
+            key = (scene["act"], scene["scene"])
+            final_text = self.get_final_text(*key)
+            current = self.scene_inputs(scene)
+            recorded = self.scene_graph.get(*key)
+            if not final_text:
+                reasons = ["not written yet"]
+            elif recorded is None:
+                # Finalized before dependencies were tracked: take the current inputs as its baseline
+                brainstorm_table = self.brainstorm_label()
+                self.write_queue().submit(lambda c, key=key, current=current: self.scene_graph.record(
+                    *key, current, brainstorm_table=brainstorm_table, run_table=None, commit=False, conn=c))
+                baseline += 1
+                continue
+            else:
+                reasons = self.scene_graph.changed(recorded, current)
+            if not reasons:
+                continue
+
+            prev_key = (scenes[i - 1]["act"], scenes[i - 1]["scene"]) if i else None
+            if reasons == [PREV_CHANGED] and prev_key in hops:
+                distance = hops[prev_key] + 1
+                if distance > self.dirty_depth:
+                    # Beyond --depth: keep the scene and accept its new predecessor, ending the chain here
+                    self.write_queue().submit(lambda c, key=key, prev_hash=current["prev_hash"]:
+                                              self.scene_graph.accept_prev(*key, prev_hash, commit=False, conn=c))
+                    kept.append(key)
+                    continue
+            else:
+                distance = 0
+
+            print(f"\n♻️  Rewriting Act {key[0]}, Scene {key[1]}: {scene.get('scene_title', 'Untitled')} "
+                  f"({', '.join(reasons)})")
+            attempted += 1
+            output = self.write_scene(metadata, characters, scenes, scene, brainstorm_run)
+            if output is None:
+                continue
+            written += 1
+            if hash_text(output) != hash_text(final_text):
+                hops[key] = distance
+
+        if baseline:
+            print(f"\n📌 Recorded current inputs for {baseline} scenes written before dependency tracking")
+        for act, scene_num in kept:
+            print(f"⏭️  Act {act}, Scene {scene_num} follows a rewritten scene beyond --depth {self.dirty_depth}; "
+                  "kept as written (rewrite it with a larger --depth if the seam needs it)")
+        if not attempted:
+            self.flush_writes()
+            print("\n✅ Every scene is up to date; nothing to rewrite.")
+            if self.run_state:
+                self.run_state.complete()
+            return
+        self.finish_run(scenes, metadata, written, set(), total=attempted)
+
+    # -----------------------------
+    # Fast mode: speculative drafts
+    # -----------------------------
+    def run_fast(self):
+        """
+        Speculative parallel drafting.
+
+        Pass 1 drafts every scene concurrently with outline-only continuity
+        (previous and next outline descriptions instead of the previous
+        scene's final text). Pass 2 is a bounded repair pass that rewrites
+        only the opening of each scene so it flows from its neighbour's
+        draft. Both passes are stored in scene_drafts (v1 speculative,
+        v2 repaired); the repaired text is finalized.
+        """
+        prepared = self.prepare_run()
+        if not prepared:
+            return
+        metadata, characters, scenes, brainstorm_run = prepared
 
-            output = self.generate(prompt)
-            self.save_run_row(act, scene_num, title, prompt, output)
-            self.save_draft_and_final(
-                act, scene_num, output,
-                style_note=f"Generated with {self.style} style, {self.tone} tone, {self.format} format; Golden-Era Romcom tone preset",
-            )
+        print(f"\n⚡ Fast mode: drafting {len(scenes)} scenes in parallel "
+              f"(up to {self.max_concurrency} at once), then repairing transitions")
+        print("=" * 60)
+
+        done = self.completed_scenes(scenes)
+        started = time.perf_counter()
+        written = asyncio.run(self._run_fast_async(metadata, characters, scenes, brainstorm_run, done))
+        asyncio.run(self.asummarize_finalized(scenes))
+        print(f"\n⏱️  Fast mode wall-clock: {time.perf_counter() - started:.1f}s")
+        self.finish_run(scenes, metadata, written, done)
+
+    async def _run_fast_async(self, metadata: Dict[str, str], characters: List[Dict], scenes: List[Dict],
+                              brainstorm_run: Optional[int], done: set) -> int:
+        limit = asyncio.Semaphore(self.max_concurrency)
+        todo = [i for i, s in enumerate(scenes) if (s["act"], s["scene"]) not in done]
+        await self.aflush_writes()
+        story_lines = self.planned_story_lines(scenes, done, flush=False)
+
+        # Pass 1: speculative drafts with outline-only continuity
+        async def draft(i: int) -> Tuple[str, str]:
+            act, scene_num = scenes[i]["act"], scenes[i]["scene"]
+            prompt = self.speculative_prompt(metadata, characters, scenes, i, brainstorm_run, story_lines)
+            async with limit:
+                try:
+                    output = await self.agenerate(prompt)
+                except GenerationError as e:
+                    self.mark_failed(act, scene_num, e)
+                    return prompt, None
+            print(f"  📝 Drafted Act {act}, Scene {scene_num} ({len(output)} characters)")
+            return prompt, output
+
+        results = await asyncio.gather(*(draft(i) for i in todo))
+        drafts: Dict[int, str] = {i: out for i, (_, out) in zip(todo, results) if out is not None}
+        for i, (prompt, output) in zip(todo, results):
+            if output is None:
+                continue
+            s = scenes[i]
+            self.save_run_row(s["act"], s["scene"], s.get("scene_title", "Untitled"), prompt, output)
+            self.save_draft(s["act"], s["scene"], output, version=1, status="speculative")
+        todo = [i for i in todo if i in drafts]
+        # Flush once off the event loop; the reads below then skip their own (blocking) flush
+        await self.aflush_writes()
+
+        # Neighbouring text for the repair pass: this run's draft, or an already-finalized scene
+        def neighbour_text(i: int) -> str:
+            if i in drafts:
+                return drafts[i]
+            return self.get_final_text(scenes[i]["act"], scenes[i]["scene"], flush=False) or ""
+
+        # Pass 2: bounded transition repair (openings only); also returns the neighbour text it saw
+        async def repair(i: int) -> Tuple[str, str, Optional[str]]:
+            draft_text = drafts[i]
+            prev_text = neighbour_text(i - 1) if i > 0 else ""
+            request = self.repair_request(scenes[i], draft_text, prev_text)
+            if not request:
+                return "", draft_text, None
+            prompt, rest = request
+            async with limit:
+                try:
+                    revised = await self.agenerate(prompt, max_tokens=REPAIR_MAX_TOKENS)
+                except GenerationError as e:
+                    print(f"  ⚠️  Transition repair skipped for Act {scenes[i]['act']}, Scene {scenes[i]['scene']}: {e}")
+                    return "", draft_text, None
+            return prompt, self.apply_repair(draft_text, revised, rest), prev_text
+
+        repaired = await asyncio.gather(*(repair(i) for i in todo))
+        finals: Dict[int, str] = {}
+        written = 0
+        for i, (prompt, final_text, seen) in zip(todo, repaired):
+            s = scenes[i]
+            act, scene_num = s["act"], s["scene"]
+            if prompt:
+                self.save_run_row(act, scene_num, f"{s.get('scene_title', 'Untitled')} (transition repair)",
+                                  prompt, final_text)
+            prev_final = finals[i - 1] if i - 1 in finals else neighbour_text(i - 1) if i > 0 else ""
+            self.save_draft_and_final(act, scene_num, final_text, style_note=self.style_note() + "; fast mode",
+                                      prev_text=self.repaired_prev_text(scenes, i, seen, prev_final),
+                                      version=2, status="repaired")
+            finals[i] = final_text
             written += 1
-            print(f"  ✅ Done Act {act}, Scene {scene_num} ({len(output)} characters)")
+            print(f"  ✅ Finalized Act {act}, Scene {scene_num}"
+                  + (" (transition repaired)" if final_text != drafts[i] else ""))
+        return written
+
+    # ----------------------------------
+    # Batch mode: provider batch jobs
+    # ----------------------------------
+    @staticmethod
+    def batch_id(scene: Dict) -> str:
+        return f"act{scene['act']}-scene{scene['scene']}"
+
+    def generate_batch(self, runner: BatchRunner, kind: str, prompts: Dict[str, str],
+                       max_tokens: int = SCENE_MAX_TOKENS) -> Dict[str, object]:
+        """
+        Answer custom_id -> prompt through one batch job.
+
+        Returns custom_id -> text or GenerationError. Cached generations
+        are reused and never submitted; new ones are added to the cache.
+        """
+        model, temperature = GENERATION_MODEL, GENERATION_TEMPERATURE
+        results: Dict[str, object] = {}
+        requests = []
+        for custom_id, prompt in prompts.items():
+            cache_prompt = f"{DEFAULT_SYSTEM_PROMPT}\n\n{prompt}"
+            cached = self.cache.get(model, "chat", cache_prompt, temperature) if self.cache else None
+            if cached is not None:
+                results[custom_id] = cached
+            else:
+                requests.append(build_request(custom_id, build_messages(prompt), model, temperature, max_tokens))
+        if results:
+            print(f"🗃️  {len(results)} {kind} served from the response cache")
+        for custom_id, result in runner.run(run_label("write", self.run_id), kind, requests).items():
+            results[custom_id] = result
+            if self.cache and isinstance(result, str):
+                self.cache.put(model, "chat", f"{DEFAULT_SYSTEM_PROMPT}\n\n{prompts[custom_id]}", temperature, result)
+        return results
+
+    def run_batch(self):
+        """
+        Overnight run through the provider batch API (see batch.py).
+
+        Same two passes as fast mode — outline-continuity drafts, then
+        transition repairs of each opening — but each pass is submitted
+        as one batch job and ingested when it completes. An interrupted
+        run picks its submitted job back up on --resume.
+        """
+        prepared = self.prepare_run()
+        if not prepared:
+            return
+        metadata, characters, scenes, brainstorm_run = prepared
 
-        if written:
-            print(f"\n🎉 Writing session complete!")
-            print(f"📊 Wrote {written} of {len(scenes)} scenes")
-            print("\n📝 Automatically exporting to Desktop...")
-            self.export_full_script(scenes, metadata)
-        else:
-            print("\n❌ No scenes were successfully written.")
+        print(f"\n📦 Batch mode: {len(scenes)} scenes as two batch jobs (drafts, then transition repairs)")
+        print("=" * 60)
+
+        done = self.completed_scenes(scenes)
+        runner = BatchRunner(self.conn, self.base_dir / self.project_name / "batches")
+        todo = [i for i, s in enumerate(scenes) if (s["act"], s["scene"]) not in done]
+
+        # Pass 1: speculative drafts with outline-only continuity
+        story_lines = self.planned_story_lines(scenes, done)
+        prompts = {i: self.speculative_prompt(metadata, characters, scenes, i, brainstorm_run, story_lines)
+                   for i in todo}
+        results = self.generate_batch(runner, "drafts", {self.batch_id(scenes[i]): p for i, p in prompts.items()})
+        drafts: Dict[int, str] = {}
+        for i in todo:
+            s = scenes[i]
+            act, scene_num = s["act"], s["scene"]
+            result = results[self.batch_id(s)]
+            if isinstance(result, GenerationError):
+                self.mark_failed(act, scene_num, result)
+                continue
+            drafts[i] = result
+            if not self.has_run_row(act, scene_num, prompts[i]):
+                self.save_run_row(act, scene_num, s.get("scene_title", "Untitled"), prompts[i], result)
+                self.save_draft(act, scene_num, result, version=1, status="speculative")
+        todo = [i for i in todo if i in drafts]
+
+        # Pass 2: transition repairs against the neighbouring draft (or finalized scene)
+        repairs: Dict[int, Tuple[str, str]] = {}
+        seen: Dict[int, str] = {}  # neighbour text each repair is made against
+        for i in todo:
+            if i == 0:
+                continue
+            prev_text = drafts.get(i - 1) or self.get_final_text(scenes[i - 1]["act"], scenes[i - 1]["scene"]) or ""
+            request = self.repair_request(scenes[i], drafts[i], prev_text)
+            if request:
+                repairs[i] = request
+                seen[i] = prev_text
+        results = self.generate_batch(
+            runner, "repairs", {self.batch_id(scenes[i]): prompt for i, (prompt, _) in repairs.items()},
+            max_tokens=REPAIR_MAX_TOKENS,
+        )
+
+        finals: Dict[int, str] = {}
+        written = 0
+        for i in todo:
+            s = scenes[i]
+            act, scene_num = s["act"], s["scene"]
+            final_text = drafts[i]
+            if i in repairs:
+                prompt, rest = repairs[i]
+                result = results[self.batch_id(s)]
+                if isinstance(result, GenerationError):
+                    print(f"  ⚠️  Transition repair skipped for Act {act}, Scene {scene_num}: {result}")
+                    seen.pop(i)
+                else:
+                    final_text = self.apply_repair(drafts[i], result, rest)
+                    self.save_run_row(act, scene_num, f"{s.get('scene_title', 'Untitled')} (transition repair)",
+                                      prompt, final_text)
+            prev_final = finals[i - 1] if i - 1 in finals else (
+                self.get_final_text(scenes[i - 1]["act"], scenes[i - 1]["scene"]) if i > 0 else "")
+            self.save_draft_and_final(act, scene_num, final_text, style_note=self.style_note() + "; batch mode",
+                                      prev_text=self.repaired_prev_text(scenes, i, seen.get(i), prev_final),
+                                      version=2, status="repaired")
+            finals[i] = final_text
+            written += 1
+            print(f"  ✅ Finalized Act {act}, Scene {scene_num}"
+                  + (" (transition repaired)" if final_text != drafts[i] else ""))
+
+        asyncio.run(self.asummarize_finalized(scenes))
+        self.finish_run(scenes, metadata, written, done)
+
+    # ---------------------------------------
+    # Act-parallel mode: one chain per act
+    # ---------------------------------------
+    def run_acts(self):
+        """
+        Write each act as its own sequential chain, with all acts running concurrently.
+
+        Inside an act, every scene sees the previous scene's text exactly as
+        in run(). The first scene of Act N (N > 1) starts from a short
+        generated bridge summarizing where Act N-1 ends in the outline, so
+        the only seams are at act boundaries.
+        """
+        prepared = self.prepare_run()
+        if not prepared:
+            return
+        metadata, characters, scenes, brainstorm_run = prepared
+
+        acts: Dict[int, List[Dict]] = {}
+        for scene in scenes:
+            acts.setdefault(scene["act"], []).append(scene)
+
+        print(f"\n🎭 Act-parallel mode: {len(acts)} acts written concurrently "
+              f"({', '.join(f'Act {a}: {len(v)} scenes' for a, v in acts.items())})")
+        print("=" * 60)
+
+        done = self.completed_scenes(scenes)
+        started = time.perf_counter()
+        written = asyncio.run(self._run_acts_async(metadata, characters, scenes, acts, brainstorm_run, done))
+        asyncio.run(self.asummarize_finalized(scenes))
+        print(f"\n⏱️  Act-parallel wall-clock: {time.perf_counter() - started:.1f}s")
+
+        seams = [f"Act {a - 1} → Act {a}" for a in list(acts)[1:]]
+        if seams:
+            print(f"🔎 Seams to review: {', '.join(seams)}")
+        self.finish_run(scenes, metadata, written, done)
+
+    async def _run_acts_async(self, metadata: Dict[str, str], characters: List[Dict], scenes: List[Dict],
+                              acts: Dict[int, List[Dict]], brainstorm_run: Optional[int], done: set) -> int:
+        act_numbers = list(acts)
+        # Scenes carried over from earlier runs are read without flushing inside the chains
+        await self.aflush_writes()
+
+        async def chain(act: int) -> int:
+            act_scenes = acts[act]
+            idx = act_numbers.index(act)
+            prev_text = ""
+            # Act-local story memory: the bridge, then a summary of each scene this chain has passed
+            memory: List[str] = []
+            passed: List[Tuple[int, str]] = []
+            if idx > 0:
+                prev_act = act_numbers[idx - 1]
+                bridge_prompt = self.build_bridge_prompt(prev_act, acts[prev_act])
+                try:
+                    bridge = await self.agenerate(bridge_prompt, max_tokens=300)
+                    self.save_run_row(act, 0, f"Act {act} bridge", bridge_prompt, bridge)
+                    prev_text = f"(End of Act {prev_act} — bridge summary:)\n{bridge}"
+                    memory.append(f"[End of Act {prev_act}] {bridge}")
+                    print(f"  🌉 Bridge into Act {act} ready")
+                except GenerationError as e:
+                    # Fall back to the raw outline of the previous act's last scene
+                    prev_text = f"(End of Act {prev_act} — OUTLINE:)\n{self.describe_outline(acts[prev_act][-1])}"
+                    print(f"  ⚠️  Bridge into Act {act} failed ({e}); using the outline instead")
+
+            count = 0
+            for scene in act_scenes:
+                act_num, scene_num = scene["act"], scene["scene"]
+                if (act_num, scene_num) in done:
+                    text = self.get_final_text(act_num, scene_num, flush=False)
+                    if text:
+                        prev_text = text
+                        passed.append((scene_num, await self.aensure_scene_summary(act_num, scene_num, text)))
+                    continue
+                # The previous scene goes in as text; the ones before it as summaries
+                earlier = [f"[Act {act_num}, Scene {n}] {summary}" for n, summary in passed[:-1] if summary]
+                prompt = self.compose_scene_prompt(
+                    metadata, characters, scenes, scene, brainstorm_run,
+                    prev_text=prev_text,
+                    story_so_far="\n".join(memory + earlier[-MAX_SCENE_SUMMARIES_IN_PROMPT:]),
+                    prev_summary=passed[-1][1] if passed else "",
+                )
+                try:
+                    output = await self.agenerate(prompt)
+                except GenerationError as e:
+                    self.mark_failed(act_num, scene_num, e)
+                    continue
+                self.save_run_row(act_num, scene_num, scene.get("scene_title", "Untitled"), prompt, output)
+                self.save_draft_and_final(act_num, scene_num, output, prev_text=prev_text,
+                                          style_note=self.style_note() + "; act-parallel mode")
+                prev_text = output
+                count += 1
+                print(f"  ✅ Done Act {act_num}, Scene {scene_num} ({len(output)} characters)")
+                passed.append((scene_num, await self.aensure_scene_summary(act_num, scene_num, output)))
+            return count
+
+        return sum(await asyncio.gather(*(chain(a) for a in act_numbers)))
+
+    def build_bridge_prompt(self, prev_act: int, prev_act_scenes: List[Dict], tail: int = 3) -> str:
+        outline = "\n\n".join(
+            f"Scene {s['scene']}:\n{self.describe_outline(s)}" for s in prev_act_scenes[-tail:]
+        )
+        return f"""
+ACT BRIDGE
+Using only the outline below, summarize in 4-6 sentences where the story stands at the very end
+of Act {prev_act}: each lead's emotional state, where they physically are, the state of the
+relationship, and the open threads the next act must pick up. Present tense, no headings.
+
+FINAL SCENES OF ACT {prev_act} (outline)
+{outline}
+""".strip()
+
+    # ------------------------------
+    # Story-so-far memory
+    # ------------------------------
+    @staticmethod
+    def text_hash(text: str) -> str:
+        return hashlib.sha256((text or "").encode("utf-8")).hexdigest()
+
+    def build_summary_prompt(self, act: int, scene: int, text: str) -> str:
+        return f"""
+Summarize Act {act}, Scene {scene} below in 2-3 sentences for a writer's continuity notes:
+what happens, how each lead's feelings shift, and any promise, object or line that must pay off later.
+Use character names exactly as written. No preamble.
+
+SCENE
+{text}
+""".strip()
+
+    def _stored_summary(self, table: str, where: str, args: tuple, flush: bool = True) -> Optional[sqlite3.Row]:
+        if flush:
+            self.flush_writes()
+        cursor = self.conn.cursor()
+        cursor.execute(f"SELECT source_hash, summary FROM {table} WHERE {where}", args)
+        return cursor.fetchone()
+
+    def save_scene_summary(self, act: int, scene: int, source_hash: str, summary: str):
+        self.write_queue().execute(
+            """
+            INSERT OR REPLACE INTO scene_summaries (act, scene, source_hash, summary, created_at)
+            VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)
+            """,
+            (act, scene, source_hash, summary),
+        )
+
+    def stored_scene_summary(self, scene: Dict, text: str, flush: bool = True) -> str:
+        """A scene's stored summary if it was made from exactly this text, else ""."""
+        if not text:
+            return ""
+        row = self._stored_summary("scene_summaries", "act=? AND scene=?", (scene["act"], scene["scene"]), flush)
+        return row["summary"] if row and row["source_hash"] == self.text_hash(text) else ""
+
+    def ensure_scene_summary(self, act: int, scene: int, text: str) -> str:
+        """Summarize a finalized scene once; reuse the stored summary while the text is unchanged."""
+        if not text:
+            return ""
+        source_hash = self.text_hash(text)
+        row = self._stored_summary("scene_summaries", "act=? AND scene=?", (act, scene))
+        if row and row["source_hash"] == source_hash:
+            return row["summary"]
+        try:
+            summary = self.generate(self.build_summary_prompt(act, scene, text), max_tokens=SUMMARY_MAX_TOKENS)
+        except GenerationError as e:
+            print(f"  ⚠️  Summary for Act {act}, Scene {scene} skipped: {e}")
+            return ""
+        self.save_scene_summary(act, scene, source_hash, summary)
+        return summary
+
+    async def aensure_scene_summary(self, act: int, scene: int, text: str) -> str:
+        """
+        Async ensure_scene_summary for the concurrent passes.
+
+        Reads without flushing: callers flush off the event loop first.
+        """
+        if not text:
+            return ""
+        source_hash = self.text_hash(text)
+        row = self._stored_summary("scene_summaries", "act=? AND scene=?", (act, scene), flush=False)
+        if row and row["source_hash"] == source_hash:
+            return row["summary"]
+        try:
+            summary = await self.agenerate(self.build_summary_prompt(act, scene, text), max_tokens=SUMMARY_MAX_TOKENS)
+        except GenerationError as e:
+            print(f"  ⚠️  Summary for Act {act}, Scene {scene} skipped: {e}")
+            return ""
+        self.save_scene_summary(act, scene, source_hash, summary)
+        return summary
+
+    async def asummarize_finalized(self, scenes: List[Dict]):
+        """Backfill scene summaries concurrently after a parallel pass."""
+        limit = asyncio.Semaphore(self.max_concurrency)
+        await self.aflush_writes()
+
+        async def one(scene: Dict):
+            text = self.get_final_text(scene["act"], scene["scene"], flush=False)
+            async with limit:
+                await self.aensure_scene_summary(scene["act"], scene["scene"], text)
+
+        await asyncio.gather(*(one(s) for s in scenes))
+
+    def ensure_act_summary(self, act: int, act_scenes: List[Dict]) -> str:
+        """Roll an act's scene summaries up into one paragraph, recomputed only when they change."""
+        parts: List[str] = []
+        for s in act_scenes:
+            text = self.get_final_text(s["act"], s["scene"])
+            summary = self.ensure_scene_summary(s["act"], s["scene"], text) if text else ""
+            if summary:
+                parts.append(f"Scene {s['scene']}: {summary}")
+        if not parts:
+            return ""
+        joined = "\n".join(parts)
+        source_hash = self.text_hash(joined)
+        row = self._stored_summary("act_summaries", "act=?", (act,))
+        if row and row["source_hash"] == source_hash:
+            return row["summary"]
+        try:
+            summary = self.generate(
+                f"Condense these scene summaries of Act {act} into one paragraph of at most 6 sentences, "
+                f"keeping every open thread and emotional turn. No preamble.\n\n{joined}",
+                max_tokens=SUMMARY_MAX_TOKENS * 2,
+            )
+        except GenerationError:
+            return joined
+        self.write_queue().execute(
+            """
+            INSERT OR REPLACE INTO act_summaries (act, source_hash, summary, created_at)
+            VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+            """,
+            (act, source_hash, summary),
+        )
+        return summary
+
+    def story_so_far(self, scenes: List[Dict], current_act: int, current_scene: int) -> str:
+        """
+        Hierarchical memory for a scene prompt: one summary per earlier act, then
+        summaries of the earlier scenes in this act (the immediately previous
+        scene is passed as text separately). Bounded by MAX_SCENE_SUMMARIES_IN_PROMPT;
+        when that is still over the section's token budget, this act's scene
+        summaries are rolled up into one paragraph instead of cutting the oldest.
+        """
+        earlier_acts: Dict[int, List[Dict]] = {}
+        this_act: List[Dict] = []
+        for s in scenes:
+            if s["act"] < current_act:
+                earlier_acts.setdefault(s["act"], []).append(s)
+            elif s["act"] == current_act and s["scene"] < current_scene - 1:
+                this_act.append(s)
+
+        lines: List[str] = []
+        for act, act_scenes in earlier_acts.items():
+            summary = self.ensure_act_summary(act, act_scenes)
+            if summary:
+                lines.append(f"[Act {act}] {summary}")
+        scene_lines: List[str] = []
+        for s in this_act[-MAX_SCENE_SUMMARIES_IN_PROMPT:]:
+            row = self._stored_summary("scene_summaries", "act=? AND scene=?", (s["act"], s["scene"]))
+            if row:
+                scene_lines.append(f"[Act {s['act']}, Scene {s['scene']}] {row['summary']}")
+        if len(scene_lines) > 1 and count_tokens("\n".join(lines + scene_lines)) > SECTION_TOKEN_BUDGETS["story_so_far"]:
+            rolled = self.ensure_act_summary(current_act, this_act)
+            if rolled:
+                scene_lines = [f"[Act {current_act} so far] {rolled}"]
+        return "\n".join(lines + scene_lines)
+
+    def planned_story_lines(self, scenes: List[Dict], done: set, flush: bool = True) -> List[str]:
+        """
+        One story-so-far line per scene for passes that draft scenes in parallel.
+
+        A scene finished in an earlier run contributes the stored summary of its
+        final text; one drafted in this pass contributes its planned key events.
+        """
+        lines: List[str] = []
+        for s in scenes:
+            key = (s["act"], s["scene"])
+            summary = ""
+            if key in done:
+                summary = self.stored_scene_summary(s, self.get_final_text(*key, flush=flush), flush=flush)
+            if summary:
+                lines.append(f"[Act {key[0]}, Scene {key[1]}] {summary}")
+            else:
+                planned = s.get("key_events") or s.get("scene_purpose") or s.get("scene_title") or ""
+                lines.append(f"[Act {key[0]}, Scene {key[1]}] (planned) {planned}".rstrip())
+        return lines
+
+    def speculative_prompt(self, metadata: Dict[str, str], characters: List[Dict], scenes: List[Dict],
+                           i: int, brainstorm_run: Optional[int], story_lines: List[str]) -> str:
+        """
+        Scene prompt with outline-only continuity (previous and next scene outlines),
+        plus the story so far up to the scene before the previous one.
+        """
+        next_outline = self.describe_outline(scenes[i + 1]) if i + 1 < len(scenes) else ""
+        return self.compose_scene_prompt(
+            metadata, characters, scenes, scenes[i], brainstorm_run,
+            prev_text=self.outline_prev_text(scenes, i) or "(No previous scene available.)",
+            next_desc=next_outline,
+            story_so_far="\n".join(story_lines[:max(0, i - 1)]),
+        )
+
+    def outline_prev_text(self, scenes: List[Dict], i: int) -> str:
+        """Outline-only stand-in for the previous scene's text ("" when there is no previous scene)."""
+        prev_outline = self.describe_outline(scenes[i - 1]) if i > 0 else ""
+        if not prev_outline:
+            return ""
+        return "(Previous scene is being drafted in parallel — continue from its OUTLINE:)\n" + prev_outline
+
+    def repaired_prev_text(self, scenes: List[Dict], i: int, seen: Optional[str], prev_final: str) -> str:
+        """
+        Previous-scene text a drafted-then-repaired scene was written from.
+
+        Without a repair it only saw the outline stand-in. A repair sees the
+        ending of the neighbouring text; when that ending is unchanged in the
+        neighbour's final text, the scene continues from that final text.
+        """
+        if seen is None:
+            return self.outline_prev_text(scenes, i)
+        if seen[-REPAIR_PREV_CHARS:] == prev_final[-REPAIR_PREV_CHARS:]:
+            return prev_final
+        return seen
+
+    def repair_request(self, scene: Dict, draft_text: str, prev_text: str) -> Optional[Tuple[str, str]]:
+        """(repair prompt, untouched remainder of the draft), or None when there is nothing to repair against."""
+        if not prev_text:
+            return None
+        opening, rest = self.split_opening(draft_text)
+        return self.build_repair_prompt(scene, prev_text[-REPAIR_PREV_CHARS:], opening), rest
+
+    @staticmethod
+    def apply_repair(draft_text: str, revised: str, rest: str) -> str:
+        if revised.strip() == "KEEP":
+            return draft_text
+        return revised.strip() + ("\n\n" + rest if rest else "")
+
+    def split_opening(self, text: str, min_chars: int = 900) -> Tuple[str, str]:
+        """Split a scene into its opening paragraphs (at least min_chars) and the remainder."""
+        paragraphs = text.split("\n\n")
+        opening: List[str] = []
+        for p in paragraphs:
+            opening.append(p)
+            if sum(len(x) for x in opening) >= min_chars:
+                break
+        return "\n\n".join(opening), "\n\n".join(paragraphs[len(opening):])
+
+    def build_repair_prompt(self, scene: Dict, prev_ending: str, opening: str) -> str:
+        return f"""
+CONTINUITY REPAIR
+The scene below was drafted without seeing the previous scene's final text.
+Revise ONLY its opening so the transition from the previous scene is seamless:
+carry over emotional state, time/location logic, and any dangling dialogue beat.
+Keep the same {self.format} format, POV, tense, voice and roughly the same length.
+Do not change events after the opening.
+
+PREVIOUS SCENE (ending)
+{prev_ending}
+
+CURRENT SCENE: Act {scene['act']}, Scene {scene['scene']} — {scene.get('scene_title') or 'Untitled'}
+OPENING TO REVISE
+{opening}
+
+If the transition already works, reply with exactly: KEEP
+Otherwise output the revised opening only.
+""".strip()
 
     # Continuity helpers
     def get_prev_scene_text(self, act: int, scene: int) -> str:
+        """Finalized text of the scene before this one in outline order ("" while it is not written)."""
+        self.flush_writes()
         cursor = self.conn.cursor()
+        # Scene numbers run on across acts, so an act's first scene follows the previous act's last one
         cursor.execute(
             """
-            SELECT final_text FROM finalized_scenes
-            WHERE act=? AND scene=? LIMIT 1
+            SELECT f.final_text FROM story_outline o
+            LEFT JOIN finalized_scenes f ON f.act = o.act AND f.scene = o.scene
+            WHERE o.act < ? OR (o.act = ? AND o.scene < ?)
+            ORDER BY o.act DESC, o.scene DESC LIMIT 1
             """,
-            (act, scene - 1),
+            (act, act, scene),
         )
         r = cursor.fetchone()
-        if r and r[0]:
-            return r[0]
-        if scene == 1 and act > 1:
-            cursor.execute(
-                """
-                SELECT final_text FROM finalized_scenes
-                WHERE act=? ORDER BY scene DESC LIMIT 1
-                """,
-                (act - 1,),
-            )
-            r = cursor.fetchone()
-            if r and r[0]:
-                return r[0]
-        return ""
+        return r[0] if r and r[0] else ""
+
+    def get_final_text(self, act: int, scene: int, flush: bool = True) -> str:
+        """Finalized text of a scene; flush=False skips waiting for queued writes (caller already flushed)."""
+        if flush:
+            self.flush_writes()
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT final_text FROM finalized_scenes WHERE act=? AND scene=? LIMIT 1", (act, scene))
+        r = cursor.fetchone()
+        return r[0] if r and r[0] else ""
+
+    def describe_outline(self, scene: Dict) -> str:
+        """Outline-only description of a scene, in the same shape as get_next_scene_outline_desc."""
+        parts: List[str] = []
+        for key in OUTLINE_FIELDS:
+            val = scene.get(key)
+            if val:
+                parts.append(f"{key.replace('_', ' ').title()}: {val}")
+        return "\n".join(parts)
 
     def get_next_scene_outline_desc(self, act: int, scene: int) -> str:
         cursor = self.conn.cursor()
@@ -779,33 +2031,25 @@ TASK
         if not r:
             return ""
         parts: List[str] = []
-        for key in [
-            "scene_title","location","time_of_day","characters_present","scene_purpose",
-            "key_events","emotional_beats","dialogue_notes","beat","nudge","plot_threads","notes"
-        ]:
+        for key in OUTLINE_FIELDS:
             val = r[key]
             if val:
                 label = key.replace('_', ' ').title()
                 parts.append(f"{label}: {val}")
         return "\n".join(parts)
 
-    def make_outline_snapshot(self, scenes: List[Dict], current_act: int, current_scene: int, max_chars: int = 1200) -> str:
+    def make_outline_snapshot(self, scenes: List[Dict], current_act: Optional[int] = None,
+                              current_scene: Optional[int] = None,
+                              max_tokens: int = SECTION_TOKEN_BUDGETS["outline"]) -> str:
         lines: List[str] = []
         for s in scenes:
             tag = ">>" if (s["act"] == current_act and s["scene"] == current_scene) else "  "
             title = s.get("scene_title") or "Untitled"
             lines.append(f"{tag} Act {s['act']}, Scene {s['scene']} — {title}")
-        snap = "\n".join(lines)
-        if len(snap) > max_chars:
-            snap = snap[:max_chars] + "\n...[truncated]"
-        return snap
-
-    def summarize_prev_if_long(self, text: str, max_chars: int = 2500) -> str:
-        if not text:
-            return "(No previous scene available.)"
-        return text[:max_chars] + ("..." if len(text) > max_chars else "")
+        return truncate_to_tokens("\n".join(lines), max_tokens, keep="lines")
 
     def close(self):
+        self.flush_writes()
         if self.conn:
             self.conn.close()
 
@@ -815,6 +2059,28 @@ TASK
 # -------------
 
 def main():
+    startup = time.perf_counter()
+    parser = argparse.ArgumentParser(description="Lizzy Alpha - Write Module")
+    parser.add_argument("--resume", action="store_true",
+                        help="continue the latest incomplete writing run")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--fast", action="store_true",
+                      help="draft all scenes in parallel from the outline, then repair scene transitions")
+    mode.add_argument("--acts", action="store_true",
+                      help="write the acts concurrently, each as a sequential chain seeded by a bridge summary")
+    mode.add_argument("--batch", action="store_true",
+                      help="submit fast mode's drafts and repairs as offline batch jobs (slower, cheaper)")
+    mode.add_argument("--dirty", action="store_true",
+                      help="rewrite only scenes whose outline, brainstorm, characters or previous scene changed")
+    parser.add_argument("--depth", type=int, default=DEFAULT_DIRTY_DEPTH,
+                        help=f"with --dirty: how many following scenes a rewrite propagates to "
+                             f"(default {DEFAULT_DIRTY_DEPTH})")
+    parser.add_argument("--no-stream", action="store_true",
+                        help="wait for each full scene instead of streaming it to the terminal")
+    parser.add_argument("--digest", action="store_true",
+                        help="condense each scene's brainstorm into a digest first and write from the digests")
+    args = parser.parse_args()
+
     print("✍️  Lizzy Alpha - Write Module (v3)")
     print("=" * 40)
     print("Production-grade scene writing with brainstorm-like flow")
@@ -826,18 +2092,41 @@ def main():
 
     lightrag_instances = initialize_lightrag_buckets()
     agent = WriteAgent(lightrag_instances=lightrag_instances)
+    if args.fast:
+        agent.mode = "fast"
+    elif args.acts:
+        agent.mode = "acts"
+    elif args.batch:
+        agent.mode = "batch"
+    elif args.dirty:
+        agent.mode = "dirty"
+        agent.dirty_depth = max(0, args.depth)
+    agent.build_digests = args.digest
+    agent.stream = not args.no_stream
+    print(f"⏱️  Ready in {time.perf_counter() - startup:.2f}s (LightRAG buckets deferred until queried)")
 
     try:
         if not agent.setup_project():
             return
-        agent.input_style_and_tone()
-        agent.setup_session_table()
+        if not (args.resume and agent.resume_latest()):
+            agent.input_style_and_tone()
+            agent.setup_session_table()
 
         print("\n🚀 Starting writing process...")
-        agent.run()
+        if agent.mode == "fast":
+            agent.run_fast()
+        elif agent.mode == "acts":
+            agent.run_acts()
+        elif agent.mode == "batch":
+            agent.run_batch()
+        elif agent.mode == "dirty":
+            agent.run_dirty()
+        else:
+            agent.run()
 
     except KeyboardInterrupt:
         print("\n\n⏸️  Session cancelled.")
+        print("   Finished scenes are saved. Continue with: python3 write.py --resume")
     except Exception as e:
         print(f"\n❌ Error: {e}")
         import traceback